@@ -0,0 +1,25 @@
+"""Add webhook batching settings
+
+Revision ID: 003_webhook_batching
+Revises: 002_event_outbox
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_webhook_batching'
+down_revision = '002_event_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('webhooks', sa.Column('batch_window_seconds', sa.Integer(), nullable=True))
+    op.add_column('webhooks', sa.Column('batch_max_events', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('webhooks', 'batch_max_events')
+    op.drop_column('webhooks', 'batch_window_seconds')
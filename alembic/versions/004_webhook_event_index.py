@@ -0,0 +1,26 @@
+"""Index webhooks by event type
+
+Revision ID: 004_webhook_event_index
+Revises: 003_webhook_batching
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004_webhook_event_index'
+down_revision = '003_webhook_batching'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_webhooks_event_type_enabled',
+        'webhooks',
+        ['event_type', 'enabled']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_webhooks_event_type_enabled', 'webhooks')
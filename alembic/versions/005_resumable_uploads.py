@@ -0,0 +1,39 @@
+"""Add resumable upload parts
+
+Revision ID: 005_resumable_uploads
+Revises: 004_webhook_event_index
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_resumable_uploads'
+down_revision = '004_webhook_event_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_tasks', sa.Column('total_size', sa.BigInteger(), nullable=True))
+    op.add_column('upload_tasks', sa.Column('part_size', sa.Integer(), nullable=True))
+    op.add_column('upload_tasks', sa.Column('total_parts', sa.Integer(), nullable=True))
+    
+    # Create upload_parts table
+    op.create_table(
+        'upload_parts',
+        sa.Column('task_id', sa.String(length=100), nullable=False),
+        sa.Column('part_number', sa.Integer(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('checksum', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('task_id', 'part_number')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('upload_parts')
+    op.drop_column('upload_tasks', 'total_parts')
+    op.drop_column('upload_tasks', 'part_size')
+    op.drop_column('upload_tasks', 'total_size')
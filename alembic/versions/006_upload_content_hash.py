@@ -0,0 +1,29 @@
+"""Add upload content hash and outcome
+
+Revision ID: 006_upload_content_hash
+Revises: 005_resumable_uploads
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_upload_content_hash'
+down_revision = '005_resumable_uploads'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_tasks', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('upload_tasks', sa.Column('outcome', sa.String(length=20), nullable=True))
+    op.add_column('upload_tasks', sa.Column('duplicate_of', sa.String(length=100), nullable=True))
+    op.create_index('ix_upload_tasks_content_hash', 'upload_tasks', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_upload_tasks_content_hash', table_name='upload_tasks')
+    op.drop_column('upload_tasks', 'duplicate_of')
+    op.drop_column('upload_tasks', 'outcome')
+    op.drop_column('upload_tasks', 'content_hash')
@@ -0,0 +1,35 @@
+"""Add full-sync import mode
+
+Revision ID: 007_full_sync_imports
+Revises: 006_upload_content_hash
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '007_full_sync_imports'
+down_revision = '006_upload_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_tasks', sa.Column('options', postgresql.JSONB(), nullable=True))
+    op.add_column('upload_tasks', sa.Column('deactivated_rows', sa.Integer(), nullable=True))
+    
+    # Create import_seen_skus staging table
+    op.create_table(
+        'import_seen_skus',
+        sa.Column('task_id', sa.String(length=100), nullable=False),
+        sa.Column('sku_lower', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('task_id', 'sku_lower')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('import_seen_skus')
+    op.drop_column('upload_tasks', 'deactivated_rows')
+    op.drop_column('upload_tasks', 'options')
@@ -0,0 +1,26 @@
+"""Add import reject counts
+
+Revision ID: 008_import_rejects
+Revises: 007_full_sync_imports
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '008_import_rejects'
+down_revision = '007_full_sync_imports'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_tasks', sa.Column('rejected_rows', sa.Integer(), nullable=True))
+    op.add_column('upload_tasks', sa.Column('reject_counts', postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_tasks', 'reject_counts')
+    op.drop_column('upload_tasks', 'rejected_rows')
@@ -0,0 +1,23 @@
+"""Add import peak RSS
+
+Revision ID: 009_import_peak_rss
+Revises: 008_import_rejects
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_import_peak_rss'
+down_revision = '008_import_rejects'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_tasks', sa.Column('peak_rss_mb', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('upload_tasks', 'peak_rss_mb')
@@ -0,0 +1,42 @@
+"""Add dry-run import staging
+
+Revision ID: 010_dry_run_imports
+Revises: 009_import_peak_rss
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '010_dry_run_imports'
+down_revision = '009_import_peak_rss'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('upload_tasks', sa.Column('dry_run_summary', postgresql.JSONB(), nullable=True))
+    
+    # Create import_staging table
+    op.create_table(
+        'import_staging',
+        sa.Column('task_id', sa.String(length=100), nullable=False),
+        sa.Column('line', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.SmallInteger(), nullable=False),
+        sa.Column('sku', sa.String(length=100), nullable=False),
+        sa.Column('sku_lower', sa.String(length=100), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('task_id', 'line'),
+        prefixes=['UNLOGGED']
+    )
+    op.create_index('idx_import_staging_bucket', 'import_staging', ['task_id', 'bucket', 'sku_lower'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_import_staging_bucket', table_name='import_staging')
+    op.drop_table('import_staging')
+    op.drop_column('upload_tasks', 'dry_run_summary')
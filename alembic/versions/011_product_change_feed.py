@@ -0,0 +1,42 @@
+"""Add product change sequence and tombstones
+
+Revision ID: 011_product_change_feed
+Revises: 010_dry_run_imports
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_product_change_feed'
+down_revision = '010_dry_run_imports'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE product_change_seq")
+    
+    # The volatile default gives every existing row a value (rewrites the table)
+    op.add_column('products', sa.Column(
+        'change_seq', sa.BigInteger(), nullable=False,
+        server_default=sa.text("nextval('product_change_seq')")
+    ))
+    op.create_index('idx_products_change_seq', 'products', ['change_seq'])
+    
+    op.create_table(
+        'product_tombstones',
+        sa.Column('change_seq', sa.BigInteger(), primary_key=True,
+                  server_default=sa.text("nextval('product_change_seq')")),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('sku', sa.String(length=100), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('product_tombstones')
+    op.drop_index('idx_products_change_seq', 'products')
+    op.drop_column('products', 'change_seq')
+    op.execute("DROP SEQUENCE product_change_seq")
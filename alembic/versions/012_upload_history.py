@@ -0,0 +1,24 @@
+"""Add upload history indexes
+
+Revision ID: 012_upload_history
+Revises: 011_product_change_feed
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '012_upload_history'
+down_revision = '011_product_change_feed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_upload_tasks_status_created', 'upload_tasks', ['status', 'created_at'])
+    op.create_index('idx_upload_tasks_created', 'upload_tasks', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_upload_tasks_created', 'upload_tasks')
+    op.drop_index('idx_upload_tasks_status_created', 'upload_tasks')
@@ -0,0 +1,42 @@
+"""Add incrementally maintained catalog stats
+
+Revision ID: 013_catalog_stats
+Revises: 012_upload_history
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from backend.catalog_stats import PRICE_BUCKET, TRIGGER_DDL
+
+# revision identifiers, used by Alembic.
+revision = '013_catalog_stats'
+down_revision = '012_upload_history'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'catalog_stats_deltas',
+        sa.Column('id', sa.BigInteger(), primary_key=True),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('price_bucket', sa.SmallInteger(), nullable=False),
+        sa.Column('delta', sa.BigInteger(), nullable=False),
+    )
+    
+    # Take the starting counts and install the triggers without a write slipping in between
+    op.execute("LOCK TABLE products IN SHARE MODE")
+    op.execute(f"""
+        INSERT INTO catalog_stats_deltas (active, price_bucket, delta)
+        SELECT active, {PRICE_BUCKET}, count(*) FROM products GROUP BY 1, 2
+    """)
+    for ddl in TRIGGER_DDL:
+        op.execute(ddl)
+
+
+def downgrade() -> None:
+    for event in ('insert', 'update', 'delete'):
+        op.execute(f"DROP TRIGGER products_stats_{event} ON products")
+        op.execute(f"DROP FUNCTION catalog_stats_on_{event}()")
+    op.drop_table('catalog_stats_deltas')
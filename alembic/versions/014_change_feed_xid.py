@@ -0,0 +1,30 @@
+"""Record the writing transaction of product changes
+
+Revision ID: 014_change_feed_xid
+Revises: 013_catalog_stats
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014_change_feed_xid'
+down_revision = '013_catalog_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows all get this migration's transaction, keeping their change_seq order
+    for table in ('products', 'product_tombstones'):
+        op.execute(f"ALTER TABLE {table} ADD COLUMN change_xid xid8 NOT NULL DEFAULT pg_current_xact_id()")
+    op.create_index('idx_products_change_xid_seq', 'products', ['change_xid', 'change_seq'])
+    op.create_index('idx_product_tombstones_change_xid_seq', 'product_tombstones', ['change_xid', 'change_seq'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_product_tombstones_change_xid_seq', 'product_tombstones')
+    op.drop_index('idx_products_change_xid_seq', 'products')
+    op.drop_column('product_tombstones', 'change_xid')
+    op.drop_column('products', 'change_xid')
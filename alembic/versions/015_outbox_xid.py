@@ -0,0 +1,25 @@
+"""Record the writing transaction of outbox events
+
+Revision ID: 015_outbox_xid
+Revises: 014_change_feed_xid
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '015_outbox_xid'
+down_revision = '014_change_feed_xid'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Pending events all get this migration's transaction, keeping their id order
+    op.execute("ALTER TABLE event_outbox ADD COLUMN xid xid8 NOT NULL DEFAULT pg_current_xact_id()")
+    op.create_index('idx_event_outbox_xid_id', 'event_outbox', ['xid', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_event_outbox_xid_id', 'event_outbox')
+    op.drop_column('event_outbox', 'xid')
@@ -0,0 +1,162 @@
+"""Catalog counts and price histogram, maintained incrementally.
+
+Statement-level triggers on `products` append net count changes per
+(active, price bucket) to `catalog_stats_deltas`, so every write path,
+bulk imports included, keeps the numbers current without touching a
+shared counter row. Reading the stats sums that small table.
+`compact` folds the rows together and `reconcile` corrects any drift
+against a full count.
+"""
+from typing import Dict, List
+from sqlalchemy import text
+
+# Upper price bounds of the histogram buckets; the last bucket is open-ended
+PRICE_EDGES = (10, 50, 100, 500, 1000)
+
+PRICE_BUCKET = f"width_bucket(price, ARRAY[{', '.join(str(edge) for edge in PRICE_EDGES)}]::float8[])"
+
+TRIGGER_DDL = (
+    f"""
+    CREATE OR REPLACE FUNCTION catalog_stats_on_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO catalog_stats_deltas (active, price_bucket, delta)
+        SELECT active, {PRICE_BUCKET}, count(*) FROM new_rows GROUP BY 1, 2;
+        RETURN NULL;
+    END $$
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION catalog_stats_on_update() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO catalog_stats_deltas (active, price_bucket, delta)
+        SELECT active, price_bucket, sum(delta) FROM (
+            SELECT active, {PRICE_BUCKET} AS price_bucket, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT active, {PRICE_BUCKET}, -1 FROM old_rows
+        ) changes
+        GROUP BY 1, 2
+        HAVING sum(delta) <> 0;
+        RETURN NULL;
+    END $$
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION catalog_stats_on_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO catalog_stats_deltas (active, price_bucket, delta)
+        SELECT active, {PRICE_BUCKET}, -count(*) FROM old_rows GROUP BY 1, 2;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE TRIGGER products_stats_insert AFTER INSERT ON products
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_on_insert()
+    """,
+    """
+    CREATE TRIGGER products_stats_update AFTER UPDATE ON products
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_on_update()
+    """,
+    """
+    CREATE TRIGGER products_stats_delete AFTER DELETE ON products
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_stats_on_delete()
+    """,
+)
+
+
+def read_stats(db) -> Dict:
+    """
+    Get catalog counts and the price histogram.
+
+    Args:
+        db: Database session
+
+    Returns:
+        dict: total, active, inactive and price_histogram (one entry per
+        bucket with min, max (None for the last) and count)
+    """
+    rows = db.execute(text("""
+        SELECT active, price_bucket, sum(delta)::bigint AS products
+        FROM catalog_stats_deltas
+        GROUP BY active, price_bucket
+    """)).all()
+
+    active = sum(row.products for row in rows if row.active)
+    inactive = sum(row.products for row in rows if not row.active)
+
+    bounds = (0,) + PRICE_EDGES
+    histogram: List[Dict] = [
+        {"min": low, "max": bounds[i + 1] if i + 1 < len(bounds) else None, "count": 0}
+        for i, low in enumerate(bounds)
+    ]
+    for row in rows:
+        # width_bucket gives 0 below the first edge, so buckets index the histogram
+        histogram[row.price_bucket]["count"] += row.products
+
+    return {
+        "total": active + inactive,
+        "active": active,
+        "inactive": inactive,
+        "price_histogram": histogram,
+    }
+
+
+def compact(db) -> int:
+    """
+    Fold all delta rows into one per (active, price bucket) (does not commit).
+
+    Rows appended by concurrent writers after this statement's snapshot
+    are left for the next run.
+
+    Returns:
+        int: Number of delta rows removed
+    """
+    return db.execute(text("""
+        WITH folded AS (
+            DELETE FROM catalog_stats_deltas
+            RETURNING active, price_bucket, delta
+        ),
+        kept AS (
+            INSERT INTO catalog_stats_deltas (active, price_bucket, delta)
+            SELECT active, price_bucket, sum(delta) FROM folded
+            GROUP BY active, price_bucket
+            HAVING sum(delta) <> 0
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM folded) - (SELECT count(*) FROM kept)
+    """)).scalar()
+
+
+def reconcile(db) -> int:
+    """
+    Correct drift between the deltas and a full count of products (does not commit).
+
+    Counting products and summing deltas happen in one statement, hence
+    one snapshot, and the correction is appended as another delta, so
+    concurrent writes need not be blocked.
+
+    Returns:
+        int: Number of (active, price bucket) groups that had drifted
+    """
+    return db.execute(text(f"""
+        WITH actual AS (
+            SELECT active, {PRICE_BUCKET} AS price_bucket, count(*) AS count
+            FROM products GROUP BY 1, 2
+        ),
+        recorded AS (
+            SELECT active, price_bucket, sum(delta) AS count
+            FROM catalog_stats_deltas GROUP BY 1, 2
+        ),
+        corrections AS (
+            INSERT INTO catalog_stats_deltas (active, price_bucket, delta)
+            SELECT
+                coalesce(a.active, r.active),
+                coalesce(a.price_bucket, r.price_bucket),
+                coalesce(a.count, 0) - coalesce(r.count, 0)
+            FROM actual a
+            FULL JOIN recorded r ON r.active = a.active AND r.price_bucket = a.price_bucket
+            WHERE coalesce(a.count, 0) <> coalesce(r.count, 0)
+            RETURNING 1
+        )
+        SELECT count(*) FROM corrections
+    """)).scalar()
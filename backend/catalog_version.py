@@ -0,0 +1,76 @@
+"""Catalog version for conditional GETs (ETag / If-None-Match)."""
+import logging
+from typing import Optional
+import redis
+from sqlalchemy import text
+from backend.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Bumped after every committed product write, by the API and by imports
+VERSION_KEY = "catalog:version"
+
+# Highest change sequence number in use; an index lookup on each table
+LATEST_CHANGE = """
+    SELECT greatest(
+        (SELECT max(change_seq) FROM products),
+        (SELECT max(change_seq) FROM product_tombstones)
+    )
+"""
+
+
+def bump():
+    """Mark the catalog as changed. Call after the write is committed."""
+    try:
+        get_redis().incr(VERSION_KEY)
+    except redis.RedisError as e:
+        logger.warning("Could not bump catalog version: %s", e)
+
+
+def catalog_etag(db) -> Optional[str]:
+    """
+    Get the ETag of catalog listings.
+
+    The Redis version changes after every commit, including ones whose
+    sequence numbers are lower than the current maximum; the maximum
+    sequence number guards against the Redis key being reset.
+
+    Args:
+        db: Database session
+
+    Returns:
+        str: Quoted strong ETag, or None if Redis is unavailable
+    """
+    try:
+        version = get_redis().get(VERSION_KEY) or "0"
+    except redis.RedisError as e:
+        logger.warning("Catalog version unavailable: %s", e)
+        return None
+
+    latest = db.execute(text(LATEST_CHANGE)).scalar() or 0
+    return f'"catalog-{version}-{latest}"'
+
+
+def product_etag(product) -> str:
+    """Get the ETag of a single product from its change sequence number."""
+    return f'"product-{product.id}-{product.change_seq}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+
+    Args:
+        if_none_match: Header value, a list of ETags or "*"
+        etag: Current ETag of the resource
+
+    Returns:
+        bool: True if the client's copy is current (send 304)
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
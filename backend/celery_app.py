@@ -1,11 +1,13 @@
 """Celery application configuration."""
 import os
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+from kombu import Queue
 from backend.config import settings
+from backend import database, metrics
 
 # Validate Redis URL
 redis_url = settings.redis_url
-print(f"[CELERY] Using Redis URL: {redis_url[:20]}...")  # Print first 20 chars for security
 
 # Ensure Redis URL is valid
 if not redis_url or not (redis_url.startswith('redis://') or redis_url.startswith('rediss://')):
@@ -18,7 +20,10 @@ celery_app = Celery(
     backend=redis_url,
     include=[
         "backend.tasks.import_tasks",
-        "backend.tasks.webhook_tasks"
+        "backend.tasks.webhook_tasks",
+        "backend.tasks.outbox_tasks",
+        "backend.tasks.cleanup_tasks",
+        "backend.tasks.stats_tasks"
     ]
 )
 
@@ -34,7 +39,71 @@ celery_app.conf.update(
     task_soft_time_limit=3300,  # 55 minutes soft limit
     worker_prefetch_multiplier=1,  # Process one task at a time
     broker_connection_retry_on_startup=True,
+    # Separate queues so long imports and webhook storms don't block each other
+    task_queues=(
+        Queue("imports"),
+        Queue("webhooks"),
+    ),
+    task_default_queue="webhooks",
+    task_routes={
+        "import_csv": {"queue": "imports"},
+        "commit_staged_import": {"queue": "imports"},
+        "cleanup_uploads": {"queue": "imports"},  # Sweeps the importers' upload directory
+        "dispatch_outbox": {"queue": "webhooks", "priority": 0},
+        # Short database maintenance; kept off the imports queue, where it would wait for hour-long imports
+        "compact_catalog_stats": {"queue": "webhooks", "priority": 0},
+        "reconcile_catalog_stats": {"queue": "webhooks", "priority": 0},
+        "trigger_webhooks": {"queue": "webhooks", "priority": 3},
+        "trigger_webhooks_batch": {"queue": "webhooks", "priority": 3},
+        "flush_webhook_batch": {"queue": "webhooks", "priority": 3},
+        "deliver_webhook": {"queue": "webhooks", "priority": 6},  # Retries yield to fresh events
+    },
+    # Redis emulates priorities with sub-queues; 0 is served first
+    task_default_priority=5,
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "queue_order_strategy": "priority",
+    },
 )
 
+# Periodic tasks (run with `celery beat` or a worker started with `-B`).
+# Each run expires when the next is due, so runs stuck behind a busy
+# queue are dropped instead of piling up. Cleanup waits on the imports
+# queue, behind imports of up to an hour, so its runs are kept for
+# `upload_cleanup_expires_seconds` instead: otherwise it would rarely run.
+BEAT_TASKS = {
+    "dispatch-outbox": ("dispatch_outbox", settings.outbox_dispatch_interval_seconds, None),
+    "cleanup-uploads": (
+        "cleanup_uploads", settings.upload_cleanup_interval_seconds, settings.upload_cleanup_expires_seconds
+    ),
+    "compact-catalog-stats": ("compact_catalog_stats", settings.catalog_stats_compact_interval_seconds, None),
+    "reconcile-catalog-stats": ("reconcile_catalog_stats", settings.catalog_stats_reconcile_interval_seconds, None),
+}
+
+celery_app.conf.beat_schedule = {
+    entry: {"task": task, "schedule": interval, "options": {"expires": expires or interval}}
+    for entry, (task, interval, expires) in BEAT_TASKS.items()
+}
+
+
+@worker_init.connect
+def _start_metrics_exporter(**kwargs):
+    """Expose worker metrics when WORKER_METRICS_PORT is set."""
+    if settings.worker_metrics_port:
+        metrics.start_worker_exporter(settings.worker_metrics_port)
+
+
+@worker_process_init.connect
+def _reset_db_pool(**kwargs):
+    """Keep prefork children off the connections of the parent's pool."""
+    database.dispose_engine()
+
+
+@worker_process_shutdown.connect
+def _mark_metrics_process_dead(pid=None, **kwargs):
+    """Drop live gauges of prefork children that exit."""
+    metrics.mark_process_dead(pid)
+
+
 if __name__ == "__main__":
     celery_app.start()
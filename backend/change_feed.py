@@ -0,0 +1,163 @@
+"""Ordered feed of product changes and deletions."""
+import logging
+from typing import Dict, Iterator, Tuple
+from sqlalchemy import delete, insert, select, text
+from backend.config import settings
+from backend.metrics import WATERMARK_LAG
+from backend.models import Product, ProductTombstone
+
+logger = logging.getLogger(__name__)
+
+CHANGES = """
+    SELECT * FROM (
+        (SELECT change_xid::text AS xid, change_seq AS seq, 'upsert' AS op, id, sku, name,
+                description, price, active, created_at, updated_at
+         FROM products
+         WHERE (change_xid, change_seq) > (CAST(:xid AS xid8), :seq)
+           AND change_xid < CAST(:watermark AS xid8)
+         ORDER BY change_xid, change_seq
+         LIMIT :limit)
+        UNION ALL
+        (SELECT change_xid::text, change_seq, 'delete', product_id, sku, NULL, NULL, NULL, NULL,
+                NULL, NULL
+         FROM product_tombstones
+         WHERE (change_xid, change_seq) > (CAST(:xid AS xid8), :seq)
+           AND change_xid < CAST(:watermark AS xid8)
+         ORDER BY change_xid, change_seq
+         LIMIT :limit)
+    ) changes
+    ORDER BY xid::xid8, seq
+    LIMIT :limit
+"""
+
+# Age of the oldest committed change the watermark still holds back
+HELD_BACK_AGE = """
+    SELECT coalesce(extract(epoch FROM now() - least(
+        (SELECT min(coalesce(updated_at, created_at)) FROM products
+         WHERE change_xid >= CAST(:watermark AS xid8)),
+        (SELECT min(deleted_at) FROM product_tombstones
+         WHERE change_xid >= CAST(:watermark AS xid8))
+    )), 0)
+"""
+
+# Cursor of a consumer that has seen nothing yet
+START_CURSOR = "0"
+
+
+def delete_products(db, *criteria) -> int:
+    """
+    Delete products, leaving a tombstone for each (does not commit).
+    
+    The delete and the tombstone insert are one statement, so rows cannot
+    disappear from the feed in between.
+    
+    Args:
+        db: Database session
+        criteria: WHERE conditions on products (none deletes all)
+        
+    Returns:
+        int: Number of products deleted
+    """
+    gone = delete(Product).where(*criteria).returning(Product.id, Product.sku).cte("gone")
+    stmt = insert(ProductTombstone).from_select(
+        ["product_id", "sku"], select(gone.c.id, gone.c.sku)
+    )
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+def format_cursor(xid: str, seq: int) -> str:
+    """Build the cursor for the position after a change."""
+    return f"{xid}|{seq}"
+
+
+def parse_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Split a feed cursor into transaction ID and sequence number.
+    
+    Raises:
+        ValueError: If the cursor was not produced by `format_cursor`
+    """
+    if cursor == START_CURSOR:
+        return "0", 0
+    xid, _, seq = cursor.partition("|")
+    if not xid.isdigit() or not seq.isdigit():
+        raise ValueError(f"Invalid change feed cursor: {cursor}")
+    return xid, int(seq)
+
+
+def _watermark(db) -> str:
+    """
+    Oldest transaction still running; every change below it has committed.
+    
+    Later transactions always get higher IDs, so no change below the
+    watermark can appear after it has been read.
+    """
+    return db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")).scalar()
+
+
+def changes_since(db, cursor: str, limit: int) -> Iterator[Dict]:
+    """
+    Yield product changes after a cursor, in commit-safe order.
+    
+    Changes are ordered by writing transaction, then sequence number
+    within it. Sequence numbers alone can commit out of order, so the
+    feed stops before the oldest transaction still in progress; a long
+    full sync holds it back until the sync commits, and nothing is
+    skipped. When a consumer catches up, the age of the oldest change
+    left behind is reported as the feed's watermark lag.
+    
+    Args:
+        db: Database session
+        cursor: `cursor` of the last change the consumer has seen (`START_CURSOR` for all)
+        limit: Maximum number of changes
+        
+    Yields:
+        dict: {"seq", "cursor", "op": "upsert", "product"} or
+        {"seq", "cursor", "op": "delete", "id", "sku"}
+        
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    xid, seq = parse_cursor(cursor)
+    watermark = _watermark(db)
+    rows = db.execute(text(CHANGES), {
+        "xid": xid,
+        "seq": seq,
+        "watermark": watermark,
+        "limit": limit,
+    }).mappings().all()
+    if len(rows) < limit:
+        _report_lag(db, watermark)
+    
+    for row in rows:
+        change = {"seq": row["seq"], "cursor": format_cursor(row["xid"], row["seq"])}
+        if row["op"] == "delete":
+            yield {**change, "op": "delete", "id": row["id"], "sku": row["sku"]}
+        else:
+            yield {
+                **change,
+                "op": "upsert",
+                "product": {
+                    "id": row["id"],
+                    "sku": row["sku"],
+                    "name": row["name"],
+                    "description": row["description"],
+                    "price": row["price"],
+                    "active": row["active"],
+                    "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+                    "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+                    "change_seq": row["seq"],
+                },
+            }
+
+
+def _report_lag(db, watermark: str):
+    """Report how long committed changes have been waiting behind the watermark."""
+    lag = db.execute(text(HELD_BACK_AGE), {"watermark": watermark}).scalar()
+    WATERMARK_LAG.labels("change_feed").set(lag)
+    if lag > settings.watermark_lag_warning_seconds:
+        logger.warning(
+            "Change feed held back for %.0fs by a running transaction; "
+            "check pg_stat_activity for long or idle-in-transaction sessions", lag
+        )
@@ -0,0 +1,90 @@
+"""Readers for plain and compressed CSV uploads."""
+import gzip
+import io
+import os
+import zipfile
+from typing import BinaryIO, Optional, Tuple
+
+# Longest first, so ".csv.gz" is not mistaken for ".csv"
+SUPPORTED_EXTENSIONS = (".csv.gz", ".csv.zst", ".zip", ".csv")
+
+
+def upload_suffix(filename: str) -> Optional[str]:
+    """
+    Get the supported extension of an uploaded file.
+
+    Args:
+        filename: Original filename
+
+    Returns:
+        str: Extension such as ".csv.gz", or None if not supported
+    """
+    lower = filename.lower()
+    for suffix in SUPPORTED_EXTENSIONS:
+        if lower.endswith(suffix):
+            return suffix
+    return None
+
+
+def open_csv(file_path: str, encoding: str = "utf-8") -> Tuple[io.TextIOWrapper, BinaryIO]:
+    """
+    Open a stored upload as decompressed CSV text.
+
+    Decompression is streamed; nothing is expanded to disk. The second
+    value is the underlying file, whose `tell()` gives the compressed
+    bytes consumed so far for progress reporting.
+
+    Args:
+        file_path: Path of the stored upload (its extension picks the codec)
+        encoding: Text encoding of the CSV
+
+    Returns:
+        tuple: (text stream, raw file); close both when done
+    """
+    stream, raw = open_decompressed(file_path)
+    return io.TextIOWrapper(stream, encoding=encoding, newline=""), raw
+
+
+def open_decompressed(file_path: str) -> Tuple[BinaryIO, BinaryIO]:
+    """
+    Open a stored upload as a decompressed byte stream.
+
+    Args:
+        file_path: Path of the stored upload (its extension picks the codec)
+
+    Returns:
+        tuple: (decompressed stream, raw file); close both when done
+    """
+    suffix = upload_suffix(file_path)
+    raw = open(file_path, "rb")
+
+    try:
+        if suffix == ".csv.gz":
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        elif suffix == ".csv.zst":
+            # Optional dependency, only needed for zstd uploads
+            import zstandard
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+        elif suffix == ".zip":
+            stream = _open_zip_entry(raw)
+        else:
+            stream = raw
+    except Exception:
+        raw.close()
+        raise
+
+    return stream, raw
+
+
+def _open_zip_entry(raw: BinaryIO):
+    """Open the only file in a zip archive."""
+    archive = zipfile.ZipFile(raw)
+    entries = [info for info in archive.infolist() if not info.is_dir()]
+
+    if len(entries) != 1:
+        raise ValueError(f"Zip upload must contain exactly one file, found {len(entries)}")
+    if not entries[0].filename.lower().endswith(".csv"):
+        raise ValueError(f"Zip entry {os.path.basename(entries[0].filename)} is not a CSV file")
+
+    return archive.open(entries[0])
+
@@ -0,0 +1,115 @@
+"""Columns and row validation shared by upload preflight and the importer."""
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+REQUIRED_COLUMNS = ("sku", "name")
+
+
+class RowError(ValueError):
+    """A CSV row that cannot be imported."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def map_header(fieldnames: Iterable[str], column_mapping: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    Normalise header names and apply a column mapping.
+
+    Names are compared trimmed and case-insensitively, so `" SKU "` is
+    read as `sku`.
+
+    Args:
+        fieldnames: Header row of the file
+        column_mapping: File column name -> product field, e.g. {"SKU Code": "sku"}
+
+    Returns:
+        list: Product field name for each column
+    """
+    mapping = {
+        source.strip().lower(): target.strip().lower()
+        for source, target in (column_mapping or {}).items()
+    }
+    return [mapping.get(name.strip().lower(), name.strip().lower()) for name in fieldnames]
+
+
+class ColumnIndex:
+    """Position of each product field in a CSV row (None if the file lacks it)."""
+    __slots__ = ("sku", "name", "description", "price")
+
+    def __init__(self, columns: Sequence[str]):
+        positions = {}
+        for i, name in enumerate(columns):
+            positions.setdefault(name, i)
+        for field in self.__slots__:
+            setattr(self, field, positions.get(field))
+
+
+class ProductRow(NamedTuple):
+    """Validated values of one CSV row."""
+    sku: str
+    name: str
+    description: Optional[str]
+    price: float
+
+
+class RowChunk:
+    """
+    CSV rows of one import chunk, kept as the reader's lists.
+
+    Line numbers are held in a parallel array instead of per-row objects.
+    """
+    __slots__ = ("columns", "lines", "rows")
+
+    def __init__(self, columns: ColumnIndex):
+        self.columns = columns
+        self.lines = array("L")
+        self.rows: List[List[str]] = []
+
+    def append(self, line: int, values: List[str]):
+        self.lines.append(line)
+        self.rows.append(values)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+def field_value(values: Sequence[str], index: Optional[int]) -> Optional[str]:
+    """Get a field of a row, or None if the column is absent or the row is short."""
+    if index is None or index >= len(values):
+        return None
+    return values[index]
+
+
+def parse_row(values: Sequence[str], columns: ColumnIndex) -> ProductRow:
+    """
+    Validate a CSV row and convert it to product values.
+
+    Args:
+        values: Row as read by csv.reader
+        columns: Field positions from the header
+
+    Returns:
+        ProductRow: Product values
+
+    Raises:
+        RowError: If the row is invalid
+    """
+    sku = (field_value(values, columns.sku) or "").strip()
+    name = (field_value(values, columns.name) or "").strip()
+
+    if not sku:
+        raise RowError("missing_sku", "sku is empty")
+    if not name:
+        raise RowError("missing_name", "name is empty")
+
+    # Without a price column, products are imported at 0
+    raw_price = field_value(values, columns.price) if columns.price is not None else 0
+    try:
+        price = float(raw_price)
+    except (TypeError, ValueError):
+        raise RowError("invalid_price", f"price {raw_price!r} is not a number")
+
+    description = (field_value(values, columns.description) or "").strip() or None
+    return ProductRow(sku, name, description, price)
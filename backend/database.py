@@ -1,25 +1,114 @@
 """Database connection and session management."""
+import threading
+from typing import Any, Dict
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from backend.config import settings
+from backend.metrics import instrument_engine
+
+_engine = None
+# Request and webhook worker threads can race to create the engine
+_engine_lock = threading.Lock()
+
+# psycopg 3 switches to server-side prepared statements after a few
+# executions, which break when PgBouncer hands the next transaction to
+# another server connection; psycopg2 never prepares server-side
+PGBOUNCER_CONNECT_ARGS = {
+    "psycopg": {"prepare_threshold": None},
+}
+
+
+def engine_options() -> Dict[str, Any]:
+    """
+    Get `create_engine` keyword arguments for this process's role.
+
+    Pools are sized by `PROCESS_ROLE`. With `DB_NULL_POOL` every session
+    opens and closes its own connection, leaving pooling to PgBouncer.
+
+    Returns:
+        dict: Keyword arguments for `create_engine`
+    """
+    options: Dict[str, Any] = {"echo": settings.environment == "development"}
+
+    if settings.db_null_pool:
+        options["poolclass"] = NullPool
+    else:
+        pool_size, max_overflow = settings.db_pool_limits()
+        options.update(
+            pool_pre_ping=True,  # Verify connections before using
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+        )
+
+    if settings.db_pgbouncer:
+        driver = make_url(settings.database_url).get_driver_name()
+        connect_args = PGBOUNCER_CONNECT_ARGS.get(driver)
+        if connect_args:
+            options["connect_args"] = connect_args
+
+    return options
+
+
+def get_engine():
+    """
+    Get the process's SQLAlchemy engine, creating it on first use.
+
+    Creating it lazily keeps the DB driver and pool out of process
+    startup, and lets a process decide its settings before connecting.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                options = engine_options()
+                engine = create_engine(settings.database_url, **options)
+                capacity = None
+                if "pool_size" in options:
+                    capacity = options["pool_size"] + options["max_overflow"]
+                instrument_engine(engine, settings.process_role, capacity)
+                # Published only once instrumented, so no connection goes uncounted
+                _engine = engine
+    return _engine
+
+
+def dispose_engine():
+    """
+    Drop pooled connections inherited from a parent process.
+
+    Call in a child right after fork. The parent still owns the sockets,
+    so they are dereferenced without being closed; the child opens its
+    own connections on first use.
+    """
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+class _LazySession(Session):
+    """Session bound to the process engine unless given another bind."""
+
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind if bind is not None else get_engine(), **kwargs)
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_size=10,
-    max_overflow=20,
-    echo=settings.environment == "development"
-)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=_LazySession, autocommit=False, autoflush=False)
 
 # Base class for models
 Base = declarative_base()
 
 
+def __getattr__(name):
+    # `engine` used to be created at import time; keep it importable
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_db():
     """Dependency for getting database sessions."""
     db = SessionLocal()
@@ -0,0 +1,217 @@
+"""Opt-in per-request performance instrumentation.
+
+Records SQL query count and time, handler time and serialization time
+for every request. Results go to a `Server-Timing` response header and
+a JSON log line on the `backend.perf` logger. A sampled fraction of
+requests can also be profiled with cProfile.
+"""
+import cProfile
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from backend.config import settings
+
+logger = logging.getLogger("backend.perf")
+
+
+class RequestStats:
+    """Timings collected for one request."""
+    __slots__ = ("db_queries", "db_time", "handler_time", "handler_end", "profile")
+
+    def __init__(self, profile: bool = False):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.handler_time = 0.0
+        self.handler_end = None
+        self.profile = profile
+
+
+# Shared by reference with threadpool workers, which run in a copied context
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_sql_hooks_installed = False
+
+
+def install_sql_hooks():
+    """Count and time SQL statements on every engine."""
+    global _sql_hooks_installed
+    if _sql_hooks_installed:
+        return
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("perf_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        starts = conn.info.get("perf_query_start")
+        if stats is not None and starts:
+            stats.db_queries += 1
+            stats.db_time += time.perf_counter() - starts.pop()
+
+    _sql_hooks_installed = True
+
+
+class TimedRoute(APIRoute):
+    """API route that times its endpoint while instrumentation is active."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed(endpoint), **kwargs)
+
+
+def _timed(endpoint):
+    """Wrap an endpoint to record its run time (and profile it if sampled)."""
+    # include_router re-creates routes from already wrapped endpoints
+    if getattr(endpoint, "_perf_timed", False):
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                return await endpoint(*args, **kwargs)
+
+            profiler = _start_profiler(stats)
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _finish(stats, start, profiler, endpoint)
+
+        async_wrapper._perf_timed = True
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return endpoint(*args, **kwargs)
+
+        profiler = _start_profiler(stats)
+        start = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            _finish(stats, start, profiler, endpoint)
+
+    sync_wrapper._perf_timed = True
+    return sync_wrapper
+
+
+def _start_profiler(stats: RequestStats):
+    """Start cProfile for sampled requests."""
+    if not stats.profile:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _finish(stats: RequestStats, start: float, profiler, endpoint):
+    """Record handler time and save the profile, if any."""
+    stats.handler_end = time.perf_counter()
+    stats.handler_time += stats.handler_end - start
+
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(settings.perf_profile_dir, exist_ok=True)
+        path = os.path.join(
+            settings.perf_profile_dir,
+            f"{int(time.time() * 1000)}-{endpoint.__name__}.prof"
+        )
+        profiler.dump_stats(path)
+        logger.info(json.dumps({"profile": path, "endpoint": endpoint.__name__}))
+
+
+class PerfMiddleware:
+    """
+    ASGI middleware that adds a `Server-Timing` header and a log line.
+
+    Phases reported (milliseconds):
+        db         time spent in SQL statements (desc holds the query count)
+        handler    time spent in the endpoint function, including db
+        serialize  time from the endpoint returning to the response starting
+        total      time from request arrival to the response starting
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(profile=random.random() < settings.perf_profile_sample_rate)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = {"code": None, "total": None}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                status["code"] = message["status"]
+                status["total"] = now - start
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, now, status["total"]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            logger.info(json.dumps({
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status["code"],
+                "total_ms": _ms(status["total"]),
+                "handler_ms": _ms(stats.handler_time),
+                "db_ms": _ms(stats.db_time),
+                "db_queries": stats.db_queries,
+            }))
+
+
+def _server_timing(stats: RequestStats, now: float, total: float) -> str:
+    """Format the `Server-Timing` header value."""
+    parts = [
+        f'db;dur={_ms(stats.db_time)};desc="{stats.db_queries} queries"',
+        f"handler;dur={_ms(stats.handler_time)}",
+    ]
+    if stats.handler_end is not None:
+        parts.append(f"serialize;dur={_ms(now - stats.handler_end)}")
+    parts.append(f"total;dur={_ms(total)}")
+    return ", ".join(parts)
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    """Convert seconds to rounded milliseconds."""
+    if seconds is None:
+        return None
+    return round(seconds * 1000, 2)
+
+
+def install(app):
+    """Enable instrumentation on the application."""
+    install_sql_hooks()
+    app.add_middleware(PerfMiddleware)
+
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
@@ -1,8 +1,9 @@
 """FastAPI main application."""
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from backend.config import settings
+from backend import instrumentation, metrics
 from backend.routers import products, upload, webhooks
 
 # Create FastAPI app
@@ -21,6 +22,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histograms for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Opt-in per-request timing (PERF_INSTRUMENTATION=true)
+if settings.perf_instrumentation:
+    instrumentation.install(app)
+
 # Include routers
 app.include_router(products.router)
 app.include_router(upload.router)
@@ -32,5 +40,12 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus metrics endpoint."""
+    body, content_type = metrics.render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 # Serve frontend static files
 app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
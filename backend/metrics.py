@@ -0,0 +1,230 @@
+"""Prometheus metrics for the API, import pipeline and webhook delivery.
+
+When PROMETHEUS_MULTIPROC_DIR is set, every process (uvicorn workers,
+Celery prefork children) writes its samples to that directory and the
+`/metrics` endpoint aggregates them. The directory must be emptied
+before the processes start.
+"""
+import atexit
+import logging
+import os
+import time
+from typing import Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Celery queues reported by the queue depth collector
+QUEUES = ("imports", "webhooks")
+# Kombu keeps one Redis list per priority step, named "<queue>\x06\x16<step>"
+PRIORITY_SEP = "\x06\x16"
+PRIORITY_STEPS = range(10)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route",
+    ["method", "route", "status"],
+)
+
+IMPORT_CHUNK_DURATION = Histogram(
+    "import_chunk_duration_seconds",
+    "Time to validate and upsert one import chunk",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+IMPORT_ROWS = Counter(
+    "import_rows_total",
+    "CSV rows processed by imports",
+    ["outcome"],  # imported, rejected
+)
+
+IMPORT_WRITE_RETRIES = Counter(
+    "import_write_retries_total",
+    "Import writes retried after a deadlock or serialization failure",
+)
+
+WEBHOOK_DELIVERIES = Counter(
+    "webhook_deliveries_total",
+    "Webhook delivery attempts",
+    ["outcome"],  # success, failure, circuit_open, buffered
+)
+
+# Committed work waiting behind an older transaction that is still running
+# (the feeds only read below pg_snapshot_xmin); grows with long or
+# idle-in-transaction sessions
+WATERMARK_LAG = Gauge(
+    "transaction_watermark_lag_seconds",
+    "Age of the oldest committed change held back by a running transaction",
+    ["feed"],  # outbox, change_feed
+    multiprocess_mode="livemax",
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "SQLAlchemy connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+
+# Per process role, summed over live processes: compare with max_connections
+# (or PgBouncer's default_pool_size) when sizing pools
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity_connections",
+    "Connections the pool may open (pool_size + max_overflow); unset with NullPool",
+    ["role"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_OPEN = Gauge(
+    "db_pool_open_connections",
+    "Database connections currently open by the pool",
+    ["role"],
+    multiprocess_mode="livesum",
+)
+
+
+def instrument_engine(engine, role: str = "web", capacity: Optional[int] = None):
+    """
+    Track open and checked-out connections of an engine's pool.
+
+    Args:
+        engine: SQLAlchemy engine
+        role: Process role the engine serves
+        capacity: Most connections the pool may open, None if unbounded
+    """
+    open_connections = DB_POOL_OPEN.labels(role=role)
+    if capacity is not None:
+        DB_POOL_CAPACITY.labels(role=role).set(capacity)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        open_connections.inc()
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_connection, connection_record):
+        open_connections.dec()
+
+    @event.listens_for(engine, "close_detached")
+    def _on_close_detached(dbapi_connection):
+        open_connections.dec()
+
+
+class QueueDepthCollector:
+    """Report the number of messages waiting in each Celery queue."""
+
+    def collect(self):
+        # Imported here so that scraping is the only thing that needs Redis
+        import redis
+        from backend.redis_client import get_redis
+
+        gauge = GaugeMetricFamily(
+            "celery_queue_length",
+            "Messages waiting in a Celery queue",
+            labels=["queue"],
+        )
+
+        try:
+            pipe = get_redis().pipeline()
+            for queue in QUEUES:
+                for step in PRIORITY_STEPS:
+                    pipe.llen(queue if step == 0 else f"{queue}{PRIORITY_SEP}{step}")
+            lengths = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Queue depth unavailable: %s", e)
+            return
+
+        steps = len(PRIORITY_STEPS)
+        for i, queue in enumerate(QUEUES):
+            gauge.add_metric([queue], sum(lengths[i * steps:(i + 1) * steps]))
+        yield gauge
+
+
+_queue_collector = QueueDepthCollector()
+if not MULTIPROCESS:
+    REGISTRY.register(_queue_collector)
+
+
+def _scrape_registry():
+    """Get the registry to expose, aggregating all processes if needed."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_queue_collector)
+        return registry
+    return REGISTRY
+
+
+def start_worker_exporter(port: int):
+    """Serve metrics over HTTP from a Celery worker's main process."""
+    start_http_server(port, registry=_scrape_registry())
+    logger.info("Worker metrics exporter listening on port %s", port)
+
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text format.
+
+    Returns:
+        tuple: (body, content type)
+    """
+    return generate_latest(_scrape_registry()), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware that records request latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Use the route template, not the raw path, to bound label cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], route, str(status["code"])
+            ).observe(time.perf_counter() - start)
+
+
+def mark_process_dead(pid: int = None):
+    """Remove live gauges of a finished process in multiprocess mode."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+if MULTIPROCESS:
+    atexit.register(mark_process_dead)
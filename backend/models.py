@@ -1,8 +1,25 @@
 """SQLAlchemy models for the application."""
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, Index
+from sqlalchemy import (
+    Column, Integer, BigInteger, SmallInteger, String, Float, Boolean, DateTime, Text, Index, Sequence
+)
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
+from sqlalchemy.types import UserDefinedType
+from backend.catalog_stats import TRIGGER_DDL as CATALOG_STATS_TRIGGERS
 from backend.database import Base
 
+# Shared by product writes and deletions, so the change feed has one order
+PRODUCT_CHANGE_SEQ = Sequence("product_change_seq", metadata=Base.metadata)
+
+
+class XID8(UserDefinedType):
+    """PostgreSQL 64-bit transaction ID (`xid8`), read as a string."""
+    cache_ok = True
+    
+    def get_col_spec(self, **kw):
+        return "xid8"
+
 
 class Product(Base):
     """Product model."""
@@ -16,10 +33,26 @@ class Product(Base):
     active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Position in the change feed; every write path must take a new value
+    change_seq = Column(
+        BigInteger,
+        nullable=False,
+        server_default=PRODUCT_CHANGE_SEQ.next_value(),
+        onupdate=PRODUCT_CHANGE_SEQ.next_value()
+    )
+    # Transaction that made the change; the feed is ordered by (change_xid, change_seq)
+    change_xid = Column(
+        XID8,
+        nullable=False,
+        server_default=func.pg_current_xact_id(),
+        onupdate=func.pg_current_xact_id()
+    )
     
     # Create case-insensitive unique index on SKU
     __table_args__ = (
         Index('idx_sku_lower', func.lower(sku), unique=True),
+        Index('idx_products_change_seq', change_seq),
+        Index('idx_products_change_xid_seq', change_xid, change_seq),
     )
     
     def to_dict(self):
@@ -33,9 +66,40 @@ class Product(Base):
             "active": self.active,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "change_seq": self.change_seq,
         }
 
 
+# Keep catalog_stats_deltas in step with every write to products
+for _ddl in CATALOG_STATS_TRIGGERS:
+    event.listen(Product.__table__, "after_create", DDL(_ddl))
+
+
+class CatalogStatsDelta(Base):
+    """Net change in product counts per (active, price bucket), appended by triggers."""
+    __tablename__ = "catalog_stats_deltas"
+    
+    id = Column(BigInteger, primary_key=True)
+    active = Column(Boolean, nullable=False)
+    price_bucket = Column(SmallInteger, nullable=False)
+    delta = Column(BigInteger, nullable=False)
+
+
+class ProductTombstone(Base):
+    """A deleted product, kept for the change feed."""
+    __tablename__ = "product_tombstones"
+    
+    change_seq = Column(BigInteger, primary_key=True, server_default=PRODUCT_CHANGE_SEQ.next_value())
+    change_xid = Column(XID8, nullable=False, server_default=func.pg_current_xact_id())
+    product_id = Column(Integer, nullable=False)
+    sku = Column(String(100), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('idx_product_tombstones_change_xid_seq', change_xid, change_seq),
+    )
+
+
 class Webhook(Base):
     """Webhook model."""
     __tablename__ = "webhooks"
@@ -44,9 +108,17 @@ class Webhook(Base):
     url = Column(String(500), nullable=False)
     event_type = Column(String(50), nullable=False)  # e.g., "upload_complete", "product_created"
     enabled = Column(Boolean, default=True, nullable=False)
+    # Batching mode: buffer events for this many seconds (None = deliver each event)
+    batch_window_seconds = Column(Integer, nullable=True)
+    batch_max_events = Column(Integer, nullable=True)  # Flush early at this many events
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Subscription lookups filter on both columns
+    __table_args__ = (
+        Index('idx_webhooks_event_type_enabled', event_type, enabled),
+    )
+    
     def to_dict(self):
         """Convert model to dictionary."""
         return {
@@ -54,6 +126,8 @@ class Webhook(Base):
             "url": self.url,
             "event_type": self.event_type,
             "enabled": self.enabled,
+            "batch_window_seconds": self.batch_window_seconds,
+            "batch_max_events": self.batch_max_events,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
@@ -65,14 +139,36 @@ class UploadTask(Base):
     
     id = Column(String(100), primary_key=True)  # Celery task ID
     filename = Column(String(255), nullable=False)
-    status = Column(String(20), nullable=False)  # pending, processing, completed, failed
+    status = Column(String(20), nullable=False)  # uploading, pending, processing, completed, failed
     progress = Column(Integer, default=0)  # Percentage 0-100
     total_rows = Column(Integer, default=0)
     processed_rows = Column(Integer, default=0)
     error_message = Column(Text, nullable=True)
+    # File size in bytes (for resumable uploads, known from the start)
+    total_size = Column(BigInteger, nullable=True)
+    # Resumable uploads only: part layout
+    part_size = Column(Integer, nullable=True)
+    total_parts = Column(Integer, nullable=True)
+    # SHA-256 of the uploaded file, used to skip re-importing identical files
+    content_hash = Column(String(64), nullable=True, index=True)
+    outcome = Column(String(20), nullable=True)  # imported, duplicate, attached
+    duplicate_of = Column(String(100), nullable=True)  # Task that did the import
+    # Import options, e.g. {"mode": "full_sync", "missing": "deactivate"}
+    options = Column(JSONB, nullable=True)
+    deactivated_rows = Column(Integer, default=0)  # Full sync: products missing from the file
+    rejected_rows = Column(Integer, default=0)
+    reject_counts = Column(JSONB, nullable=True)  # Rejected rows per reason code
+    peak_rss_mb = Column(Integer, nullable=True)  # Worker memory high-water mark during the import
+    dry_run_summary = Column(JSONB, nullable=True)  # Diff of a dry run against the catalog
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Upload history (newest first, optionally by status) and retention cleanup
+    __table_args__ = (
+        Index('idx_upload_tasks_status_created', status, created_at),
+        Index('idx_upload_tasks_created', created_at, id),
+    )
+    
     def to_dict(self):
         """Convert model to dictionary."""
         return {
@@ -83,6 +179,81 @@ class UploadTask(Base):
             "total_rows": self.total_rows,
             "processed_rows": self.processed_rows,
             "error_message": self.error_message,
+            "total_size": self.total_size,
+            "part_size": self.part_size,
+            "total_parts": self.total_parts,
+            "content_hash": self.content_hash,
+            "outcome": self.outcome,
+            "duplicate_of": self.duplicate_of,
+            "options": self.options,
+            "deactivated_rows": self.deactivated_rows,
+            "rejected_rows": self.rejected_rows,
+            "reject_counts": self.reject_counts,
+            "peak_rss_mb": self.peak_rss_mb,
+            "dry_run_summary": self.dry_run_summary,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
+
+
+class UploadPart(Base):
+    """A received part of a resumable upload."""
+    __tablename__ = "upload_parts"
+    
+    task_id = Column(String(100), primary_key=True)
+    part_number = Column(Integer, primary_key=True)  # 1-based
+    size = Column(Integer, nullable=False)
+    checksum = Column(String(64), nullable=False)  # SHA-256 hex
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def to_dict(self):
+        """Convert model to dictionary."""
+        return {
+            "part_number": self.part_number,
+            "size": self.size,
+            "checksum": self.checksum,
+        }
+
+
+class EventOutbox(Base):
+    """Product events waiting to be handed to the webhook subsystem."""
+    __tablename__ = "event_outbox"
+    
+    id = Column(BigInteger, primary_key=True)  # Dispatch order within a transaction
+    # Writing transaction; events are dispatched in (xid, id) order
+    xid = Column(XID8, nullable=False, server_default=func.pg_current_xact_id())
+    event_type = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('idx_event_outbox_xid_id', xid, id),
+    )
+
+
+class ImportSeenSku(Base):
+    """SKUs seen so far by a full-sync import, for finding missing products."""
+    __tablename__ = "import_seen_skus"
+    
+    task_id = Column(String(100), primary_key=True)
+    sku_lower = Column(String(100), primary_key=True)
+
+
+class ImportStaging(Base):
+    """Validated rows of a dry-run import, waiting to be committed or discarded."""
+    __tablename__ = "import_staging"
+    
+    task_id = Column(String(100), primary_key=True)
+    line = Column(Integer, primary_key=True)
+    bucket = Column(SmallInteger, nullable=False)  # Advisory lock bucket of the SKU
+    sku = Column(String(100), nullable=False)
+    sku_lower = Column(String(100), nullable=False)
+    name = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    price = Column(Float, nullable=False)
+    
+    # Scratch data, so skip the WAL
+    __table_args__ = (
+        Index('idx_import_staging_bucket', task_id, bucket, sku_lower),
+        {"prefixes": ["UNLOGGED"]},
+    )
@@ -0,0 +1,20 @@
+"""Transactional outbox for product events."""
+from typing import Dict, Any
+from sqlalchemy.orm import Session
+from backend.models import EventOutbox
+
+
+def enqueue_event(db: Session, event_type: str, payload: Dict[str, Any]):
+    """
+    Record an event in the outbox as part of the caller's transaction.
+
+    The event becomes visible to the dispatcher only when the caller
+    commits, so it is never sent for a rolled-back change and never lost
+    for a committed one.
+
+    Args:
+        db: Database session holding the product change
+        event_type: Type of event (e.g., "product_created")
+        payload: Data to send to webhooks
+    """
+    db.add(EventOutbox(event_type=event_type, payload=payload))
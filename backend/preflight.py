@@ -0,0 +1,163 @@
+"""Quick checks of an upload before its import is queued."""
+import codecs
+import csv
+import io
+from typing import Dict, Optional
+from backend.compression import open_decompressed
+from backend.csv_schema import REQUIRED_COLUMNS, ColumnIndex, RowError, map_header, parse_row
+
+# Only this much of the (decompressed) file is read
+PREVIEW_BYTES = 64 * 1024
+SAMPLE_ROWS = 20
+DELIMITERS = ",;\t|"
+
+
+class PreflightError(ValueError):
+    """An upload that cannot be imported as it is."""
+
+
+def run_preflight(file_path: str, column_mapping: Optional[Dict[str, str]] = None) -> Dict:
+    """
+    Detect the format of an upload and check it can be imported.
+
+    Reads the first `PREVIEW_BYTES` to detect the encoding, delimiter and
+    header, applies the column mapping and validates a sample of rows.
+
+    Args:
+        file_path: Path of the stored upload
+        column_mapping: File column name -> product field
+
+    Returns:
+        dict: encoding, delimiter, columns (mapped header), sample_rows
+        and sample_errors
+
+    Raises:
+        PreflightError: If the file cannot be imported
+    """
+    preview, at_eof = _read_preview(file_path)
+    encoding = detect_encoding(preview, at_eof)
+
+    text = preview.decode(encoding, errors="replace")
+    if not at_eof:
+        # Drop the last line, which is probably cut off
+        text = text[:text.rfind("\n") + 1]
+
+    delimiter = detect_delimiter(text)
+    rows = list(csv.reader(io.StringIO(text, newline=""), delimiter=delimiter))
+    if not rows:
+        raise PreflightError("File is empty")
+
+    columns = _check_header(rows[0], column_mapping)
+
+    sample = [row for row in rows[1:SAMPLE_ROWS + 1] if any(value.strip() for value in row)]
+    if not sample:
+        raise PreflightError("File has a header but no rows")
+
+    index = ColumnIndex(columns)
+    errors = []
+    for line, values in enumerate(sample, start=2):
+        try:
+            parse_row(values, index)
+        except RowError as e:
+            errors.append(f"row {line}: {e}")
+
+    if len(errors) == len(sample):
+        raise PreflightError(f"None of the first {len(sample)} rows are valid ({errors[0]})")
+
+    return {
+        "encoding": encoding,
+        "delimiter": delimiter,
+        "columns": columns,
+        "sample_rows": len(sample),
+        "sample_errors": len(errors),
+    }
+
+
+def detect_encoding(preview: bytes, at_eof: bool = True) -> str:
+    """
+    Guess the text encoding of a file from its first bytes.
+
+    Args:
+        preview: Start of the file
+        at_eof: Whether the preview is the whole file
+
+    Returns:
+        str: Python codec name
+    """
+    if preview.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if preview.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+
+    try:
+        preview.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the preview is still UTF-8
+        if not at_eof and e.reason == "unexpected end of data":
+            return "utf-8"
+
+    try:
+        preview.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def detect_delimiter(text: str) -> str:
+    """Guess the delimiter of CSV text, defaulting to a comma."""
+    try:
+        return csv.Sniffer().sniff(text[:16 * 1024], delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def _read_preview(file_path: str):
+    """Read the start of the decompressed file and whether it ended."""
+    try:
+        stream, raw = open_decompressed(file_path)
+    except ImportError:
+        raise
+    except Exception as e:
+        raise PreflightError(f"Could not open file: {e}")
+
+    chunks = []
+    size = 0
+    try:
+        while size <= PREVIEW_BYTES:
+            data = stream.read(PREVIEW_BYTES + 1 - size)
+            if not data:
+                break
+            chunks.append(data)
+            size += len(data)
+    except Exception as e:
+        raise PreflightError(f"Could not decompress file: {e}")
+    finally:
+        stream.close()
+        raw.close()
+
+    preview = b"".join(chunks)
+    return preview[:PREVIEW_BYTES], len(preview) <= PREVIEW_BYTES
+
+
+def _check_header(header, column_mapping: Optional[Dict[str, str]]):
+    """Map the header row and check it has the required columns."""
+    found = {name.strip().lower() for name in header}
+    unknown = [source for source in (column_mapping or {}) if source.strip().lower() not in found]
+    if unknown:
+        raise PreflightError(f"column_mapping refers to columns not in the file: {', '.join(unknown)}")
+
+    columns = map_header(header, column_mapping)
+
+    duplicates = sorted({name for name in columns if name and columns.count(name) > 1})
+    if duplicates:
+        raise PreflightError(f"Duplicate columns: {', '.join(duplicates)}")
+
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise PreflightError(
+            f"Missing required columns: {', '.join(missing)} "
+            f"(found: {', '.join(header)}). Use column_mapping to map them."
+        )
+
+    return columns
@@ -0,0 +1,23 @@
+"""Shared Redis connection for application state (not the Celery broker)."""
+import redis
+from backend.config import settings
+
+_client = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Get the process-wide Redis client.
+
+    The client is created on first use and keeps its own connection pool,
+    so callers should not close it.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_timeout=2,
+            socket_connect_timeout=2,
+        )
+    return _client
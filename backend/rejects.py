@@ -0,0 +1,47 @@
+"""Report of CSV rows an import could not use."""
+import csv
+import gzip
+import os
+from collections import Counter
+from typing import Optional
+
+COLUMNS = ("line", "reason", "message", "sku")
+
+
+def report_path(directory: str, task_id: str) -> str:
+    """Get the path of an import's reject report."""
+    return os.path.join(directory, f"{task_id}.rejects.csv.gz")
+
+
+class RejectReport:
+    """
+    Gzipped CSV of rejected rows, written as the import runs.
+
+    The file is only created once the first row is rejected. Writes go
+    through the text layer's buffer, so each row costs no system call.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.counts = Counter()
+        self._file = None
+        self._writer = None
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, line: int, reason: str, message: str, sku: Optional[str]):
+        """Record one rejected row."""
+        if self._writer is None:
+            self._file = gzip.open(self.path, "wt", encoding="utf-8", newline="", compresslevel=1)
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(COLUMNS)
+        self._writer.writerow((line, reason, message, sku or ""))
+        self.counts[reason] += 1
+
+    def close(self):
+        """Flush and close the report."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
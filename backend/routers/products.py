@@ -1,15 +1,24 @@
 """Product CRUD API endpoints."""
+import json
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from backend import catalog_stats
+from backend.catalog_version import bump as bump_catalog_version, catalog_etag, etag_matches, product_etag
+from backend.change_feed import START_CURSOR, changes_since, delete_products, parse_cursor
 from backend.database import get_db
+from backend.instrumentation import TimedRoute
 from backend.models import Product
-from backend.tasks.webhook_tasks import trigger_webhooks
+from backend.outbox import enqueue_event
 
-router = APIRouter(prefix="/api/products", tags=["products"])
+router = APIRouter(prefix="/api/products", tags=["products"], route_class=TimedRoute)
+
+# Most SKUs plus ids one lookup request may resolve
+MAX_LOOKUP_KEYS = 5000
 
 
 # Pydantic schemas
@@ -29,6 +38,11 @@ class ProductUpdate(BaseModel):
     active: Optional[bool] = None
 
 
+class ProductLookup(BaseModel):
+    skus: List[str] = Field(default_factory=list, max_length=MAX_LOOKUP_KEYS)
+    ids: List[int] = Field(default_factory=list, max_length=MAX_LOOKUP_KEYS)
+
+
 class ProductResponse(BaseModel):
     id: int
     sku: str
@@ -38,6 +52,7 @@ class ProductResponse(BaseModel):
     active: bool
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
+    change_seq: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -45,17 +60,26 @@ class ProductResponse(BaseModel):
 
 @router.get("", response_model=dict)
 def list_products(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     sku: Optional[str] = None,
     name: Optional[str] = None,
     active: Optional[bool] = None,
     search: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
     List products with filtering and pagination.
+    
+    Responses carry an ETag of the catalog version; a request whose
+    If-None-Match still matches gets 304 without running the query.
     """
+    etag = catalog_etag(db)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
     query = db.query(Product)
     
     # Apply filters
@@ -84,6 +108,10 @@ def list_products(
     # Apply pagination
     products = query.order_by(Product.id.desc()).offset(skip).limit(limit).all()
     
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    
     return {
         "total": total,
         "skip": skip,
@@ -92,19 +120,138 @@ def list_products(
     }
 
 
+@router.get("/stats", response_model=dict)
+def get_catalog_stats(db: Session = Depends(get_db)):
+    """
+    Get product counts (total, active, inactive) and a price histogram.
+    
+    Served from the trigger-maintained `catalog_stats_deltas` table, so
+    the cost does not grow with the catalog.
+    """
+    return catalog_stats.read_stats(db)
+
+
+@router.get("/changes")
+def stream_product_changes(
+    since: str = Query(START_CURSOR),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream products changed or deleted after a change feed cursor.
+    
+    Returns newline-delimited JSON in change order: one line per change,
+    then `{"next": <cursor>}` to pass as `since` on the next call. A
+    consumer is up to date when a call returns no changes.
+    """
+    try:
+        parse_cursor(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Fetched before streaming: the session is closed before the body is sent
+    changes = list(changes_since(db, since, limit))
+    
+    def lines():
+        for change in changes:
+            yield json.dumps(change) + "\n"
+        yield json.dumps({"next": changes[-1]["cursor"] if changes else since}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/by-sku/{sku:path}", response_model=ProductResponse)
+def get_product_by_sku(
+    sku: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a single product by SKU (case-insensitive).
+    """
+    product = db.query(Product).filter(func.lower(Product.sku) == sku.lower()).first()
+    
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    return _conditional_product(product, response, if_none_match)
+
+
+@router.post("/lookup", response_model=dict)
+def lookup_products(lookup: ProductLookup, db: Session = Depends(get_db)):
+    """
+    Resolve many products by SKU and/or id in one query.
+    
+    SKUs match case-insensitively through the lower(sku) index. Keys
+    that match no product are returned under `missing`.
+    """
+    if len(lookup.skus) + len(lookup.ids) > MAX_LOOKUP_KEYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_LOOKUP_KEYS} SKUs and ids per request"
+        )
+    
+    skus = {sku.lower() for sku in lookup.skus}
+    ids = set(lookup.ids)
+    
+    conditions = []
+    if skus:
+        conditions.append(func.lower(Product.sku).in_(skus))
+    if ids:
+        conditions.append(Product.id.in_(ids))
+    
+    products = db.query(Product).filter(or_(*conditions)).all() if conditions else []
+    
+    found_skus = {p.sku.lower() for p in products}
+    found_ids = {p.id for p in products}
+    
+    return {
+        "products": [p.to_dict() for p in products],
+        "missing": {
+            "skus": [sku for sku in lookup.skus if sku.lower() not in found_skus],
+            "ids": [i for i in lookup.ids if i not in found_ids]
+        }
+    }
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
+def get_product(
+    product_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """
     Get a single product by ID.
+    
+    Responses carry an ETag of the product's change sequence number; a
+    request whose If-None-Match still matches gets 304.
     """
     product = db.query(Product).filter(Product.id == product_id).first()
     
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    return _conditional_product(product, response, if_none_match)
+
+
+def _conditional_product(product: Product, response: Response, if_none_match: Optional[str]):
+    """Answer a product read with 304 or the product, setting its ETag."""
+    etag = product_etag(product)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     return product
 
 
+def _not_modified(etag: str) -> Response:
+    """Build a 304 response for a current ETag."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
 @router.post("", response_model=ProductResponse, status_code=201)
 def create_product(product_data: ProductCreate, db: Session = Depends(get_db)):
     """
@@ -124,12 +271,14 @@ def create_product(product_data: ProductCreate, db: Session = Depends(get_db)):
     # Create product
     product = Product(**product_data.dict())
     db.add(product)
+    db.flush()
+    
+    # Record webhook event in the same transaction
+    enqueue_event(db, "product_created", product.to_dict())
     db.commit()
+    bump_catalog_version()
     db.refresh(product)
     
-    # Trigger webhook
-    trigger_webhooks.delay("product_created", product.to_dict())
-    
     return product
 
 
@@ -164,12 +313,14 @@ def update_product(
     for field, value in update_data.items():
         setattr(product, field, value)
     
+    db.flush()
+    
+    # Record webhook event in the same transaction
+    enqueue_event(db, "product_updated", product.to_dict())
     db.commit()
+    bump_catalog_version()
     db.refresh(product)
     
-    # Trigger webhook
-    trigger_webhooks.delay("product_updated", product.to_dict())
-    
     return product
 
 
@@ -184,11 +335,12 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Product not found")
     
     product_dict = product.to_dict()
-    db.delete(product)
-    db.commit()
+    delete_products(db, Product.id == product_id)
     
-    # Trigger webhook
-    trigger_webhooks.delay("product_deleted", product_dict)
+    # Record webhook event in the same transaction
+    enqueue_event(db, "product_deleted", product_dict)
+    db.commit()
+    bump_catalog_version()
     
     return None
 
@@ -198,11 +350,11 @@ def bulk_delete_products(db: Session = Depends(get_db)):
     """
     Delete all products (bulk delete).
     """
-    count = db.query(Product).count()
-    db.query(Product).delete()
-    db.commit()
+    count = delete_products(db)
     
-    # Trigger webhook
-    trigger_webhooks.delay("products_bulk_deleted", {"count": count})
+    # Record webhook event in the same transaction
+    enqueue_event(db, "products_bulk_deleted", {"count": count})
+    db.commit()
+    bump_catalog_version()
     
     return {"deleted": count, "message": f"Successfully deleted {count} products"}
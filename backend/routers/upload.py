@@ -1,20 +1,33 @@
 """CSV upload API endpoints."""
+import gzip
+import hashlib
+import math
 import os
 import uuid
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+from datetime import datetime, timezone
+from typing import Dict, Literal, Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import select, tuple_, update
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from sqlalchemy.dialects.postgresql import insert
+from pydantic import BaseModel, Field
+from backend import staging, upload_dedup
+from backend.compression import upload_suffix
+from backend.config import settings
 from backend.database import get_db
-from backend.models import UploadTask
-from backend.tasks.import_tasks import import_csv_task
+from backend.instrumentation import TimedRoute
+from backend.models import UploadTask, UploadPart
+from backend.preflight import PreflightError, run_preflight
+from backend.rejects import report_path
 import asyncio
 import json
 
-router = APIRouter(prefix="/api/upload", tags=["upload"])
+router = APIRouter(prefix="/api/upload", tags=["upload"], route_class=TimedRoute)
 
 # Create uploads directory
-UPLOAD_DIR = "uploads"
+UPLOAD_DIR = settings.upload_dir
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
@@ -22,57 +35,526 @@ class UploadResponse(BaseModel):
     task_id: str
     filename: str
     message: str
+    preflight: Optional[dict] = None
+
+
+class UploadInitiate(BaseModel):
+    filename: str
+    total_size: int = Field(..., ge=1)
+    part_size: Optional[int] = Field(None, ge=1024, le=64 * 1024 * 1024)
+    mode: Literal["upsert", "full_sync"] = "upsert"
+    missing: Literal["deactivate", "delete"] = "deactivate"
+    column_mapping: Optional[Dict[str, str]] = None
+    dry_run: bool = False
+
+
+class UploadSession(BaseModel):
+    task_id: str
+    filename: str
+    part_size: int
+    total_parts: int
 
 
 @router.post("", response_model=UploadResponse)
 async def upload_csv(
     file: UploadFile = File(...),
+    mode: str = Form("upsert"),
+    missing: str = Form("deactivate"),
+    column_mapping: Optional[str] = Form(None),
+    dry_run: bool = Form(False),
     db: Session = Depends(get_db)
 ):
     """
     Upload CSV file and start import task.
+    
+    The file's encoding, delimiter and header are checked before the
+    import is queued. `column_mapping` is a JSON object mapping file
+    columns to product fields, e.g. {"SKU Code": "sku"}.
+    
+    With `mode=full_sync`, products missing from the file are deactivated
+    (or deleted, with `missing=delete`) once the import finishes.
+    
+    With `dry_run=true` nothing is written to the catalog: the rows are
+    staged and the task's `dry_run_summary` describes what would change.
+    See the diff and commit endpoints.
     """
     # Validate file type
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(
-            status_code=400,
-            detail="Only CSV files are allowed"
-        )
+    _check_file_type(file.filename)
+    options = _import_options(mode, missing, _parse_column_mapping(column_mapping), dry_run)
     
     # Generate unique task ID
     task_id = str(uuid.uuid4())
     
-    # Save file temporarily
-    file_path = os.path.join(UPLOAD_DIR, f"{task_id}.csv")
+    # Save file temporarily, keeping its extension so the importer knows the codec
+    file_path = _upload_path(task_id, file.filename)
     
+    # Hash while writing so duplicates can be spotted without re-reading
+    digest = upload_dedup.ContentHasher(settings.upload_part_size_mb * 1024 * 1024)
+    size = 0
     try:
-        contents = await file.read()
         with open(file_path, "wb") as f:
-            f.write(contents)
+            while block := await file.read(1024 * 1024):
+                digest.update(block)
+                size += len(block)
+                f.write(block)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to save file: {str(e)}"
         )
     
+    # Reject files that cannot be imported before queueing anything
+    try:
+        preflight = await run_in_threadpool(run_preflight, file_path, options.get("column_mapping"))
+    except PreflightError as e:
+        os.remove(file_path)
+        raise HTTPException(status_code=400, detail=str(e))
+    options.update(encoding=preflight["encoding"], delimiter=preflight["delimiter"])
+    
     # Create upload task record
     upload_task = UploadTask(
         id=task_id,
         filename=file.filename,
         status="pending",
-        progress=0
+        progress=0,
+        total_size=size,
+        options=options
     )
     db.add(upload_task)
+    
+    # Commits, claims the fingerprint in Redis and queues the task: keep it off the event loop
+    response = await run_in_threadpool(_queue_import, db, upload_task, file_path, digest.hexdigest())
+    response["preflight"] = preflight
+    return response
+
+
+@router.get("", response_model=dict)
+def list_uploads(
+    status: Optional[Literal["uploading", "pending", "processing", "completed", "failed"]] = None,
+    limit: int = Query(50, ge=1, le=100),
+    before: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    List upload tasks, newest first.
+    
+    Pages are keyed on (created_at, id) rather than an offset, so deep
+    pages cost the same as the first one. Pass the returned `next`
+    cursor as `before` to get the following page.
+    """
+    query = db.query(UploadTask)
+    
+    if status:
+        query = query.filter(UploadTask.status == status)
+    
+    if before:
+        created_at, task_id = _parse_history_cursor(before)
+        query = query.filter(tuple_(UploadTask.created_at, UploadTask.id) < (created_at, task_id))
+    
+    tasks = query.order_by(UploadTask.created_at.desc(), UploadTask.id.desc()).limit(limit).all()
+    
+    next_cursor = None
+    if len(tasks) == limit:
+        next_cursor = _history_cursor(tasks[-1])
+    
+    return {
+        "tasks": [task.to_dict() for task in tasks],
+        "next": next_cursor
+    }
+
+
+def _history_cursor(task: UploadTask) -> str:
+    """Build the history cursor that resumes after a task (URL-safe UTC time)."""
+    created_at = task.created_at.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    return f"{created_at}|{task.id}"
+
+
+def _parse_history_cursor(cursor: str):
+    """Split a history cursor into its created_at and task id."""
+    created_at, _, task_id = cursor.partition("|")
+    try:
+        return datetime.fromisoformat(created_at), task_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.post("/initiate", response_model=UploadSession, status_code=201)
+def initiate_upload(upload: UploadInitiate, db: Session = Depends(get_db)):
+    """
+    Start a resumable upload.
+    
+    The client then PUTs numbered parts (in any order, possibly in
+    parallel) and calls complete once all of them have arrived.
+    """
+    _check_file_type(upload.filename)
+    
+    if upload.total_size > settings.max_resumable_upload_size_mb * 1024 * 1024:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds {settings.max_resumable_upload_size_mb} MB"
+        )
+    
+    task_id = str(uuid.uuid4())
+    part_size = upload.part_size or settings.upload_part_size_mb * 1024 * 1024
+    total_parts = math.ceil(upload.total_size / part_size)
+    
+    # Reserve the full size up front so parts can be written at their offsets
+    with open(_upload_path(task_id, upload.filename), "wb") as f:
+        f.truncate(upload.total_size)
+    
+    upload_task = UploadTask(
+        id=task_id,
+        filename=upload.filename,
+        status="uploading",
+        progress=0,
+        total_size=upload.total_size,
+        part_size=part_size,
+        total_parts=total_parts,
+        options=_import_options(upload.mode, upload.missing, upload.column_mapping, upload.dry_run)
+    )
+    db.add(upload_task)
+    db.commit()
+    
+    return {
+        "task_id": task_id,
+        "filename": upload.filename,
+        "part_size": part_size,
+        "total_parts": total_parts
+    }
+
+
+@router.put("/{task_id}/parts/{part_number}")
+async def upload_part(
+    task_id: str,
+    part_number: int,
+    request: Request,
+    x_part_checksum: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload one part of a resumable upload.
+    
+    The request body is the raw part content. If the `X-Part-Checksum`
+    header (SHA-256 hex) is sent, the part is rejected unless it matches.
+    Re-sending a part overwrites it. The body is streamed to a scratch
+    file while it is hashed, and copied into place only once its size and
+    checksum are verified; database work runs in the threadpool.
+    """
+    upload_task = await run_in_threadpool(_get_uploading_task, db, task_id)
+    
+    if not 1 <= part_number <= upload_task.total_parts:
+        raise HTTPException(status_code=400, detail="Part number out of range")
+    
+    offset = (part_number - 1) * upload_task.part_size
+    expected_size = min(upload_task.part_size, upload_task.total_size - offset)
+    
+    scratch_path = os.path.join(UPLOAD_DIR, f"{task_id}.part{part_number}.{uuid.uuid4().hex}.tmp")
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with open(scratch_path, "wb") as scratch:
+            async for data in request.stream():
+                size += len(data)
+                if size > expected_size:
+                    break
+                digest.update(data)
+                scratch.write(data)
+        
+        if size != expected_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Part {part_number} must be {expected_size} bytes"
+            )
+        
+        checksum = digest.hexdigest()
+        if x_part_checksum and x_part_checksum.lower() != checksum:
+            raise HTTPException(status_code=400, detail="Part checksum mismatch")
+        
+        await run_in_threadpool(_store_part, db, task_id, part_number, offset, scratch_path, size, checksum)
+    finally:
+        if os.path.exists(scratch_path):
+            os.remove(scratch_path)
+    
+    return {"part_number": part_number, "size": size, "checksum": checksum}
+
+
+def _store_part(
+    db: Session,
+    task_id: str,
+    part_number: int,
+    offset: int,
+    scratch_path: str,
+    size: int,
+    checksum: str
+):
+    """
+    Copy a verified part into the upload file and record it.
+    
+    The task row is share-locked from the status check to the commit:
+    parts can be stored in parallel, but none can land in the file once
+    `complete` (which locks the row exclusively) has taken it over.
+    """
+    upload_task = _get_uploading_task(db, task_id, lock="share")
+    
+    _copy_at(scratch_path, _upload_path(task_id, upload_task.filename), offset)
+    
+    stmt = insert(UploadPart).values(
+        task_id=task_id,
+        part_number=part_number,
+        size=size,
+        checksum=checksum
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UploadPart.task_id, UploadPart.part_number],
+        set_={"size": stmt.excluded.size, "checksum": stmt.excluded.checksum}
+    )
+    db.execute(stmt)
     db.commit()
+
+
+@router.get("/{task_id}/parts")
+def list_upload_parts(task_id: str, db: Session = Depends(get_db)):
+    """
+    List the parts received so far, so a client can resume an upload.
+    """
+    upload_task = db.query(UploadTask).filter(UploadTask.id == task_id).first()
     
-    # Start Celery task
-    import_csv_task.delay(task_id, file_path, file.filename)
+    if not upload_task or upload_task.total_parts is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    parts = db.query(UploadPart).filter(
+        UploadPart.task_id == task_id
+    ).order_by(UploadPart.part_number).all()
     
     return {
         "task_id": task_id,
-        "filename": file.filename,
+        "status": upload_task.status,
+        "part_size": upload_task.part_size,
+        "total_parts": upload_task.total_parts,
+        "parts": [part.to_dict() for part in parts]
+    }
+
+
+@router.post("/{task_id}/complete", response_model=UploadResponse)
+def complete_upload(task_id: str, db: Session = Depends(get_db)):
+    """
+    Finish a resumable upload and start its import task.
+    
+    The task row is locked until the upload leaves the uploading state,
+    so parts still in flight wait and are then rejected.
+    """
+    upload_task = _get_uploading_task(db, task_id, lock="update")
+    
+    received = db.query(UploadPart).filter(UploadPart.task_id == task_id).count()
+    if received != upload_task.total_parts:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Received {received} of {upload_task.total_parts} parts"
+        )
+    
+    file_path = _upload_path(task_id, upload_task.filename)
+    options = dict(upload_task.options or {})
+    
+    try:
+        preflight = run_preflight(file_path, options.get("column_mapping"))
+    except PreflightError as e:
+        upload_task.status = "failed"
+        upload_task.error_message = str(e)
+        db.commit()
+        os.remove(file_path)
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    options.update(encoding=preflight["encoding"], delimiter=preflight["delimiter"])
+    upload_task.options = options
+    
+    # Derived from the part checksums; the assembled file is not read again
+    checksums = db.execute(
+        select(UploadPart.checksum).where(UploadPart.task_id == task_id).order_by(UploadPart.part_number)
+    ).scalars()
+    content_hash = upload_dedup.combine_part_checksums(checksums)
+    
+    response = _queue_import(db, upload_task, file_path, content_hash)
+    response["preflight"] = preflight
+    return response
+
+
+def _check_file_type(filename: str):
+    """Reject files that are not plain or compressed CSV."""
+    if not upload_suffix(filename):
+        raise HTTPException(
+            status_code=400,
+            detail="Only CSV files are allowed (.csv, .csv.gz, .csv.zst or .zip)"
+        )
+
+
+def _import_options(
+    mode: str,
+    missing: str,
+    column_mapping: Optional[Dict[str, str]] = None,
+    dry_run: bool = False
+) -> dict:
+    """Validate and normalise the import options of an upload."""
+    if mode not in ("upsert", "full_sync"):
+        raise HTTPException(status_code=400, detail="mode must be 'upsert' or 'full_sync'")
+    
+    options = {"mode": mode}
+    
+    if mode == "full_sync":
+        if missing not in ("deactivate", "delete"):
+            raise HTTPException(status_code=400, detail="missing must be 'deactivate' or 'delete'")
+        options["missing"] = missing
+    
+    if column_mapping:
+        options["column_mapping"] = column_mapping
+    
+    if dry_run:
+        options["dry_run"] = True
+    
+    return options
+
+
+def _parse_column_mapping(raw: Optional[str]) -> Optional[Dict[str, str]]:
+    """Parse the JSON column mapping form field."""
+    if not raw:
+        return None
+    
+    try:
+        mapping = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="column_mapping must be a JSON object")
+    
+    if not isinstance(mapping, dict) or not all(
+        isinstance(key, str) and isinstance(value, str) for key, value in mapping.items()
+    ):
+        raise HTTPException(status_code=400, detail="column_mapping must map column names to field names")
+    
+    return mapping
+
+
+def _upload_path(task_id: str, filename: str) -> str:
+    """Get the path an upload is stored under."""
+    return os.path.join(UPLOAD_DIR, f"{task_id}{upload_suffix(filename)}")
+
+
+def _copy_at(source: str, path: str, offset: int):
+    """Copy a file into an existing file at an offset."""
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        with open(source, "rb") as f:
+            while block := f.read(1024 * 1024):
+                offset += os.pwrite(fd, block, offset)
+    finally:
+        os.close(fd)
+
+
+def _get_uploading_task(db: Session, task_id: str, lock: Optional[str] = None) -> UploadTask:
+    """
+    Get a resumable upload that still accepts parts.
+    
+    Args:
+        db: Database session
+        task_id: Upload task
+        lock: Lock the task row until the transaction ends: "share"
+            (FOR SHARE, taken by part uploads) or "update" (FOR UPDATE,
+            taken by complete)
+    """
+    query = db.query(UploadTask).filter(UploadTask.id == task_id)
+    if lock:
+        query = query.with_for_update(read=lock == "share")
+    upload_task = query.first()
+    
+    if not upload_task or upload_task.total_parts is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if upload_task.status != "uploading":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload is already {upload_task.status}"
+        )
+    
+    return upload_task
+
+
+def _queue_import(db: Session, upload_task: UploadTask, file_path: str, content_hash: str) -> dict:
+    """
+    Start the import of an uploaded file, unless its content is already handled.
+    
+    A file identical to one imported successfully with the same options
+    completes at once as a duplicate (if `skip_duplicate_uploads` is on). A file identical to one
+    being imported right now attaches to that import instead of starting
+    another.
+    
+    Args:
+        db: Database session
+        upload_task: Task of the new upload
+        file_path: Path of the stored file
+        content_hash: Content hash of the file (see `upload_dedup.ContentHasher`)
+        
+    Returns:
+        dict: Upload response body
+    """
+    upload_task.content_hash = content_hash
+    import_fingerprint = upload_dedup.fingerprint(content_hash, upload_task.options)
+    response = {
+        "task_id": upload_task.id,
+        "filename": upload_task.filename,
         "message": "Upload started. Use task_id to track progress."
     }
+    
+    if settings.skip_duplicate_uploads:
+        previous = db.query(UploadTask).filter(
+            UploadTask.content_hash == content_hash,
+            UploadTask.options == upload_task.options,
+            UploadTask.status == "completed",
+            UploadTask.outcome == "imported"
+        ).order_by(UploadTask.created_at.desc()).first()
+        
+        if previous:
+            _complete_as_duplicate(db, upload_task, file_path, "duplicate", previous)
+            response["message"] = "Identical file was already imported; nothing to do."
+            return response
+    
+    # Committed before claiming, so a task seen holding a claim is always
+    # visible as pending, and only a finished or purged holder is stale
+    upload_task.status = "pending"
+    db.commit()
+    
+    holder_id = upload_dedup.claim_import(import_fingerprint, upload_task.id)
+    while holder_id:
+        holder = db.query(UploadTask).filter(UploadTask.id == holder_id).first()
+        if holder and holder.status in ("pending", "processing"):
+            _complete_as_duplicate(db, upload_task, file_path, "attached", holder)
+            response["task_id"] = holder.id
+            response["message"] = "Identical file is already being imported. Use task_id to track progress."
+            return response
+        # The holder finished without releasing its claim (e.g. a crashed worker);
+        # if another upload took it over first, look at that one instead
+        holder_id = upload_dedup.claim_import(import_fingerprint, upload_task.id, stale_holder=holder_id)
+    
+    # Celery is only loaded once the first import is queued
+    from backend.tasks.import_tasks import import_csv_task
+    import_csv_task.delay(upload_task.id, file_path, upload_task.filename, upload_task.options)
+    return response
+
+
+def _complete_as_duplicate(
+    db: Session,
+    upload_task: UploadTask,
+    file_path: str,
+    outcome: str,
+    original: UploadTask
+):
+    """Finish an upload without importing it, pointing at the task that did."""
+    upload_task.status = "completed"
+    upload_task.progress = 100
+    upload_task.outcome = outcome
+    upload_task.duplicate_of = original.id
+    upload_task.total_rows = original.total_rows
+    upload_task.processed_rows = 0
+    db.commit()
+    
+    if os.path.exists(file_path):
+        os.remove(file_path)
 
 
 @router.get("/{task_id}/status")
@@ -88,6 +570,113 @@ def get_upload_status(task_id: str, db: Session = Depends(get_db)):
     return task.to_dict()
 
 
+@router.get("/{task_id}/rejects")
+def download_rejects(task_id: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Stream the report of rows an import rejected, as CSV.
+    
+    Columns are line, reason, message and sku. Clients that accept gzip
+    get the stored file as is.
+    """
+    task = db.query(UploadTask).filter(UploadTask.id == task_id).first()
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if task.status in ("uploading", "pending", "processing"):
+        raise HTTPException(status_code=409, detail="Import has not finished yet")
+    
+    path = report_path(UPLOAD_DIR, task_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No rejected rows")
+    
+    headers = {"Content-Disposition": f'attachment; filename="{task_id}-rejects.csv"'}
+    
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return FileResponse(
+            path,
+            media_type="text/csv",
+            headers={**headers, "Content-Encoding": "gzip"}
+        )
+    
+    def decompressed():
+        with gzip.open(path, "rb") as f:
+            while block := f.read(64 * 1024):
+                yield block
+    
+    return StreamingResponse(decompressed(), media_type="text/csv", headers=headers)
+
+
+@router.get("/{task_id}/diff")
+def stream_dry_run_diff(
+    task_id: str,
+    change: Literal["insert", "update", "unchanged"] = "update",
+    limit: int = Query(100, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a sample of a dry run's changes as newline-delimited JSON.
+    
+    Each line holds the change type, SKU, and the product before (null
+    for inserts) and after the import.
+    """
+    _get_dry_run_task(db, task_id)
+    
+    # Fetched before streaming: the session is closed before the body is sent
+    sample = list(staging.diff_sample(db, task_id, change, limit))
+    
+    def lines():
+        for change_row in sample:
+            yield json.dumps(change_row, default=float) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/{task_id}/commit", response_model=UploadResponse, status_code=202)
+def commit_dry_run(task_id: str, db: Session = Depends(get_db)):
+    """
+    Apply a dry run's staged rows to the catalog.
+    
+    The file is not read again; the same task tracks the commit.
+    """
+    # Compare-and-set, so concurrent requests cannot both queue a commit
+    claimed = db.execute(
+        update(UploadTask)
+        .where(UploadTask.id == task_id, UploadTask.status == "completed", UploadTask.outcome == "dry_run")
+        .values(status="pending", outcome=None, error_message=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    
+    if not claimed:
+        _get_dry_run_task(db, task_id)  # 404 or 409
+        raise HTTPException(status_code=409, detail="Dry run is already being committed")
+    
+    upload_task = db.query(UploadTask).filter(UploadTask.id == task_id).one()
+    
+    from backend.tasks.import_tasks import commit_staged_import_task
+    commit_staged_import_task.delay(task_id)
+    
+    return {
+        "task_id": task_id,
+        "filename": upload_task.filename,
+        "message": "Commit started. Use task_id to track progress."
+    }
+
+
+def _get_dry_run_task(db: Session, task_id: str) -> UploadTask:
+    """Get a finished dry run whose staged rows are still uncommitted."""
+    upload_task = db.query(UploadTask).filter(UploadTask.id == task_id).first()
+    
+    if not upload_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if upload_task.status != "completed" or upload_task.outcome != "dry_run":
+        raise HTTPException(status_code=409, detail="Task is not a finished, uncommitted dry run")
+    
+    return upload_task
+
+
 @router.get("/{task_id}/progress")
 async def stream_upload_progress(task_id: str, db: Session = Depends(get_db)):
     """
@@ -2,13 +2,17 @@
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 from backend.database import get_db
+from backend.instrumentation import TimedRoute
 from backend.models import Webhook
-from backend.tasks.webhook_tasks import test_webhook_task
+from backend.config import settings
+from backend.webhook_probe import probe_webhook
+from backend.webhook_registry import invalidate as invalidate_registry
 
-router = APIRouter(prefix="/api/webhooks", tags=["webhooks"])
+router = APIRouter(prefix="/api/webhooks", tags=["webhooks"], route_class=TimedRoute)
 
 
 # Pydantic schemas
@@ -16,12 +20,16 @@ class WebhookCreate(BaseModel):
     url: str
     event_type: str
     enabled: bool = True
+    batch_window_seconds: Optional[int] = Field(None, ge=1, le=3600)
+    batch_max_events: Optional[int] = Field(None, ge=1)
 
 
 class WebhookUpdate(BaseModel):
     url: Optional[str] = None
     event_type: Optional[str] = None
     enabled: Optional[bool] = None
+    batch_window_seconds: Optional[int] = Field(None, ge=1, le=3600)
+    batch_max_events: Optional[int] = Field(None, ge=1)
 
 
 class WebhookResponse(BaseModel):
@@ -29,6 +37,8 @@ class WebhookResponse(BaseModel):
     url: str
     event_type: str
     enabled: bool
+    batch_window_seconds: Optional[int]
+    batch_max_events: Optional[int]
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
 
@@ -67,6 +77,7 @@ def create_webhook(webhook_data: WebhookCreate, db: Session = Depends(get_db)):
     db.add(webhook)
     db.commit()
     db.refresh(webhook)
+    invalidate_registry()
     
     return webhook
 
@@ -92,6 +103,7 @@ def update_webhook(
     
     db.commit()
     db.refresh(webhook)
+    invalidate_registry()
     
     return webhook
 
@@ -108,21 +120,28 @@ def delete_webhook(webhook_id: int, db: Session = Depends(get_db)):
     
     db.delete(webhook)
     db.commit()
+    invalidate_registry()
     
     return None
 
 
 @router.post("/{webhook_id}/test")
-def test_webhook(webhook_id: int, db: Session = Depends(get_db)):
+async def test_webhook(webhook_id: int, db: Session = Depends(get_db)):
     """
     Test a webhook by sending a sample payload.
+    
+    The request is made from the event loop with its own short timeout,
+    so slow receivers do not tie up worker threads. The lookup is a
+    blocking query and runs in the threadpool.
     """
-    webhook = db.query(Webhook).filter(Webhook.id == webhook_id).first()
+    url = await run_in_threadpool(_webhook_url, db, webhook_id)
     
-    if not webhook:
+    if url is None:
         raise HTTPException(status_code=404, detail="Webhook not found")
     
-    # Run test synchronously to get immediate result
-    result = test_webhook_task.apply(args=[webhook.url]).get(timeout=15)
-    
-    return result
+    return await probe_webhook(url, settings.webhook_test_timeout_seconds)
+
+
+def _webhook_url(db: Session, webhook_id: int) -> Optional[str]:
+    """Get a webhook's URL, or None if it does not exist."""
+    return db.query(Webhook.url).filter(Webhook.id == webhook_id).scalar()
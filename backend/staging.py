@@ -0,0 +1,225 @@
+"""Staged (dry-run) imports: bulk load, diff against products, apply later."""
+import csv
+import io
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import text
+from backend.csv_schema import ProductRow
+
+# Rows of a dry run, one per line; the last line wins for repeated SKUs
+LATEST_STAGED = """
+    SELECT DISTINCT ON (sku_lower) sku_lower, sku, name, description, price
+    FROM import_staging
+    WHERE task_id = :task_id
+    ORDER BY sku_lower, line DESC
+"""
+
+# Same product values as the importer would write
+CHANGED = "(p.name, p.description, p.price, p.active) IS DISTINCT FROM (s.name, s.description, s.price, true)"
+
+# Percentage price change of updated products, by bucket
+PRICE_BUCKETS = (
+    ("down_over_50", "pct < -50"),
+    ("down_10_to_50", "pct >= -50 AND pct < -10"),
+    ("down_under_10", "pct >= -10 AND pct < 0"),
+    ("up_under_10", "pct > 0 AND pct <= 10"),
+    ("up_10_to_50", "pct > 10 AND pct <= 50"),
+    ("up_over_50", "pct > 50"),
+)
+
+CHANGE_TYPES = ("insert", "update", "unchanged")
+
+
+def stage_rows(db, task_id: str, rows: Iterable[Tuple[int, int, ProductRow]]):
+    """
+    Bulk-load validated rows into the staging table with COPY.
+
+    Args:
+        db: Database session
+        task_id: Dry-run task
+        rows: (line number, lock bucket, product) triples
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for line, bucket, product in rows:
+        writer.writerow((
+            task_id, line, bucket, product.sku, product.sku.lower(),
+            product.name, product.description, product.price
+        ))
+    buffer.seek(0)
+
+    # COPY needs the DBAPI cursor; this runs in the session's transaction
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY import_staging (task_id, line, bucket, sku, sku_lower, name, description, price) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def diff_summary(db, task_id: str, missing: Optional[str] = None) -> Dict:
+    """
+    Compare staged rows with the catalog.
+
+    Args:
+        db: Database session
+        task_id: Dry-run task
+        missing: For full-sync dry runs, "deactivate" or "delete"
+
+    Returns:
+        dict: inserts, updates, unchanged, price_changes (per bucket) and,
+        for full sync, the number of products that would be removed
+    """
+    bucket_counts = ",\n".join(
+        f"count(*) FILTER (WHERE is_update AND {condition}) AS {name}"
+        for name, condition in PRICE_BUCKETS
+    )
+    row = db.execute(text(f"""
+        WITH staged AS ({LATEST_STAGED}),
+        compared AS (
+            SELECT
+                p.id IS NULL AS is_insert,
+                p.id IS NOT NULL AND {CHANGED} AS is_update,
+                CASE WHEN p.price <> 0 THEN (s.price - p.price) / p.price * 100 END AS pct
+            FROM staged s
+            LEFT JOIN products p ON lower(p.sku) = s.sku_lower
+        )
+        SELECT
+            count(*) FILTER (WHERE is_insert) AS inserts,
+            count(*) FILTER (WHERE is_update) AS updates,
+            count(*) FILTER (WHERE NOT is_insert AND NOT is_update) AS unchanged,
+            {bucket_counts}
+        FROM compared
+    """), {"task_id": task_id}).mappings().one()
+
+    summary = {
+        "inserts": row["inserts"],
+        "updates": row["updates"],
+        "unchanged": row["unchanged"],
+        "price_changes": {name: row[name] for name, _ in PRICE_BUCKETS},
+    }
+
+    if missing:
+        only_active = "AND p.active" if missing == "deactivate" else ""
+        summary["missing"] = db.execute(text(f"""
+            SELECT count(*) FROM products p
+            WHERE NOT EXISTS (
+                SELECT 1 FROM import_staging s
+                WHERE s.task_id = :task_id AND s.sku_lower = lower(p.sku)
+            ) {only_active}
+        """), {"task_id": task_id}).scalar()
+
+    return summary
+
+
+def diff_sample(db, task_id: str, change: str, limit: int) -> Iterator[Dict]:
+    """
+    Yield staged changes of one type with before and after values.
+
+    Args:
+        db: Database session
+        task_id: Dry-run task
+        change: "insert", "update" or "unchanged"
+        limit: Maximum number of changes
+
+    Yields:
+        dict: change, sku, before (None for inserts) and after
+    """
+    condition = {
+        "insert": "p.id IS NULL",
+        "update": f"p.id IS NOT NULL AND {CHANGED}",
+        "unchanged": f"p.id IS NOT NULL AND NOT {CHANGED}",
+    }[change]
+
+    result = db.execute(text(f"""
+        WITH staged AS ({LATEST_STAGED})
+        SELECT s.sku, s.name, s.description, s.price,
+               p.name AS old_name, p.description AS old_description,
+               p.price AS old_price, p.active AS old_active
+        FROM staged s
+        LEFT JOIN products p ON lower(p.sku) = s.sku_lower
+        WHERE {condition}
+        ORDER BY s.sku_lower
+        LIMIT :limit
+    """), {"task_id": task_id, "limit": limit})
+
+    for row in result.mappings():
+        before = None
+        if change != "insert":
+            before = {
+                "name": row["old_name"],
+                "description": row["old_description"],
+                "price": row["old_price"],
+                "active": row["old_active"],
+            }
+        yield {
+            "change": change,
+            "sku": row["sku"],
+            "before": before,
+            "after": {
+                "name": row["name"],
+                "description": row["description"],
+                "price": row["price"],
+                "active": True,
+            },
+        }
+
+
+def staged_count(db, task_id: str) -> int:
+    """Count the distinct SKUs staged for a task."""
+    return db.execute(text(
+        "SELECT count(DISTINCT sku_lower) FROM import_staging WHERE task_id = :task_id"
+    ), {"task_id": task_id}).scalar()
+
+
+def staged_buckets(db, task_id: str) -> List[int]:
+    """List the lock buckets a task has staged rows in."""
+    return list(db.execute(text(
+        "SELECT DISTINCT bucket FROM import_staging WHERE task_id = :task_id ORDER BY bucket"
+    ), {"task_id": task_id}).scalars())
+
+
+def apply_bucket(db, task_id: str, bucket: int, record_seen: bool):
+    """
+    Upsert one lock bucket of staged rows into products (does not commit).
+
+    Args:
+        db: Database session
+        task_id: Dry-run task being committed
+        bucket: Lock bucket
+        record_seen: Also record the SKUs for a full sync
+    """
+    params = {"task_id": task_id, "bucket": bucket}
+    db.execute(text("""
+        INSERT INTO products (sku, name, description, price, active)
+        SELECT DISTINCT ON (sku_lower) sku, name, description, price, true
+        FROM import_staging
+        WHERE task_id = :task_id AND bucket = :bucket
+        ORDER BY sku_lower, line DESC
+        ON CONFLICT (lower(sku)) DO UPDATE SET
+            name = EXCLUDED.name,
+            description = EXCLUDED.description,
+            price = EXCLUDED.price,
+            active = EXCLUDED.active,
+            updated_at = now(),
+            change_seq = nextval('product_change_seq'),
+            change_xid = pg_current_xact_id()
+        WHERE (products.name, products.description, products.price, products.active)
+            IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.description, EXCLUDED.price, EXCLUDED.active)
+    """), params)
+
+    if record_seen:
+        db.execute(text("""
+            INSERT INTO import_seen_skus (task_id, sku_lower)
+            SELECT DISTINCT task_id, sku_lower
+            FROM import_staging
+            WHERE task_id = :task_id AND bucket = :bucket
+            ON CONFLICT DO NOTHING
+        """), params)
+
+
+def clear(db, task_id: str):
+    """Delete the staged rows of a task (does not commit)."""
+    db.execute(text("DELETE FROM import_staging WHERE task_id = :task_id"), {"task_id": task_id})
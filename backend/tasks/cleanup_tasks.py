@@ -0,0 +1,205 @@
+"""Celery tasks that keep upload history, the uploads directory and tombstones bounded."""
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, select
+from backend import staging
+from backend.celery_app import celery_app
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.models import ImportSeenSku, ProductTombstone, UploadPart, UploadTask
+from backend.rejects import report_path
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("completed", "failed")
+ACTIVE = ("uploading", "pending", "processing")
+
+# Files younger than this are left alone; their task row may not be committed yet
+ORPHAN_FILE_GRACE_SECONDS = 3600
+
+
+@celery_app.task(name="cleanup_uploads")
+def cleanup_uploads_task():
+    """
+    Expire abandoned uploads, purge old history and sweep orphaned files.
+
+    - resumable uploads still incomplete after `upload_session_ttl_hours`
+      and running imports silent for `stale_import_hours` (their worker
+      died) are marked failed; queued imports are left alone;
+    - staged rows of dry runs not committed within `dry_run_ttl_hours`
+      are dropped;
+    - finished tasks older than `upload_retention_days` are deleted in
+      batches, with their parts and reject reports;
+    - change feed tombstones older than `tombstone_retention_days` are
+      deleted in batches;
+    - files in the uploads directory whose task is finished or gone are
+      removed.
+
+    Returns:
+        dict: Number of rows and files affected by each step
+    """
+    db = SessionLocal()
+    now = datetime.now(timezone.utc)
+
+    try:
+        result = {
+            "expired_sessions": _fail_stale(
+                db, ["uploading"], now - timedelta(hours=settings.upload_session_ttl_hours),
+                "Upload session expired before all parts arrived"
+            ),
+            # Pending imports are only waiting in the queue; their message still runs
+            "lost_imports": _fail_stale(
+                db, ["processing"], now - timedelta(hours=settings.stale_import_hours),
+                "Import was interrupted (worker lost)"
+            ),
+            "expired_dry_runs": _expire_dry_runs(db, now - timedelta(hours=settings.dry_run_ttl_hours)),
+            "purged_tasks": _purge_finished(db, now - timedelta(days=settings.upload_retention_days)),
+            "purged_tombstones": _purge_tombstones(
+                db, now - timedelta(days=settings.tombstone_retention_days)
+            ),
+        }
+        result["removed_files"] = _sweep_files(db, settings.upload_dir)
+    finally:
+        db.close()
+
+    logger.info("Upload cleanup: %s", result)
+    return result
+
+
+def _last_activity():
+    """When a task last changed; progress updates bump updated_at."""
+    return func.coalesce(UploadTask.updated_at, UploadTask.created_at)
+
+
+def _fail_stale(db, statuses, cutoff: datetime, message: str) -> int:
+    """Mark tasks stuck in the given states since before the cutoff as failed."""
+    tasks = db.query(UploadTask).filter(
+        UploadTask.status.in_(statuses),
+        _last_activity() < cutoff
+    ).all()
+
+    for task in tasks:
+        task.status = "failed"
+        task.error_message = message
+        db.execute(delete(UploadPart).where(UploadPart.task_id == task.id))
+        db.execute(delete(ImportSeenSku).where(ImportSeenSku.task_id == task.id))
+    db.commit()
+
+    return len(tasks)
+
+
+def _expire_dry_runs(db, cutoff: datetime) -> int:
+    """Drop the staged rows of dry runs nobody committed in time."""
+    tasks = db.query(UploadTask).filter(
+        UploadTask.status == "completed",
+        UploadTask.outcome == "dry_run",
+        _last_activity() < cutoff
+    ).all()
+
+    for task in tasks:
+        staging.clear(db, task.id)
+        task.outcome = "dry_run_expired"
+        db.commit()
+
+    return len(tasks)
+
+
+def _purge_finished(db, cutoff: datetime) -> int:
+    """Delete finished tasks created before the cutoff, one batch per transaction."""
+    purged = 0
+
+    while True:
+        batch = select(UploadTask.id).where(
+            UploadTask.status.in_(FINISHED),
+            UploadTask.created_at < cutoff
+        ).order_by(UploadTask.created_at).limit(settings.upload_cleanup_batch_size)
+
+        task_ids = db.execute(
+            delete(UploadTask).where(UploadTask.id.in_(batch)).returning(UploadTask.id)
+        ).scalars().all()
+        if not task_ids:
+            break
+
+        db.execute(delete(UploadPart).where(UploadPart.task_id.in_(task_ids)))
+        for task_id in task_ids:
+            staging.clear(db, task_id)
+        db.commit()
+
+        for task_id in task_ids:
+            _remove(report_path(settings.upload_dir, task_id))
+        purged += len(task_ids)
+
+        if len(task_ids) < settings.upload_cleanup_batch_size:
+            break
+
+    return purged
+
+
+def _purge_tombstones(db, cutoff: datetime) -> int:
+    """Delete tombstones of products deleted before the cutoff, one batch per transaction."""
+    purged = 0
+
+    while True:
+        batch = select(ProductTombstone.change_seq).where(
+            ProductTombstone.deleted_at < cutoff
+        ).order_by(ProductTombstone.change_seq).limit(settings.upload_cleanup_batch_size)
+
+        deleted = db.execute(
+            delete(ProductTombstone).where(ProductTombstone.change_seq.in_(batch))
+        ).rowcount
+        db.commit()
+        purged += deleted
+
+        if deleted < settings.upload_cleanup_batch_size:
+            break
+
+    return purged
+
+
+def _sweep_files(db, directory: str) -> int:
+    """
+    Remove uploads and reports that no live task refers to.
+
+    Upload files are kept while their task is still uploading or being
+    imported; reject reports are kept as long as their task exists.
+    """
+    if not os.path.isdir(directory):
+        return 0
+
+    grace_cutoff = time.time() - ORPHAN_FILE_GRACE_SECONDS
+    candidates = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < grace_cutoff:
+                candidates[entry.path] = entry.name.split(".", 1)[0]
+
+    statuses = {}
+    task_ids = list(set(candidates.values()))
+    for start in range(0, len(task_ids), settings.upload_cleanup_batch_size):
+        chunk = task_ids[start:start + settings.upload_cleanup_batch_size]
+        statuses.update(
+            db.query(UploadTask.id, UploadTask.status).filter(UploadTask.id.in_(chunk)).all()
+        )
+
+    removed = 0
+    for path, task_id in candidates.items():
+        status = statuses.get(task_id)
+        if path.endswith(".rejects.csv.gz"):
+            orphaned = status is None
+        else:
+            orphaned = status not in ACTIVE
+        if orphaned and _remove(path):
+            removed += 1
+
+    return removed
+
+
+def _remove(path: str) -> bool:
+    """Delete a file if it exists."""
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
@@ -1,26 +1,62 @@
 """Celery tasks for CSV import processing."""
 import csv
+import functools
+import logging
 import os
-from typing import List, Dict
-from sqlalchemy import func
+import random
+import resource
+import time
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import delete, exists, func, text, tuple_, update
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from backend import catalog_version, change_feed, staging, upload_dedup
 from backend.celery_app import celery_app
+from backend.compression import open_csv
+from backend.config import settings
+from backend.csv_schema import ColumnIndex, ProductRow, RowChunk, RowError, field_value, map_header, parse_row
 from backend.database import SessionLocal
-from backend.models import Product, UploadTask
-from backend.tasks.webhook_tasks import trigger_webhooks
+from backend.metrics import IMPORT_CHUNK_DURATION, IMPORT_ROWS, IMPORT_WRITE_RETRIES
+from backend.models import PRODUCT_CHANGE_SEQ, ImportSeenSku, Product, UploadTask
+from backend.outbox import enqueue_event
+from backend.rejects import RejectReport, report_path
+
+logger = logging.getLogger(__name__)
+
+# First key of the two-key advisory locks that guard SKU buckets
+IMPORT_LOCK_NAMESPACE = 7_401_039
+# Deadlock detected, serialization failure
+RETRYABLE_PGCODES = {"40P01", "40001"}
+WRITE_ATTEMPTS = 5
+# Chunks never shrink below this under memory pressure
+MIN_CHUNK_SIZE = 500
+PAGE_SIZE = resource.getpagesize()
 
 
 @celery_app.task(bind=True, name="import_csv")
-def import_csv_task(self, task_id: str, file_path: str, filename: str):
+def import_csv_task(self, task_id: str, file_path: str, filename: str, options: Optional[Dict] = None):
     """
     Import CSV file in chunks.
     
+    Gzip, zstd and zip uploads are decompressed as they are read.
+    
     Args:
         task_id: Unique task identifier
-        file_path: Path to uploaded CSV file
+        file_path: Path to uploaded CSV file (plain or compressed)
         filename: Original filename
+        options: Import options: "encoding", "delimiter" and "column_mapping"
+            as found by preflight, and "mode"; {"mode": "full_sync",
+            "missing": "deactivate" or "delete"} also removes products
+            absent from the file. With "dry_run", rows are only staged and
+            diffed against the catalog; see `commit_staged_import_task`.
     """
     db = SessionLocal()
+    options = options or {"mode": "upsert"}
+    full_sync = options.get("mode") == "full_sync"
+    dry_run = options.get("dry_run", False)
+    import_fingerprint = None
+    rejects = None
     
     try:
         # Update task status to processing
@@ -37,56 +73,113 @@ def import_csv_task(self, task_id: str, file_path: str, filename: str):
         else:
             upload_task.status = "processing"
             db.commit()
+        if upload_task.content_hash:
+            import_fingerprint = upload_dedup.fingerprint(upload_task.content_hash, upload_task.options)
         
-        # Count total rows first
-        with open(file_path, 'r', encoding='utf-8') as f:
-            total_rows = sum(1 for _ in csv.DictReader(f))
-        
-        upload_task.total_rows = total_rows
-        db.commit()
+        # Progress is measured in (compressed) bytes read, so no counting pass is needed
+        total_bytes = os.path.getsize(file_path) or 1
         
         # Process CSV in chunks
-        chunk_size = 10000
+        chunk_size = settings.chunk_size
         processed = 0
+        peak_rss_mb = _current_rss_mb()
+        rejects = RejectReport(report_path(os.path.dirname(file_path), task_id))
+        if dry_run:
+            write_chunk = functools.partial(_stage_chunk, db, task_id=task_id, rejects=rejects)
+        else:
+            write_chunk = functools.partial(
+                _process_chunk, db, seen_task_id=task_id if full_sync else None, rejects=rejects
+            )
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            chunk = []
+        csv_file, raw = open_csv(file_path, options.get("encoding", "utf-8"))
+        with csv_file, raw:
+            # Positional rows; the header is resolved to field indexes once
+            reader = csv.reader(csv_file, delimiter=options.get("delimiter", ","))
+            header = next(reader, [])
+            columns = ColumnIndex(map_header(header, options.get("column_mapping")))
+            chunk = RowChunk(columns)
+            last_line = reader.line_num
             
-            for row in reader:
-                chunk.append(row)
+            for values in reader:
+                if values:
+                    # Rows may span lines; record the one they start on
+                    chunk.append(last_line + 1, values)
+                last_line = reader.line_num
                 
                 if len(chunk) >= chunk_size:
-                    _process_chunk(db, chunk)
+                    write_chunk(chunk)
                     processed += len(chunk)
+                    chunk = RowChunk(columns)
+                    
+                    rss_mb = _current_rss_mb()
+                    peak_rss_mb = max(peak_rss_mb, rss_mb)
+                    chunk_size = _next_chunk_size(chunk_size, rss_mb)
                     
                     # Update progress
-                    progress = int((processed / total_rows) * 100)
+                    progress = min(99, int((raw.tell() / total_bytes) * 100))
                     upload_task.progress = progress
                     upload_task.processed_rows = processed
+                    upload_task.rejected_rows = rejects.total
+                    upload_task.reject_counts = dict(rejects.counts)
+                    upload_task.peak_rss_mb = peak_rss_mb
                     db.commit()
-                    
-                    chunk = []
             
             # Process remaining rows
             if chunk:
-                _process_chunk(db, chunk)
+                write_chunk(chunk)
                 processed += len(chunk)
-                upload_task.processed_rows = processed
-                upload_task.progress = 100
-                db.commit()
+                peak_rss_mb = max(peak_rss_mb, _current_rss_mb())
+        rejects.close()
         
-        # Mark as completed
-        upload_task.status = "completed"
+        total_rows = processed
+        upload_task.total_rows = total_rows
+        upload_task.processed_rows = processed
+        upload_task.rejected_rows = rejects.total
+        upload_task.reject_counts = dict(rejects.counts)
+        upload_task.peak_rss_mb = peak_rss_mb
+        upload_task.progress = 100
         db.commit()
         
-        # Trigger webhooks
-        trigger_webhooks.delay("upload_complete", {
+        if dry_run:
+            # Nothing is written to products until the dry run is committed
+            upload_task.dry_run_summary = staging.diff_summary(
+                db, task_id, options.get("missing") if full_sync else None
+            )
+            upload_task.status = "completed"
+            upload_task.outcome = "dry_run"
+            db.commit()
+            
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            
+            return {
+                "status": "completed",
+                "total_rows": total_rows,
+                "rejected_rows": rejects.total,
+                "dry_run_summary": upload_task.dry_run_summary
+            }
+        
+        # Remove missing products in the same transaction that completes the task
+        deactivated = 0
+        if full_sync:
+            deactivated = _remove_missing_products(db, task_id, options.get("missing", "deactivate"))
+        
+        # Mark as completed and record the webhook event with it
+        upload_task.status = "completed"
+        upload_task.outcome = "imported"
+        upload_task.deactivated_rows = deactivated
+        enqueue_event(db, "upload_complete", {
             "task_id": task_id,
             "filename": filename,
             "total_rows": total_rows,
+            "mode": options.get("mode"),
+            "deactivated_rows": deactivated,
+            "rejected_rows": rejects.total,
             "status": "completed"
         })
+        db.commit()
+        if deactivated:
+            catalog_version.bump()
         
         # Clean up file
         if os.path.exists(file_path):
@@ -95,16 +188,29 @@ def import_csv_task(self, task_id: str, file_path: str, filename: str):
         return {
             "status": "completed",
             "total_rows": total_rows,
-            "processed_rows": processed
+            "processed_rows": processed,
+            "rejected_rows": rejects.total,
+            "deactivated_rows": deactivated
         }
         
     except Exception as e:
+        # A failed statement aborts the transaction
+        db.rollback()
+        
+        # Keep the rows rejected so far for inspection
+        if rejects is not None:
+            rejects.close()
+        
         # Update task with error
         upload_task = db.query(UploadTask).filter(UploadTask.id == task_id).first()
         if upload_task:
             upload_task.status = "failed"
             upload_task.error_message = str(e)
-            db.commit()
+        if full_sync:
+            _clear_seen_skus(db, task_id)
+        if dry_run:
+            staging.clear(db, task_id)
+        db.commit()
         
         # Clean up file
         if os.path.exists(file_path):
@@ -113,54 +219,310 @@ def import_csv_task(self, task_id: str, file_path: str, filename: str):
         raise e
     
     finally:
+        # Let identical uploads be imported (or skipped) again
+        if import_fingerprint:
+            upload_dedup.release_import(import_fingerprint, task_id)
         db.close()
 
 
-def _process_chunk(db, chunk: List[Dict]):
+def _process_chunk(
+    db,
+    chunk: RowChunk,
+    seen_task_id: Optional[str] = None,
+    rejects: Optional[RejectReport] = None
+):
     """
     Process a chunk of CSV rows using bulk upsert.
     
     Args:
         db: Database session
-        chunk: List of row dictionaries
+        chunk: Rows with their line numbers and column positions
+        seen_task_id: Full-sync task to record the chunk's SKUs for
+        rejects: Report to record invalid rows in
+        
+    Returns:
+        int: Number of valid rows written
     """
-    products_data = []
+    with IMPORT_CHUNK_DURATION.time():
+        imported = _upsert_chunk(db, chunk, seen_task_id, rejects)
+    catalog_version.bump()
     
-    for row in chunk:
-        try:
-            # Validate and prepare data
-            product_data = {
-                "sku": row.get("sku", "").strip(),
-                "name": row.get("name", "").strip(),
-                "description": row.get("description", "").strip() or None,
-                "price": float(row.get("price", 0)),
-                "active": True  # Default to active
-            }
-            
-            if not product_data["sku"] or not product_data["name"]:
-                continue  # Skip invalid rows
-            
-            products_data.append(product_data)
-            
-        except (ValueError, KeyError) as e:
-            # Skip invalid rows
-            continue
-    
-    if not products_data:
-        return
+    IMPORT_ROWS.labels("imported").inc(imported)
+    IMPORT_ROWS.labels("rejected").inc(len(chunk) - imported)
+    return imported
 
+
+def _upsert_chunk(
+    db,
+    chunk: RowChunk,
+    seen_task_id: Optional[str] = None,
+    rejects: Optional[RejectReport] = None
+) -> int:
+    """Validate a chunk and upsert its products, returning the valid row count."""
     # Deduplicate within the chunk (keep last occurrence)
     # This prevents "ON CONFLICT DO UPDATE command cannot affect row a second time"
     unique_products = {}
-    for p in products_data:
-        sku_key = p["sku"].lower()
-        unique_products[sku_key] = p
+    valid_rows = 0
+    
+    for _, product in _valid_rows(chunk, rejects):
+        unique_products[product.sku.lower()] = product
+        valid_rows += 1
     
-    products_data = list(unique_products.values())
+    if not unique_products:
+        return 0
     
+    # Group rows by lock bucket, sorted by lower(sku) within each bucket
+    buckets = {}
+    for sku_key in sorted(unique_products):
+        buckets.setdefault(_lock_bucket(sku_key), []).append(unique_products[sku_key])
+    
+    # Write free buckets first, then wait for those other imports are holding
+    pending = sorted(buckets)
+    for blocking in (False, True):
+        busy = []
+        for bucket in pending:
+            if not _write_bucket(db, bucket, buckets[bucket], seen_task_id, blocking):
+                busy.append(bucket)
+        pending = busy
+    
+    return valid_rows
+
+
+def _valid_rows(chunk: RowChunk, rejects: Optional[RejectReport]) -> Iterator[Tuple[int, ProductRow]]:
+    """Yield (line number, product) for the valid rows of a chunk, reporting the rest."""
+    for line, values in zip(chunk.lines, chunk.rows):
+        try:
+            product = parse_row(values, chunk.columns)
+        except RowError as e:
+            # Skip invalid rows, noting why
+            if rejects is not None:
+                rejects.add(line, e.reason, str(e), field_value(values, chunk.columns.sku))
+            continue
+        yield line, product
+
+
+def _stage_chunk(db, chunk: RowChunk, task_id: str, rejects: Optional[RejectReport] = None) -> int:
+    """
+    Copy the valid rows of a chunk into the dry-run staging table.
+    
+    Returns:
+        int: Number of valid rows staged
+    """
+    staged = [
+        (line, _lock_bucket(product.sku.lower()), product)
+        for line, product in _valid_rows(chunk, rejects)
+    ]
+    if staged:
+        staging.stage_rows(db, task_id, staged)
+    db.commit()
+    return len(staged)
+
+
+@celery_app.task(bind=True, name="commit_staged_import")
+def commit_staged_import_task(self, task_id: str):
+    """
+    Apply a dry run's staged rows to the catalog without re-reading the file.
+    
+    Rows are upserted one lock bucket at a time with INSERT ... SELECT,
+    under the same advisory locks as regular imports. The staging table is
+    unlogged, so a database crash empties it: the staged SKUs are counted
+    against the dry-run summary first, and a dry run that lost rows fails
+    instead of committing a partial catalog.
+    
+    Args:
+        task_id: Dry-run task to commit
+    """
+    db = SessionLocal()
+    
+    try:
+        upload_task = db.query(UploadTask).filter(UploadTask.id == task_id).one()
+        
+        summary = upload_task.dry_run_summary or {}
+        expected = sum(summary.get(key, 0) for key in ("inserts", "updates", "unchanged"))
+        staged = staging.staged_count(db, task_id)
+        if staged != expected:
+            upload_task.status = "failed"
+            upload_task.error_message = (
+                f"Commit failed: {staged} of {expected} staged products are left, "
+                "run the dry run again"
+            )
+            staging.clear(db, task_id)
+            db.commit()
+            return {"status": "failed", "staged": staged, "expected": expected}
+        
+        upload_task.status = "processing"
+        upload_task.progress = 0
+        db.commit()
+        
+        options = upload_task.options or {}
+        full_sync = options.get("mode") == "full_sync"
+        
+        def apply(bucket):
+            return lambda: staging.apply_bucket(db, task_id, bucket, record_seen=full_sync)
+        
+        # Buckets as staged, which need not match the current bucket setting
+        pending = staging.staged_buckets(db, task_id)
+        total = len(pending)
+        done = 0
+        for blocking in (False, True):
+            busy = []
+            for bucket in pending:
+                if _locked_write(db, bucket, blocking, apply(bucket)):
+                    done += 1
+                    upload_task.progress = min(99, int(done / total * 100))
+                    db.commit()
+                else:
+                    busy.append(bucket)
+            pending = busy
+        
+        deactivated = 0
+        if full_sync:
+            deactivated = _remove_missing_products(db, task_id, options.get("missing", "deactivate"))
+        staging.clear(db, task_id)
+        
+        upload_task.status = "completed"
+        upload_task.outcome = "imported"
+        upload_task.progress = 100
+        upload_task.deactivated_rows = deactivated
+        enqueue_event(db, "upload_complete", {
+            "task_id": task_id,
+            "filename": upload_task.filename,
+            "total_rows": upload_task.total_rows,
+            "mode": options.get("mode"),
+            "deactivated_rows": deactivated,
+            "rejected_rows": upload_task.rejected_rows,
+            "status": "completed"
+        })
+        db.commit()
+        catalog_version.bump()
+        
+        return {"status": "completed", "deactivated_rows": deactivated}
+    
+    except Exception as e:
+        # The failed statement aborted the transaction
+        db.rollback()
+        
+        # Back to an uncommitted dry run with its staged rows, so the commit
+        # can be retried; buckets already applied are upserted again as no-ops
+        upload_task = db.query(UploadTask).filter(UploadTask.id == task_id).first()
+        if upload_task:
+            upload_task.status = "completed"
+            upload_task.outcome = "dry_run"
+            upload_task.error_message = f"Commit failed: {e}"
+        _clear_seen_skus(db, task_id)
+        db.commit()
+        raise e
+    
+    finally:
+        db.close()
+
+
+def _current_rss_mb() -> int:
+    """Get the resident memory of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE // (1024 * 1024)
+    except OSError:
+        # No /proc (e.g. macOS): fall back to the peak, in bytes there
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 * 1024)
+
+
+def _next_chunk_size(chunk_size: int, rss_mb: int) -> int:
+    """
+    Adapt the chunk size to the worker's memory use.
+    
+    Halves the chunk when RSS is above 80% of `import_memory_limit_mb`
+    and grows it back towards `chunk_size` once RSS is below half.
+    """
+    limit = settings.import_memory_limit_mb
+    if not limit:
+        return chunk_size
+    
+    if rss_mb > limit * 0.8 and chunk_size > MIN_CHUNK_SIZE:
+        logger.warning("Import worker at %s MB of %s MB; shrinking chunks to %s rows",
+                       rss_mb, limit, max(MIN_CHUNK_SIZE, chunk_size // 2))
+        return max(MIN_CHUNK_SIZE, chunk_size // 2)
+    
+    if rss_mb < limit * 0.5 and chunk_size < settings.chunk_size:
+        return min(settings.chunk_size, chunk_size * 2)
+    
+    return chunk_size
+
+
+def _lock_bucket(sku_key: str) -> int:
+    """Map a lower-cased SKU to its advisory lock bucket."""
+    return zlib.crc32(sku_key.encode()) % settings.import_lock_buckets
+
+
+def _write_bucket(db, bucket: int, products: List[ProductRow], seen_task_id: Optional[str], blocking: bool) -> bool:
+    """
+    Upsert one lock bucket's products in their own transaction.
+    
+    Args:
+        db: Database session
+        bucket: Lock bucket of all the products
+        products: Products sorted by lower(sku)
+        seen_task_id: Full-sync task to record the SKUs for
+        blocking: Wait for the lock instead of giving up if it is taken
+        
+    Returns:
+        bool: False if the bucket was busy and nothing was written
+    """
+    return _locked_write(db, bucket, blocking, lambda: _upsert_products(db, products, seen_task_id))
+
+
+def _locked_write(db, bucket: int, blocking: bool, write: Callable[[], None]) -> bool:
+    """
+    Run writes to one SKU bucket in a transaction holding its advisory lock.
+    
+    The lock keeps concurrent imports from touching the same rows at the
+    same time; each transaction holds only one bucket, so imports cannot
+    deadlock on each other. Deadlocks and serialization failures with
+    other writers are retried.
+    
+    Args:
+        db: Database session
+        bucket: Lock bucket
+        blocking: Wait for the lock instead of giving up if it is taken
+        write: Statements to run (without committing)
+        
+    Returns:
+        bool: False if the bucket was busy and nothing was written
+    """
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        try:
+            if blocking:
+                db.execute(
+                    text("SELECT pg_advisory_xact_lock(:namespace, :bucket)"),
+                    {"namespace": IMPORT_LOCK_NAMESPACE, "bucket": bucket}
+                )
+            elif not db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:namespace, :bucket)"),
+                {"namespace": IMPORT_LOCK_NAMESPACE, "bucket": bucket}
+            ).scalar():
+                return False
+            
+            write()
+            db.commit()
+            return True
+        
+        except DBAPIError as e:
+            if getattr(e.orig, "pgcode", None) not in RETRYABLE_PGCODES or attempt == WRITE_ATTEMPTS:
+                raise
+            db.rollback()
+            IMPORT_WRITE_RETRIES.inc()
+            logger.warning("Retrying import bucket %s after %s (attempt %s)", bucket, e.orig.pgcode, attempt)
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+
+def _upsert_products(db, products: List[ProductRow], seen_task_id: Optional[str]):
+    """Upsert products with unique SKUs (does not commit)."""
     # Bulk upsert using PostgreSQL's ON CONFLICT
     # This handles duplicate SKUs (case-insensitive)
-    stmt = insert(Product).values(products_data)
+    # Dicts are only built here, one bucket at a time
+    stmt = insert(Product).values([
+        {**product._asdict(), "active": True} for product in products
+    ])
     stmt = stmt.on_conflict_do_update(
         index_elements=[func.lower(Product.sku)],
         set_={
@@ -168,8 +530,60 @@ def _process_chunk(db, chunk: List[Dict]):
             "description": stmt.excluded.description,
             "price": stmt.excluded.price,
             "active": stmt.excluded.active,
-        }
+            # ON CONFLICT does not apply the columns' onupdate defaults
+            "updated_at": func.now(),
+            "change_seq": PRODUCT_CHANGE_SEQ.next_value(),
+            "change_xid": func.pg_current_xact_id(),
+        },
+        # Leave unchanged rows alone, so they stay out of the change feed
+        where=tuple_(Product.name, Product.description, Product.price, Product.active).is_distinct_from(
+            tuple_(stmt.excluded.name, stmt.excluded.description, stmt.excluded.price, stmt.excluded.active)
+        )
     )
     
     db.execute(stmt)
-    db.commit()
+    
+    if seen_task_id:
+        seen = insert(ImportSeenSku).values([
+            {"task_id": seen_task_id, "sku_lower": product.sku.lower()} for product in products
+        ])
+        db.execute(seen.on_conflict_do_nothing())
+
+
+def _remove_missing_products(db, task_id: str, missing: str) -> int:
+    """
+    Deactivate or delete products a full-sync import did not see.
+    
+    Uses one anti-join statement against the SKUs recorded during the
+    import, then clears them. Does not commit.
+    
+    Args:
+        db: Database session
+        task_id: Full-sync task
+        missing: "deactivate" or "delete"
+        
+    Returns:
+        int: Number of products deactivated or deleted
+    """
+    if not db.query(exists().where(ImportSeenSku.task_id == task_id)).scalar():
+        # An empty or unreadable feed must not wipe the whole catalog
+        raise ValueError("Full sync found no valid rows; refusing to remove every product")
+    
+    not_seen = ~exists().where(
+        ImportSeenSku.task_id == task_id,
+        ImportSeenSku.sku_lower == func.lower(Product.sku)
+    )
+    
+    if missing == "delete":
+        removed = change_feed.delete_products(db, not_seen)
+    else:
+        stmt = update(Product).where(Product.active == True, not_seen).values(active=False)
+        removed = db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    
+    _clear_seen_skus(db, task_id)
+    return removed
+
+
+def _clear_seen_skus(db, task_id: str):
+    """Delete the SKUs recorded for a full-sync import."""
+    db.execute(delete(ImportSeenSku).where(ImportSeenSku.task_id == task_id))
@@ -0,0 +1,106 @@
+"""Celery tasks for draining the event outbox."""
+import logging
+from sqlalchemy import text
+from backend.celery_app import celery_app
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.metrics import WATERMARK_LAG
+from backend.models import EventOutbox
+from backend.tasks.webhook_tasks import trigger_webhooks_batch
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key that keeps a single dispatcher draining at a time
+DISPATCH_LOCK_KEY = 7_401_027
+
+
+@celery_app.task(name="dispatch_outbox")
+def dispatch_outbox_task():
+    """
+    Drain the event outbox in batches, in transaction order.
+
+    Ids are allocated when an event is written, not when it commits, so
+    only events of transactions older than the oldest one still running
+    are dispatched, ordered by transaction and then id. An event that
+    commits late is therefore never sent after events of transactions
+    that started after it.
+
+    Each batch is handed to the webhook subsystem as a single task and
+    removed from the outbox in the same transaction. If the broker is
+    unavailable the batch stays in the outbox for the next run.
+
+    Once caught up, the age of the oldest event left behind is reported
+    as the outbox's watermark lag, with a warning when it is too old.
+
+    Returns:
+        dict: Number of events dispatched
+    """
+    db = SessionLocal()
+    dispatched = 0
+    caught_up = False
+
+    try:
+        while True:
+            # Only one dispatcher at a time, otherwise batches could overtake each other
+            locked = db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"),
+                {"key": DISPATCH_LOCK_KEY}
+            ).scalar()
+            if not locked:
+                db.rollback()
+                break
+
+            events = db.query(EventOutbox).filter(
+                EventOutbox.xid < _watermark(db)
+            ).order_by(EventOutbox.xid, EventOutbox.id).limit(
+                settings.outbox_batch_size
+            ).all()
+
+            if not events:
+                db.rollback()
+                caught_up = True
+                break
+
+            trigger_webhooks_batch.delay(
+                [[event.event_type, event.payload] for event in events]
+            )
+
+            db.query(EventOutbox).filter(
+                EventOutbox.id.in_([event.id for event in events])
+            ).delete(synchronize_session=False)
+            db.commit()
+            dispatched += len(events)
+
+            if len(events) < settings.outbox_batch_size:
+                caught_up = True
+                break
+
+        if caught_up:
+            _report_lag(db)
+
+    except Exception as e:
+        db.rollback()
+        logger.warning("Outbox dispatch stopped after %s events: %s", dispatched, e)
+
+    finally:
+        db.close()
+
+    return {"dispatched": dispatched}
+
+
+def _watermark(db) -> str:
+    """Oldest transaction still running; every event below it has committed."""
+    return db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")).scalar()
+
+
+def _report_lag(db):
+    """Report how long committed events have been waiting behind the watermark."""
+    lag = db.execute(text(
+        "SELECT coalesce(extract(epoch FROM now() - min(created_at)), 0) FROM event_outbox"
+    )).scalar()
+    WATERMARK_LAG.labels("outbox").set(lag)
+    if lag > settings.watermark_lag_warning_seconds:
+        logger.warning(
+            "Outbox events held back for %.0fs by a running transaction; "
+            "check pg_stat_activity for long or idle-in-transaction sessions", lag
+        )
@@ -0,0 +1,50 @@
+"""Celery tasks that maintain the incremental catalog statistics."""
+import logging
+from backend import catalog_stats
+from backend.celery_app import celery_app
+from backend.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="compact_catalog_stats")
+def compact_catalog_stats_task():
+    """
+    Fold the delta rows appended by product writes, keeping reads O(1).
+
+    Returns:
+        dict: Number of delta rows removed
+    """
+    db = SessionLocal()
+
+    try:
+        removed = catalog_stats.compact(db)
+        db.commit()
+    finally:
+        db.close()
+
+    return {"removed": removed}
+
+
+@celery_app.task(name="reconcile_catalog_stats")
+def reconcile_catalog_stats_task():
+    """
+    Recount products and correct the statistics if they drifted.
+
+    Drift means a write bypassed the triggers (e.g. TRUNCATE or
+    session_replication_role = replica), so it is logged.
+
+    Returns:
+        dict: Number of corrected (active, price bucket) groups
+    """
+    db = SessionLocal()
+
+    try:
+        corrected = catalog_stats.reconcile(db)
+        db.commit()
+    finally:
+        db.close()
+
+    if corrected:
+        logger.warning("Catalog stats had drifted in %s groups; corrected", corrected)
+    return {"corrected": corrected}
@@ -1,12 +1,20 @@
 """Celery tasks for webhook processing."""
+import logging
+import random
 import httpx
-from typing import Dict, Any
+import redis
+from typing import Dict, Any, List, Optional
 from backend.celery_app import celery_app
-from backend.database import SessionLocal
-from backend.models import Webhook
+from backend.config import settings
+from backend.metrics import WEBHOOK_DELIVERIES
+from backend.webhook_batching import buffer_event, drain_events
+from backend.webhook_circuit import circuit_open_for, record_failure, record_success
+from backend.webhook_registry import WebhookTarget, get_targets
 
+logger = logging.getLogger(__name__)
 
-@celery_app.task(bind=True, max_retries=3, name="trigger_webhooks")
+
+@celery_app.task(bind=True, name="trigger_webhooks")
 def trigger_webhooks(self, event_type: str, payload: Dict[str, Any]):
     """
     Trigger all webhooks for a specific event type.
@@ -15,25 +23,202 @@ def trigger_webhooks(self, event_type: str, payload: Dict[str, Any]):
         event_type: Type of event (e.g., "upload_complete", "product_created")
         payload: Data to send to webhooks
     """
-    db = SessionLocal()
+    targets = get_targets([event_type])
+    _fan_out(targets[event_type], event_type, payload)
+
+
+@celery_app.task(name="trigger_webhooks_batch")
+def trigger_webhooks_batch(events: List[List[Any]]):
+    """
+    Trigger webhooks for a batch of events, in order.
     
-    try:
-        # Get all enabled webhooks for this event type
-        webhooks = db.query(Webhook).filter(
-            Webhook.event_type == event_type,
-            Webhook.enabled == True
-        ).all()
-        
-        for webhook in webhooks:
+    Args:
+        events: List of [event_type, payload] pairs, as drained from the outbox
+    """
+    targets = get_targets(event_type for event_type, _ in events)
+    
+    for event_type, payload in events:
+        _fan_out(targets[event_type], event_type, payload)
+
+
+def _fan_out(targets: List[WebhookTarget], event_type: str, payload: Dict[str, Any]):
+    """
+    Deliver one event to its webhooks.
+    
+    Webhooks in batching mode get the event added to their buffer; all
+    others get one inline delivery attempt.
+    
+    Args:
+        targets: Webhooks subscribed to the event
+        event_type: Event type
+        payload: Data to send
+    """
+    for target in targets:
+        if target.batch_window_seconds:
             try:
-                _send_webhook(webhook.url, event_type, payload)
-            except Exception as e:
-                # Log error but don't fail the task
-                print(f"Webhook {webhook.id} failed: {str(e)}")
+                _buffer_for_batch(target, event_type, payload)
+                WEBHOOK_DELIVERIES.labels("buffered").inc()
                 continue
+            except redis.RedisError as e:
+                # Deliver unbatched rather than lose the event
+                logger.warning("Batch buffer unavailable for webhook %s: %s", target.id, e)
         
-    finally:
-        db.close()
+        _deliver_now(target.id, target.url, event_type, payload)
+
+
+def _buffer_for_batch(target: WebhookTarget, event_type: str, payload: Dict[str, Any]):
+    """
+    Buffer an event for a batching webhook and schedule its flush.
+    
+    The buffer is flushed when the window opened by its first event
+    closes, or straight away once it holds `batch_max_events` events.
+    Both flushes carry the window's token, so whichever runs first
+    drains the window and the other cannot cut the next one short.
+    """
+    max_events = target.batch_max_events or settings.webhook_batch_max_events
+    size, opened_window, window = buffer_event(target.id, payload, target.batch_window_seconds)
+    
+    # The buffer grows one event at a time; only the event that fills it flushes
+    if size == max_events:
+        flush_webhook_batch.delay(target.id, target.url, event_type, window)
+    elif opened_window:
+        flush_webhook_batch.apply_async(
+            args=[target.id, target.url, event_type, window],
+            countdown=target.batch_window_seconds
+        )
+
+
+def _deliver_now(webhook_id: int, url: str, event_type: str, payload: Dict[str, Any]):
+    """
+    Make one inline delivery attempt.
+    
+    Webhooks with an open circuit are skipped, and failed deliveries are
+    handed to `deliver_webhook` so one slow subscriber does not hold up
+    the others.
+    """
+    cooldown = circuit_open_for(webhook_id)
+    if cooldown:
+        # Try again once the circuit half-opens instead of waiting on a dead host
+        WEBHOOK_DELIVERIES.labels("circuit_open").inc()
+        deliver_webhook.apply_async(
+            args=[webhook_id, url, event_type, payload],
+            countdown=cooldown + random.uniform(0, settings.webhook_retry_backoff_seconds)
+        )
+        return
+    
+    try:
+        _send_webhook(url, event_type, payload)
+    except Exception as e:
+        logger.warning("Webhook %s failed, scheduling retry: %s", webhook_id, e)
+        WEBHOOK_DELIVERIES.labels("failure").inc()
+        record_failure(webhook_id)
+        deliver_webhook.apply_async(
+            args=[webhook_id, url, event_type, payload],
+            countdown=_retry_delay(0)
+        )
+    else:
+        WEBHOOK_DELIVERIES.labels("success").inc()
+        record_success(webhook_id)
+
+
+@celery_app.task(name="flush_webhook_batch")
+def flush_webhook_batch(webhook_id: int, url: str, event_type: str, window: Optional[str] = None):
+    """
+    Deliver the buffered events of a batching webhook as one request.
+    
+    The payload is sent as event "<event_type>.batch" with the coalesced
+    events under "items", oldest first.
+    
+    Args:
+        webhook_id: Webhook identifier
+        url: Webhook URL
+        event_type: Event type the webhook is subscribed to
+        window: Token of the batching window to flush; a no-op once that
+            window has been drained
+    """
+    items = drain_events(webhook_id, window)
+    if not items:
+        return {"delivered": 0}
+    
+    _deliver_now(webhook_id, url, f"{event_type}.batch", {
+        "count": len(items),
+        "items": items
+    })
+    return {"delivered": len(items)}
+
+
+@celery_app.task(bind=True, name="deliver_webhook")
+def deliver_webhook(
+    self,
+    webhook_id: int,
+    url: str,
+    event_type: str,
+    payload: Dict[str, Any]
+):
+    """
+    Retry a single failed webhook delivery with exponential backoff.
+    
+    Only failed attempts count towards `webhook_max_retries`; time spent
+    waiting for an open circuit does not.
+    
+    Args:
+        webhook_id: Webhook identifier, used for circuit breaker state
+        url: Webhook URL
+        event_type: Event type
+        payload: Data to send
+    """
+    max_retries = settings.webhook_max_retries
+    
+    cooldown = circuit_open_for(webhook_id)
+    if cooldown:
+        # Parked, not attempted: re-queue without using up a retry
+        WEBHOOK_DELIVERIES.labels("circuit_open").inc()
+        deliver_webhook.apply_async(
+            args=[webhook_id, url, event_type, payload],
+            countdown=cooldown + random.uniform(0, settings.webhook_retry_backoff_seconds),
+            retries=self.request.retries
+        )
+        return {"status": "circuit_open"}
+    
+    try:
+        result = _send_webhook(url, event_type, payload)
+    except Exception as e:
+        WEBHOOK_DELIVERIES.labels("failure").inc()
+        record_failure(webhook_id)
+        if self.request.retries >= max_retries:
+            logger.error(
+                "Webhook %s gave up after %s retries: %s",
+                webhook_id, self.request.retries, e
+            )
+        raise self.retry(
+            exc=e,
+            countdown=_retry_delay(self.request.retries + 1),
+            max_retries=max_retries
+        )
+    
+    WEBHOOK_DELIVERIES.labels("success").inc()
+    record_success(webhook_id)
+    return result
+
+
+def _retry_delay(attempt: int) -> float:
+    """
+    Compute the delay before a retry using exponential backoff with jitter.
+    
+    Half of the delay is fixed and half is random, so retries for many
+    events that failed together spread out instead of arriving at once.
+    
+    Args:
+        attempt: Number of retries already made
+        
+    Returns:
+        float: Delay in seconds
+    """
+    delay = min(
+        settings.webhook_retry_backoff_max_seconds,
+        settings.webhook_retry_backoff_seconds * (2 ** attempt)
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
 
 
 def _send_webhook(url: str, event_type: str, payload: Dict[str, Any]):
@@ -50,7 +235,7 @@ def _send_webhook(url: str, event_type: str, payload: Dict[str, Any]):
         "data": payload
     }
     
-    with httpx.Client(timeout=10.0) as client:
+    with httpx.Client(timeout=settings.webhook_timeout_seconds) as client:
         response = client.post(url, json=data)
         response.raise_for_status()
         
@@ -58,31 +243,3 @@ def _send_webhook(url: str, event_type: str, payload: Dict[str, Any]):
             "status_code": response.status_code,
             "response_time": response.elapsed.total_seconds()
         }
-
-
-@celery_app.task(name="test_webhook")
-def test_webhook_task(webhook_url: str):
-    """
-    Test a webhook by sending a sample payload.
-    
-    Args:
-        webhook_url: URL to test
-        
-    Returns:
-        dict: Response status and timing
-    """
-    try:
-        result = _send_webhook(
-            webhook_url,
-            "test",
-            {"message": "This is a test webhook from Product Importer"}
-        )
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
-        }
@@ -31,8 +31,9 @@ def db():
     # Begin a non-ORM transaction
     transaction = connection.begin()
     
-    # Bind an individual Session to the connection
-    session = TestingSessionLocal(bind=connection)
+    # Bind an individual Session to the connection; its commits and
+    # rollbacks use savepoints, so error paths keep the test's data
+    session = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     
     yield session
     
@@ -0,0 +1,30 @@
+from backend.celery_app import celery_app
+
+
+def _route(task_name):
+    return celery_app.amqp.router.route({}, task_name)
+
+
+def test_imports_and_webhooks_use_separate_queues():
+    assert _route("import_csv")["queue"].name == "imports"
+
+    for task_name in ("trigger_webhooks", "trigger_webhooks_batch", "deliver_webhook", "dispatch_outbox"):
+        assert _route(task_name)["queue"].name == "webhooks"
+
+
+def test_webhook_retries_yield_to_fresh_events():
+    assert _route("deliver_webhook")["priority"] > _route("trigger_webhooks")["priority"]
+
+
+def test_maintenance_does_not_wait_behind_imports():
+    for task_name in ("compact_catalog_stats", "reconcile_catalog_stats"):
+        assert _route(task_name)["queue"].name == "webhooks"
+
+    schedule = celery_app.conf.beat_schedule
+    for name, entry in schedule.items():
+        if name != "cleanup-uploads":
+            assert entry["options"]["expires"] == entry["schedule"]
+
+    # Cleanup sweeps the importers' upload directory, so it waits behind imports
+    assert _route("cleanup_uploads")["queue"].name == "imports"
+    assert schedule["cleanup-uploads"]["options"]["expires"] > celery_app.conf.task_time_limit
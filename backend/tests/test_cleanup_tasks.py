@@ -0,0 +1,67 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from backend.models import ProductTombstone, UploadPart, UploadTask
+from backend.tasks import cleanup_tasks
+from backend.tasks.cleanup_tasks import cleanup_uploads_task
+
+
+def _age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_cleanup_expires_purges_and_sweeps(db, tmp_path):
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=60)
+    db.add_all([
+        UploadTask(id="old-done", filename="a.csv", status="completed", created_at=old),
+        UploadTask(id="recent-done", filename="b.csv", status="completed", created_at=now),
+        UploadTask(id="lost-import", filename="c.csv", status="processing",
+                   created_at=now - timedelta(hours=6), updated_at=now - timedelta(hours=5)),
+        UploadTask(id="live-import", filename="d.csv", status="processing", created_at=now),
+        # Waiting behind a long queue is not a lost worker
+        UploadTask(id="queued-import", filename="f.csv", status="pending",
+                   created_at=now - timedelta(hours=6)),
+        UploadTask(id="stale-session", filename="e.csv", status="uploading",
+                   created_at=now - timedelta(days=2), total_parts=2),
+        UploadPart(task_id="stale-session", part_number=1, size=1, checksum="x"),
+        ProductTombstone(product_id=1, sku="GONE-OLD", deleted_at=old),
+        ProductTombstone(product_id=2, sku="GONE-RECENT", deleted_at=now),
+    ])
+    db.commit()
+
+    files = {
+        name: tmp_path / name for name in (
+            "old-done.rejects.csv.gz", "recent-done.rejects.csv.gz", "recent-done.csv",
+            "lost-import.csv", "live-import.csv", "queued-import.csv", "unknown.csv.gz", "fresh.csv",
+        )
+    }
+    for name, path in files.items():
+        path.write_bytes(b"x")
+        if name != "fresh.csv":
+            _age(path, 2 * cleanup_tasks.ORPHAN_FILE_GRACE_SECONDS)
+
+    with patch.object(cleanup_tasks, "SessionLocal", return_value=db), \
+            patch.object(cleanup_tasks.settings, "upload_dir", str(tmp_path)):
+        result = cleanup_uploads_task()
+
+    assert result == {
+        "expired_sessions": 1,
+        "lost_imports": 1,
+        "expired_dry_runs": 0,
+        "purged_tasks": 1,
+        "purged_tombstones": 1,
+        "removed_files": 3,
+    }
+    assert [t.sku for t in db.query(ProductTombstone).all()] == ["GONE-RECENT"]
+
+    assert db.query(UploadTask).filter(UploadTask.id == "old-done").first() is None
+    assert db.query(UploadTask).filter(UploadTask.id == "lost-import").one().status == "failed"
+    assert db.query(UploadTask).filter(UploadTask.id == "queued-import").one().status == "pending"
+    assert db.query(UploadTask).filter(UploadTask.id == "stale-session").one().status == "failed"
+    assert db.query(UploadPart).filter(UploadPart.task_id == "stale-session").count() == 0
+
+    remaining = sorted(path.name for path in tmp_path.iterdir())
+    assert remaining == ["fresh.csv", "live-import.csv", "queued-import.csv", "recent-done.rejects.csv.gz"]
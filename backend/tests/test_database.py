@@ -0,0 +1,68 @@
+"""Tests for connection pool configuration."""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+from sqlalchemy.pool import NullPool
+from backend import database
+from backend.config import settings
+
+
+@pytest.mark.parametrize("role, pool_size, max_overflow", [
+    ("web", settings.db_pool_size_web, settings.db_max_overflow_web),
+    ("import_worker", settings.db_pool_size_import_worker, settings.db_max_overflow_import_worker),
+    ("webhook_worker", settings.db_pool_size_webhook_worker, settings.db_max_overflow_webhook_worker),
+])
+def test_pool_sized_by_process_role(role, pool_size, max_overflow):
+    with patch.object(settings, "process_role", role), patch.object(settings, "db_null_pool", False):
+        options = database.engine_options()
+
+    assert options["pool_size"] == pool_size
+    assert options["max_overflow"] == max_overflow
+    assert options["pool_pre_ping"] is True
+
+
+def test_unknown_process_role_rejected():
+    with patch.object(settings, "process_role", "cron"), patch.object(settings, "db_null_pool", False):
+        with pytest.raises(ValueError):
+            database.engine_options()
+
+
+def test_pgbouncer_mode_uses_null_pool_without_prepared_statements():
+    with patch.object(settings, "db_pgbouncer", True), \
+            patch.object(settings, "db_null_pool", True), \
+            patch.object(settings, "database_url", "postgresql+psycopg://u:p@pgbouncer:6432/db"):
+        options = database.engine_options()
+
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+    assert options["connect_args"] == {"prepare_threshold": None}
+
+
+def test_dispose_engine_keeps_parent_connections_open():
+    with patch.object(database, "_engine") as engine:
+        database.dispose_engine()
+
+    engine.dispose.assert_called_once_with(close=False)
+
+
+def test_engine_created_once_under_concurrent_first_use():
+    created = []
+
+    def slow_create_engine(url, **options):
+        time.sleep(0.05)
+        created.append(url)
+        return MagicMock()
+
+    engines = []
+    with patch.object(database, "_engine", None), \
+            patch.object(database, "create_engine", slow_create_engine), \
+            patch.object(database, "instrument_engine"):
+        threads = [threading.Thread(target=lambda: engines.append(database.get_engine())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(created) == 1
+    assert len(set(map(id, engines))) == 1
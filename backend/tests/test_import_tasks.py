@@ -0,0 +1,254 @@
+import gzip
+import json
+import io
+import zipfile
+from unittest.mock import MagicMock, patch
+import pytest
+import zstandard
+from sqlalchemy.exc import OperationalError
+from backend import staging
+from backend.csv_schema import ColumnIndex, RowChunk
+from backend.models import ImportSeenSku, Product, UploadTask
+from backend.tasks import import_tasks
+from backend.tasks.import_tasks import import_csv_task
+
+CSV = "sku,name,price\nGZ-1,First,1.50\nGZ-2,Second,2.50\ngz-1,First again,3.00\n"
+
+
+def _zip(content: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("products.csv", content)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("suffix,compress", [
+    (".csv", lambda data: data),
+    (".csv.gz", gzip.compress),
+    (".csv.zst", lambda data: zstandard.ZstdCompressor().compress(data)),
+    (".zip", _zip),
+])
+def test_import_compressed_upload(db, tmp_path, suffix, compress):
+    path = tmp_path / f"upload{suffix}"
+    path.write_bytes(compress(CSV.encode()))
+    task_id = f"compressed{suffix}"
+
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        result = import_csv_task(task_id, str(path), f"products{suffix}")
+
+    assert result["processed_rows"] == 3
+    assert not path.exists()
+
+    task = db.query(UploadTask).filter(UploadTask.id == task_id).one()
+    assert task.status == "completed"
+    assert task.progress == 100
+    assert task.total_rows == 3
+    assert task.peak_rss_mb > 0
+
+    product = db.query(Product).filter(Product.sku.ilike("gz-1")).one()
+    assert float(product.price) == 3.0
+
+
+def test_import_rejects_multi_file_zip(db, tmp_path):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("a.csv", CSV)
+        archive.writestr("b.csv", CSV)
+    path = tmp_path / "upload.zip"
+    path.write_bytes(buffer.getvalue())
+
+    with patch.object(import_tasks, "SessionLocal", return_value=db), \
+            pytest.raises(ValueError):
+        import_csv_task("multi-zip", str(path), "products.zip")
+
+    task = db.query(UploadTask).filter(UploadTask.id == "multi-zip").one()
+    assert task.status == "failed"
+    assert "exactly one file" in task.error_message
+
+
+@pytest.mark.parametrize("missing", ["deactivate", "delete"])
+def test_full_sync_removes_missing_products(db, tmp_path, missing):
+    db.add_all([
+        Product(sku="SYNC-KEEP", name="Keep", price=1.0),
+        Product(sku="SYNC-GONE", name="Gone", price=1.0),
+    ])
+    db.commit()
+    path = tmp_path / "feed.csv"
+    path.write_text("sku,name,price\nsync-keep,Kept,2.0\nSYNC-NEW,New,3.0\n")
+    # Products from other tests are missing from the feed too
+    expected = db.query(Product).filter(Product.active == True).count() - 1
+
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        result = import_csv_task(
+            f"sync-{missing}", str(path), "feed.csv", {"mode": "full_sync", "missing": missing}
+        )
+
+    assert result["deactivated_rows"] == expected
+    gone = db.query(Product).filter(Product.sku == "SYNC-GONE").first()
+    if missing == "delete":
+        assert gone is None
+    else:
+        assert gone.active is False
+    assert db.query(Product).filter(Product.sku == "SYNC-KEEP").one().active is True
+    assert db.query(ImportSeenSku).count() == 0
+
+
+def test_full_sync_without_valid_rows_removes_nothing(db, tmp_path):
+    db.add(Product(sku="SYNC-SAFE", name="Safe", price=1.0))
+    db.commit()
+    path = tmp_path / "feed.csv"
+    path.write_text("sku,name,price\n,missing sku,1.0\n")
+
+    with patch.object(import_tasks, "SessionLocal", return_value=db), \
+            pytest.raises(ValueError):
+        import_csv_task("sync-empty", str(path), "feed.csv", {"mode": "full_sync", "missing": "delete"})
+
+    assert db.query(Product).filter(Product.sku == "SYNC-SAFE").one().active is True
+
+
+def test_chunk_written_in_lock_order_with_busy_buckets_last():
+    chunk = RowChunk(ColumnIndex(["sku", "name", "price"]))
+    for i in range(50):
+        chunk.append(i + 2, [f"ORDER-{i}", "Item", "1"])
+    calls = []
+    busy = {}
+
+    def write_bucket(db, bucket, products, seen_task_id, blocking):
+        # Pretend the first bucket is held by another import
+        busy.setdefault("bucket", bucket)
+        if bucket == busy["bucket"] and not blocking:
+            return False
+        calls.append((bucket, [p.sku.lower() for p in products]))
+        return True
+
+    with patch.object(import_tasks, "_write_bucket", side_effect=write_bucket):
+        assert import_tasks._upsert_chunk(MagicMock(), chunk) == 50
+
+    buckets = [bucket for bucket, _ in calls]
+    assert buckets[-1] == busy["bucket"]
+    assert buckets[:-1] == sorted(buckets[:-1])
+    for _, skus in calls:
+        assert skus == sorted(skus)
+
+
+def test_bucket_write_retried_after_deadlock():
+    deadlock = OperationalError("INSERT", {}, MagicMock(pgcode="40P01"))
+    db = MagicMock()
+
+    with patch.object(import_tasks, "_upsert_products", side_effect=[deadlock, None]) as upsert, \
+            patch.object(import_tasks.time, "sleep"):
+        assert import_tasks._write_bucket(db, 3, [], None, blocking=True)
+
+    assert upsert.call_count == 2
+    db.rollback.assert_called_once()
+    db.commit.assert_called_once()
+
+
+def test_import_uses_preflight_options(db, tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_bytes("Code;Title;Price\nPFO-1;Caf\xe9;4.5\n".encode("cp1252"))
+    options = {"mode": "upsert", "encoding": "cp1252", "delimiter": ";",
+               "column_mapping": {"Code": "sku", "Title": "name"}}
+
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        import_csv_task("preflight-options", str(path), "feed.csv", options)
+
+    product = db.query(Product).filter(Product.sku == "PFO-1").one()
+    assert product.name == "Caf\xe9"
+    assert float(product.price) == 4.5
+
+
+def test_rejected_rows_reported(client, db, tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_text(
+        'sku,name,price\nREJ-1,Good,1\n,No sku,1\nREJ-2,"Bad\nprice",abc\nREJ-3,,1\nREJ-4,Good,2\n'
+    )
+
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        result = import_csv_task("with-rejects", str(path), "feed.csv")
+
+    assert result["rejected_rows"] == 3
+    task = db.query(UploadTask).filter(UploadTask.id == "with-rejects").one()
+    assert task.reject_counts == {"missing_sku": 1, "invalid_price": 1, "missing_name": 1}
+
+    with patch("backend.routers.upload.UPLOAD_DIR", str(tmp_path)):
+        response = client.get("/api/upload/with-rejects/rejects", headers={"Accept-Encoding": "identity"})
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "line,reason,message,sku"
+    # Line numbers are where rows start in the file, counting the quoted line break
+    assert lines[1].startswith("3,missing_sku")
+    assert lines[2].startswith("4,invalid_price")
+    assert lines[3].startswith("6,missing_name")
+
+
+def test_chunks_shrink_near_memory_limit():
+    with patch.object(import_tasks.settings, "import_memory_limit_mb", 1000), \
+            patch.object(import_tasks.settings, "chunk_size", 10000):
+        assert import_tasks._next_chunk_size(10000, 900) == 5000
+        assert import_tasks._next_chunk_size(600, 900) == import_tasks.MIN_CHUNK_SIZE
+        assert import_tasks._next_chunk_size(5000, 700) == 5000
+        assert import_tasks._next_chunk_size(5000, 300) == 10000
+
+
+def test_dry_run_stages_diff_and_commits(client, db, tmp_path):
+    db.add_all([
+        Product(sku="DRY-SAME", name="Same", price=10.0),
+        Product(sku="DRY-UP", name="Up", price=10.0),
+    ])
+    db.commit()
+    path = tmp_path / "feed.csv"
+    path.write_text("sku,name,price\nDRY-SAME,Same,10\ndry-up,Up,5\nDRY-NEW,New,1\ndry-up,Up,12\n")
+
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        result = import_csv_task("dry-run", str(path), "feed.csv", {"mode": "upsert", "dry_run": True})
+
+    summary = result["dry_run_summary"]
+    assert (summary["inserts"], summary["updates"], summary["unchanged"]) == (1, 1, 1)
+    assert summary["price_changes"]["up_10_to_50"] == 1
+    assert db.query(Product).filter(Product.sku == "DRY-NEW").first() is None
+    task = db.query(UploadTask).filter(UploadTask.id == "dry-run").one()
+    assert task.outcome == "dry_run"
+
+    response = client.get("/api/upload/dry-run/diff?change=update")
+    assert response.status_code == 200
+    changes = [json.loads(line) for line in response.text.splitlines()]
+    assert changes == [{
+        "change": "update",
+        "sku": "dry-up",
+        "before": {"name": "Up", "description": None, "price": 10.0, "active": True},
+        "after": {"name": "Up", "description": None, "price": 12.0, "active": True},
+    }]
+
+    with patch.object(import_tasks.commit_staged_import_task, "delay") as delay:
+        assert client.post("/api/upload/dry-run/commit").status_code == 202
+        assert client.post("/api/upload/dry-run/commit").status_code == 409
+    delay.assert_called_once_with("dry-run")
+
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        import_tasks.commit_staged_import_task("dry-run")
+
+    task = db.query(UploadTask).filter(UploadTask.id == "dry-run").one()
+    assert task.status == "completed"
+    assert task.outcome == "imported"
+    assert db.query(Product).filter(Product.sku == "DRY-NEW").one().active is True
+    assert float(db.query(Product).filter(Product.sku == "DRY-UP").one().price) == 12.0
+    assert client.post("/api/upload/dry-run/commit").status_code == 409
+
+
+def test_commit_fails_when_staged_rows_are_lost(db, tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_text("sku,name,price\nLOST-1,One,1\nLOST-2,Two,2\n")
+
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        import_csv_task("lost-staging", str(path), "feed.csv", {"mode": "upsert", "dry_run": True})
+        # As after a crash: the unlogged staging table comes back empty
+        staging.clear(db, "lost-staging")
+        result = import_tasks.commit_staged_import_task("lost-staging")
+
+    assert result == {"status": "failed", "staged": 0, "expected": 2}
+    task = db.query(UploadTask).filter(UploadTask.id == "lost-staging").one()
+    assert task.status == "failed"
+    assert task.outcome == "dry_run"
+    assert db.query(Product).filter(Product.sku == "LOST-1").first() is None
@@ -0,0 +1,35 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend import instrumentation
+from backend.database import get_db
+from backend.routers import products
+
+
+def _instrumented_client(db):
+    app = FastAPI()
+    instrumentation.install(app)
+    app.include_router(products.router)
+    app.dependency_overrides[get_db] = lambda: db
+    return TestClient(app)
+
+
+def test_server_timing_header_reports_phases(client, db):
+    client.post("/api/products", json={"sku": "P1", "name": "Timed", "price": 10.0})
+
+    response = _instrumented_client(db).get("/api/products")
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    for phase in ("db;dur=", "handler;dur=", "serialize;dur=", "total;dur="):
+        assert phase in timing
+    # Catalog version for the ETag, count() and the page query
+    assert '"3 queries"' in timing
+
+
+def test_sampled_request_is_profiled(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation.settings, "perf_profile_sample_rate", 1.0)
+    monkeypatch.setattr(instrumentation.settings, "perf_profile_dir", str(tmp_path))
+
+    _instrumented_client(db).get("/api/products")
+
+    assert [p.suffix for p in tmp_path.iterdir()] == [".prof"]
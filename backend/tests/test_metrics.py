@@ -0,0 +1,34 @@
+from prometheus_client import REGISTRY
+from backend.csv_schema import ColumnIndex, RowChunk
+from backend.models import Product
+from backend.tasks.import_tasks import _process_chunk
+
+
+def _sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_endpoint_reports_route_latency(client):
+    client.get("/api/products")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'route="/api/products"' in response.text
+    assert "celery_queue_length" in response.text
+    assert "db_pool_checked_out_connections" in response.text
+
+
+def test_import_chunk_counts_rows(db):
+    imported_before = _sample("import_rows_total", {"outcome": "imported"})
+    rejected_before = _sample("import_rows_total", {"outcome": "rejected"})
+
+    chunk = RowChunk(ColumnIndex(["sku", "name", "price"]))
+    chunk.append(2, ["M1", "Metric", "1.5"])
+    chunk.append(3, ["", "No SKU", "1"])
+    chunk.append(4, ["M2", "Bad price", "abc"])
+    _process_chunk(db, chunk)
+
+    assert _sample("import_rows_total", {"outcome": "imported"}) - imported_before == 1
+    assert _sample("import_rows_total", {"outcome": "rejected"}) - rejected_before == 2
+    assert db.query(Product).filter(Product.sku == "M1").count() == 1
@@ -0,0 +1,100 @@
+from unittest.mock import patch
+import pytest
+from backend.database import SessionLocal
+from backend.models import EventOutbox
+from backend.outbox import enqueue_event
+from backend.tasks import outbox_tasks
+
+# The dispatcher runs with its own session, against events committed by
+# other sessions, so these tests commit for real and clean up after
+
+
+@pytest.fixture
+def outbox():
+    """Sessions that commit events; the outbox is emptied afterwards."""
+    sessions = []
+
+    def session():
+        db = SessionLocal()
+        sessions.append(db)
+        return db
+
+    yield session
+
+    for db in sessions:
+        db.close()
+    with SessionLocal() as db:
+        db.query(EventOutbox).delete()
+        db.commit()
+
+
+def _commit_events(session, *skus):
+    db = session()
+    for sku in skus:
+        enqueue_event(db, "product_updated", {"sku": sku})
+    db.commit()
+
+
+def _sent(mock_batch):
+    return [[payload["sku"] for _, payload in call.args[0]] for call in mock_batch.call_args_list]
+
+
+def test_dispatch_outbox_drains_in_order(outbox):
+    _commit_events(outbox, "A", "B")
+    _commit_events(outbox, "C")
+
+    with patch.object(outbox_tasks.trigger_webhooks_batch, "delay") as mock_batch:
+        result = outbox_tasks.dispatch_outbox_task()
+
+    assert result == {"dispatched": 3}
+    assert _sent(mock_batch) == [["A", "B", "C"]]
+    with SessionLocal() as db:
+        assert db.query(EventOutbox).count() == 0
+
+
+def test_dispatch_outbox_keeps_events_when_broker_fails(outbox):
+    _commit_events(outbox, "A")
+
+    with patch.object(outbox_tasks.trigger_webhooks_batch, "delay", side_effect=ConnectionError):
+        result = outbox_tasks.dispatch_outbox_task()
+
+    assert result == {"dispatched": 0}
+    with SessionLocal() as db:
+        assert db.query(EventOutbox).count() == 1
+
+
+def test_dispatch_outbox_waits_for_running_transactions(outbox):
+    _commit_events(outbox, "before")
+
+    # Written first but committed last
+    running = outbox()
+    enqueue_event(running, "product_updated", {"sku": "running"})
+    running.flush()
+
+    _commit_events(outbox, "after")
+
+    with patch.object(outbox_tasks.trigger_webhooks_batch, "delay") as mock_batch:
+        assert outbox_tasks.dispatch_outbox_task() == {"dispatched": 1}
+    assert _sent(mock_batch) == [["before"]]
+
+    running.commit()
+
+    with patch.object(outbox_tasks.trigger_webhooks_batch, "delay") as mock_batch:
+        assert outbox_tasks.dispatch_outbox_task() == {"dispatched": 2}
+    assert _sent(mock_batch) == [["running", "after"]]
+
+
+def test_dispatch_outbox_warns_when_events_are_held_back(outbox, caplog):
+    running = outbox()
+    enqueue_event(running, "product_updated", {"sku": "running"})
+    running.flush()
+
+    _commit_events(outbox, "held")
+
+    with patch.object(outbox_tasks.settings, "watermark_lag_warning_seconds", -1), \
+            patch.object(outbox_tasks.trigger_webhooks_batch, "delay") as mock_batch:
+        result = outbox_tasks.dispatch_outbox_task()
+
+    assert result == {"dispatched": 0}
+    mock_batch.assert_not_called()
+    assert "held back" in caplog.text
@@ -1,3 +1,6 @@
+import json
+from sqlalchemy import text
+
 def test_create_product(client):
     response = client.post(
         "/api/products",
@@ -88,3 +91,162 @@ def test_delete_product(client):
     # Verify deleted
     get_res = client.get(f"/api/products/{prod_id}")
     assert get_res.status_code == 404
+
+def test_product_events_written_to_outbox(client, db):
+    from backend.models import EventOutbox
+
+    res = client.post("/api/products", json={"sku": "P1", "name": "Outbox", "price": 10.0})
+    prod_id = res.json()["id"]
+    client.put(f"/api/products/{prod_id}", json={"price": 12.0})
+    client.delete(f"/api/products/{prod_id}")
+
+    events = db.query(EventOutbox).order_by(EventOutbox.id).all()
+    assert [e.event_type for e in events] == [
+        "product_created", "product_updated", "product_deleted"
+    ]
+    assert events[1].payload["price"] == 12.0
+
+def test_get_product_by_sku(client):
+    client.post("/api/products", json={"sku": "Case/Sku-1", "name": "Slash", "price": 5.0})
+    
+    response = client.get("/api/products/by-sku/case/sku-1")
+    assert response.status_code == 200
+    assert response.json()["sku"] == "Case/Sku-1"
+    
+    assert client.get("/api/products/by-sku/nope").status_code == 404
+
+def test_lookup_products(client):
+    first = client.post("/api/products", json={"sku": "LK-1", "name": "One", "price": 1.0}).json()
+    second = client.post("/api/products", json={"sku": "LK-2", "name": "Two", "price": 2.0}).json()
+    
+    response = client.post(
+        "/api/products/lookup",
+        json={"skus": ["lk-1", "LK-404"], "ids": [second["id"], first["id"], 999999]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(p["sku"] for p in data["products"]) == ["LK-1", "LK-2"]
+    assert data["missing"] == {"skus": ["LK-404"], "ids": [999999]}
+    
+    too_many = client.post("/api/products/lookup", json={"skus": ["x"] * 3000, "ids": [1] * 3000})
+    assert too_many.status_code == 400
+
+def test_product_change_feed(client, db, tmp_path):
+    from unittest.mock import patch
+    from backend.tasks import import_tasks
+    
+    # Every write in a test shares the test's transaction; treat it as committed
+    committed = patch("backend.change_feed._watermark", return_value=str(2 ** 64 - 1))
+    
+    with committed:
+        start = client.get("/api/products/changes?since=0").text.splitlines()
+    since = json.loads(start[-1])["next"]
+    
+    client.post("/api/products", json={"sku": "CF-1", "name": "One", "price": 1.0})
+    gone = client.post("/api/products", json={"sku": "CF-2", "name": "Two", "price": 2.0}).json()
+    client.delete(f"/api/products/{gone['id']}")
+    
+    # An import bumps changed rows only
+    feed = tmp_path / "feed.csv"
+    feed.write_text("sku,name,price\ncf-1,One,5\nCF-3,Three,3\n")
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        import_tasks.import_csv_task("change-feed", str(feed), "feed.csv")
+    
+    with committed:
+        response = client.get("/api/products/changes", params={"since": since})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    changes = [(c["op"], c.get("sku") or c["product"]["sku"]) for c in lines[:-1]]
+    assert changes == [("delete", "CF-2"), ("upsert", "CF-1"), ("upsert", "CF-3")]
+    seqs = [c["seq"] for c in lines[:-1]]
+    assert seqs == sorted(seqs)
+    cursor = lines[-2]["cursor"]
+    assert lines[-1] == {"next": cursor}
+    assert lines[1]["product"]["price"] == 5.0
+    assert lines[1]["product"]["updated_at"] is not None
+    
+    # Re-importing the same values is not a change
+    feed.write_text("sku,name,price\ncf-1,One,5\n")
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        import_tasks.import_csv_task("change-feed-again", str(feed), "feed.csv")
+    with committed:
+        response = client.get("/api/products/changes", params={"since": cursor})
+    assert response.text.splitlines() == [json.dumps({"next": cursor})]
+    
+    # Changes of a transaction still in progress are held back, and reported
+    with patch("backend.change_feed.settings.watermark_lag_warning_seconds", -1), \
+            patch("backend.change_feed.logger") as logger:
+        response = client.get("/api/products/changes", params={"since": since})
+    assert response.text.splitlines() == [json.dumps({"next": since})]
+    logger.warning.assert_called_once()
+    
+    assert client.get("/api/products/changes?since=bogus").status_code == 400
+
+def test_update_takes_new_change_seq(client):
+    created = client.post("/api/products", json={"sku": "SEQ-1", "name": "One", "price": 1.0}).json()
+    updated = client.put(f"/api/products/{created['id']}", json={"price": 2.0}).json()
+    assert updated["change_seq"] > created["change_seq"]
+
+def test_conditional_get_product(client):
+    created = client.post("/api/products", json={"sku": "ETAG-1", "name": "One", "price": 1.0}).json()
+    
+    first = client.get(f"/api/products/{created['id']}")
+    etag = first.headers["etag"]
+    
+    cached = client.get(f"/api/products/{created['id']}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    
+    client.put(f"/api/products/{created['id']}", json={"price": 2.0})
+    changed = client.get(f"/api/products/{created['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+def test_conditional_get_listing(client):
+    client.post("/api/products", json={"sku": "ETAG-L1", "name": "One", "price": 1.0})
+    
+    first = client.get("/api/products?limit=10")
+    etag = first.headers["etag"]
+    assert client.get("/api/products?limit=10", headers={"If-None-Match": etag}).status_code == 304
+    
+    client.post("/api/products", json={"sku": "ETAG-L2", "name": "Two", "price": 2.0})
+    changed = client.get("/api/products?limit=10", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.json()["products"]) == 2
+
+def test_catalog_stats_follow_writes(client, db, tmp_path):
+    from unittest.mock import patch
+    from backend import catalog_stats
+    from backend.tasks import import_tasks
+    
+    before = client.get("/api/products/stats").json()
+    
+    client.post("/api/products", json={"sku": "ST-1", "name": "Cheap", "price": 5.0})
+    pricey = client.post("/api/products", json={"sku": "ST-2", "name": "Pricey", "price": 2000.0}).json()
+    client.put(f"/api/products/{pricey['id']}", json={"active": False, "price": 20.0})
+    
+    stats = client.get("/api/products/stats").json()
+    assert stats["total"] == before["total"] + 2
+    assert stats["active"] == before["active"] + 1
+    assert stats["inactive"] == before["inactive"] + 1
+    counts = [bucket["count"] - old["count"] for bucket, old in zip(stats["price_histogram"], before["price_histogram"])]
+    assert counts == [1, 1, 0, 0, 0, 0]
+    
+    # Import upserts (inserting and updating in one statement) are counted too
+    feed = tmp_path / "feed.csv"
+    feed.write_text("sku,name,price\nst-1,Cheap,7\nST-3,New,700\n")
+    with patch.object(import_tasks, "SessionLocal", return_value=db):
+        import_tasks.import_csv_task("stats-import", str(feed), "feed.csv")
+    stats = client.get("/api/products/stats").json()
+    assert stats["total"] == before["total"] + 3
+    
+    # Compaction keeps the numbers; reconciliation finds nothing to fix
+    catalog_stats.compact(db)
+    assert catalog_stats.reconcile(db) == 0
+    assert client.get("/api/products/stats").json() == stats
+    
+    # Writes that bypass the triggers are corrected by reconciliation
+    db.execute(text("ALTER TABLE products DISABLE TRIGGER products_stats_delete"))
+    client.delete("/api/products")
+    db.execute(text("ALTER TABLE products ENABLE TRIGGER products_stats_delete"))
+    assert catalog_stats.reconcile(db) > 0
+    assert client.get("/api/products/stats").json()["total"] == 0
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+from benchmarks.import_time import PROFILES, ROOT, measure, parse_importtime
+
+
+def test_web_startup_does_not_load_celery():
+    imported = {module.split(".")[0] for module, _, _ in measure(PROFILES["web"].code)}
+    assert not imported.intersection(PROFILES["web"].forbidden)
+
+
+def test_database_engine_created_on_first_use():
+    code = "import backend.database as d; print(d._engine is None); d.SessionLocal().close(); print(d._engine is None)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True).stdout
+    assert output.split() == ["True", "False"]
+
+
+def test_parse_importtime_depths():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       170 |        300 |   fastapi.types\n"
+        "import time:      1000 |       1500 | backend.main\n"
+    )
+    assert parse_importtime(stderr) == [("fastapi.types", 300, 1), ("backend.main", 1500, 0)]
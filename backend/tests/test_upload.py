@@ -1,4 +1,18 @@
+import hashlib
+import uuid
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
+import pytest
+from backend import upload_dedup
+from backend.models import UploadTask
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path):
+    """Keep uploaded files out of the real upload directory."""
+    with patch("backend.routers.upload.UPLOAD_DIR", str(tmp_path)):
+        yield tmp_path
+
 
 def test_upload_csv_valid(client):
     # Mock Celery task
@@ -12,6 +26,125 @@ def test_upload_csv_valid(client):
         assert "task_id" in response.json()
         mock_task.assert_called_once()
 
+def test_upload_identical_to_completed_import_is_skipped(client, db):
+    csv_content = f"sku,name,price\n{uuid.uuid4().hex},Test,10.0\n"
+    content_hash = upload_dedup.combine_part_checksums([hashlib.sha256(csv_content.encode()).hexdigest()])
+    db.add(UploadTask(
+        id="earlier-import", filename="feed.csv", status="completed",
+        content_hash=content_hash, outcome="imported", total_rows=1,
+        options={"mode": "upsert", "encoding": "utf-8", "delimiter": ","}
+    ))
+    db.commit()
+
+    with patch("backend.tasks.import_tasks.import_csv_task.delay") as mock_task:
+        response = client.post("/api/upload", files={"file": ("feed.csv", csv_content, "text/csv")})
+
+    assert response.status_code == 200
+    mock_task.assert_not_called()
+    task = client.get(f"/api/upload/{response.json()['task_id']}/status").json()
+    assert task["status"] == "completed"
+    assert task["outcome"] == "duplicate"
+    assert task["duplicate_of"] == "earlier-import"
+
+def test_identical_concurrent_uploads_share_one_import(client, db):
+    csv_content = f"sku,name,price\n{uuid.uuid4().hex},Test,10.0\n"
+    files = {"file": ("feed.csv", csv_content, "text/csv")}
+
+    with patch("backend.tasks.import_tasks.import_csv_task.delay") as mock_task:
+        first = client.post("/api/upload", files=files).json()
+        second = client.post("/api/upload", files=files).json()
+
+    mock_task.assert_called_once()
+    assert second["task_id"] == first["task_id"]
+    task = db.query(UploadTask).filter(UploadTask.id == first["task_id"]).one()
+    upload_dedup.release_import(upload_dedup.fingerprint(task.content_hash, task.options), task.id)
+
+def test_resumable_upload(client):
+    content = b"sku,name,price\n" + b"".join(b"P%d,Item %d,1.0\n" % (i, i) for i in range(200))
+    part_size = 1024
+
+    response = client.post("/api/upload/initiate", json={
+        "filename": "big.csv", "total_size": len(content), "part_size": part_size
+    })
+    assert response.status_code == 201
+    session = response.json()
+    task_id = session["task_id"]
+    assert session["total_parts"] == -(-len(content) // part_size)
+
+    # Send parts out of order; the first one is left for "resume"
+    for number in range(session["total_parts"], 1, -1):
+        part = content[(number - 1) * part_size:number * part_size]
+        response = client.put(f"/api/upload/{task_id}/parts/{number}", content=part)
+        assert response.status_code == 200
+
+    response = client.post(f"/api/upload/{task_id}/complete")
+    assert response.status_code == 400
+
+    received = client.get(f"/api/upload/{task_id}/parts").json()["parts"]
+    assert [part["part_number"] for part in received] == list(range(2, session["total_parts"] + 1))
+
+    response = client.put(f"/api/upload/{task_id}/parts/1", content=content[:part_size])
+    assert response.status_code == 200
+
+    with patch("backend.tasks.import_tasks.import_csv_task.delay") as mock_task:
+        response = client.post(f"/api/upload/{task_id}/complete")
+        assert response.status_code == 200
+        mock_task.assert_called_once()
+
+    with open(mock_task.call_args[0][1], "rb") as f:
+        assert f.read() == content
+
+    # No more parts once the import is queued
+    response = client.put(f"/api/upload/{task_id}/parts/1", content=content[:part_size])
+    assert response.status_code == 409
+
+def test_resumable_upload_rejects_bad_checksum(client):
+    response = client.post("/api/upload/initiate", json={
+        "filename": "small.csv", "total_size": 2048, "part_size": 1024
+    })
+    task_id = response.json()["task_id"]
+
+    response = client.put(
+        f"/api/upload/{task_id}/parts/1",
+        content=b"x" * 1024,
+        headers={"X-Part-Checksum": "0" * 64}
+    )
+    assert response.status_code == 400
+    assert "checksum" in response.json()["detail"]
+
+    response = client.put(f"/api/upload/{task_id}/parts/2", content=b"x" * 10)
+    assert response.status_code == 400
+
+def test_upload_preflight_detects_format_and_applies_mapping(client):
+    csv_content = "SKU Code;Title;Price\nPF-1;Caf\xe9;1,5\nPF-2;Tea;2\n".encode("cp1252")
+    files = {"file": ("feed.csv", csv_content, "text/csv")}
+    data = {"column_mapping": '{"SKU Code": "sku", "Title": "name"}'}
+
+    with patch("backend.tasks.import_tasks.import_csv_task.delay") as mock_task:
+        response = client.post("/api/upload", files=files, data=data)
+
+    assert response.status_code == 200
+    preflight = response.json()["preflight"]
+    assert preflight["encoding"] == "cp1252"
+    assert preflight["delimiter"] == ";"
+    assert preflight["columns"] == ["sku", "name", "price"]
+    options = mock_task.call_args[0][3]
+    assert options["column_mapping"] == {"SKU Code": "sku", "Title": "name"}
+
+def test_upload_preflight_rejects_bad_files(client):
+    cases = [
+        ("product,title,cost\nA,B,1\n", "Missing required columns"),
+        ("sku,name,price\n,nameless,1\n,also nameless,2\n", "None of the first 2 rows"),
+        ("sku,name,price\n", "no rows"),
+    ]
+    with patch("backend.tasks.import_tasks.import_csv_task.delay") as mock_task:
+        for csv_content, error in cases:
+            files = {"file": ("feed.csv", csv_content, "text/csv")}
+            response = client.post("/api/upload", files=files)
+            assert response.status_code == 400
+            assert error in response.json()["detail"]
+    mock_task.assert_not_called()
+
 def test_upload_invalid_extension(client):
     files = {"file": ("test.txt", "content", "text/plain")}
     response = client.post("/api/upload", files=files)
@@ -38,3 +171,72 @@ def test_webhook_crud(client):
     # Verify empty
     res = client.get("/api/webhooks")
     assert len(res.json()) == 0
+
+def test_webhook_test_reports_timings(client):
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Receiver(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Receiver)
+    threading.Thread(target=server.handle_request, daemon=True).start()
+
+    res = client.post(
+        "/api/webhooks",
+        json={"url": f"http://127.0.0.1:{server.server_port}/hook", "event_type": "upload_complete"}
+    )
+    result = client.post(f"/api/webhooks/{res.json()['id']}/test").json()
+    server.server_close()
+
+    assert result["success"] is True
+    assert result["status_code"] == 200
+    assert result["timings"]["connect_ms"] is not None
+    assert result["timings"]["first_byte_ms"] is not None
+    assert result["timings"]["tls_ms"] is None
+
+
+def test_upload_history_pages_newest_first(client, db):
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i in range(5):
+        db.add(UploadTask(
+            id=f"history-{i}", filename=f"{i}.csv", status="failed" if i == 2 else "completed",
+            created_at=base + timedelta(minutes=i)
+        ))
+    db.commit()
+    
+    first = client.get("/api/upload?limit=2").json()
+    assert [task["id"] for task in first["tasks"]] == ["history-4", "history-3"]
+    
+    second = client.get("/api/upload", params={"limit": 2, "before": first["next"]}).json()
+    assert [task["id"] for task in second["tasks"]] == ["history-2", "history-1"]
+    
+    failed = client.get("/api/upload?status=failed").json()
+    assert [task["id"] for task in failed["tasks"]] == ["history-2"]
+    assert failed["next"] is None
+    
+    assert client.get("/api/upload?before=yesterday").status_code == 400
+
+def test_content_hash_same_for_one_request_and_parts():
+    content = bytes(range(256)) * 50
+    whole = upload_dedup.ContentHasher(1000)
+    for start in range(0, len(content), 333):
+        whole.update(content[start:start + 333])
+
+    parts = [hashlib.sha256(content[start:start + 1000]).hexdigest() for start in range(0, len(content), 1000)]
+    assert whole.hexdigest() == upload_dedup.combine_part_checksums(parts)
+
+def test_stale_import_claim_is_taken_over_once():
+    fingerprint = f"test-{uuid.uuid4().hex}"
+    assert upload_dedup.claim_import(fingerprint, "crashed") is None
+
+    # Only one of two uploads that find the same stale holder takes over
+    assert upload_dedup.claim_import(fingerprint, "first", stale_holder="crashed") is None
+    assert upload_dedup.claim_import(fingerprint, "second", stale_holder="crashed") == "first"
+    upload_dedup.release_import(fingerprint, "first")
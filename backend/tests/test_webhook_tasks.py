@@ -0,0 +1,174 @@
+from unittest.mock import patch
+from backend.config import settings
+from backend.models import Webhook
+from backend.redis_client import get_redis
+from backend import webhook_registry
+from backend.tasks import webhook_tasks
+from backend.webhook_batching import buffer_event, drain_events
+from backend.webhook_circuit import circuit_open_for, record_failure, record_success
+
+
+def _add_webhook(db, url="http://example.com/hook"):
+    webhook = Webhook(url=url, event_type="product_created", enabled=True)
+    db.add(webhook)
+    db.flush()
+    webhook_registry.invalidate()
+    return webhook
+
+
+def test_retry_delay_grows_and_is_capped():
+    first = webhook_tasks._retry_delay(0)
+    assert settings.webhook_retry_backoff_seconds / 2 <= first <= settings.webhook_retry_backoff_seconds
+
+    capped = webhook_tasks._retry_delay(50)
+    assert capped <= settings.webhook_retry_backoff_max_seconds
+    assert capped >= settings.webhook_retry_backoff_max_seconds / 2
+
+
+def test_failed_delivery_is_rescheduled(db):
+    webhook = _add_webhook(db)
+
+    with patch.object(webhook_registry, "SessionLocal", return_value=db), \
+            patch.object(webhook_tasks, "_send_webhook", side_effect=Exception("boom")), \
+            patch.object(webhook_tasks, "circuit_open_for", return_value=0), \
+            patch.object(webhook_tasks, "record_failure") as mock_failure, \
+            patch.object(webhook_tasks.deliver_webhook, "apply_async") as mock_retry:
+        webhook_tasks.trigger_webhooks("product_created", {"sku": "P1"})
+
+    mock_failure.assert_called_once_with(webhook.id)
+    mock_retry.assert_called_once()
+    assert mock_retry.call_args.kwargs["args"][0] == webhook.id
+
+
+def test_open_circuit_skips_delivery(db):
+    _add_webhook(db)
+
+    with patch.object(webhook_registry, "SessionLocal", return_value=db), \
+            patch.object(webhook_tasks, "_send_webhook") as mock_send, \
+            patch.object(webhook_tasks, "circuit_open_for", return_value=30), \
+            patch.object(webhook_tasks.deliver_webhook, "apply_async") as mock_retry:
+        webhook_tasks.trigger_webhooks("product_created", {"sku": "P1"})
+
+    mock_send.assert_not_called()
+    assert mock_retry.call_args.kwargs["countdown"] >= 30
+
+
+def test_circuit_opens_after_threshold():
+    webhook_id = -1
+    record_success(webhook_id)
+
+    for _ in range(settings.webhook_circuit_failure_threshold - 1):
+        assert record_failure(webhook_id) is False
+    assert circuit_open_for(webhook_id) == 0
+
+    assert record_failure(webhook_id) is True
+    assert circuit_open_for(webhook_id) > 0
+
+    record_success(webhook_id)
+    assert circuit_open_for(webhook_id) == 0
+    assert get_redis().exists(f"webhook:{webhook_id}:failures") == 0
+
+
+def test_half_open_circuit_lets_one_probe_through():
+    webhook_id = -4
+    record_success(webhook_id)
+    for _ in range(settings.webhook_circuit_failure_threshold):
+        record_failure(webhook_id)
+    get_redis().delete(f"webhook:{webhook_id}:circuit_open")  # Cool-down over
+
+    assert circuit_open_for(webhook_id) == 0
+    assert circuit_open_for(webhook_id) > 0
+
+    # A failed probe re-opens the circuit and frees the token for the next one
+    record_failure(webhook_id)
+    get_redis().delete(f"webhook:{webhook_id}:circuit_open")
+    assert circuit_open_for(webhook_id) == 0
+    record_success(webhook_id)
+
+
+def test_parked_delivery_keeps_its_retry_count():
+    with patch.object(webhook_tasks, "circuit_open_for", return_value=30), \
+            patch.object(webhook_tasks, "_send_webhook") as mock_send, \
+            patch.object(webhook_tasks.deliver_webhook, "apply_async") as mock_park:
+        webhook_tasks.deliver_webhook.apply(
+            args=[-5, "http://example.com/hook", "product_created", {"sku": "P1"}], retries=2
+        )
+
+    mock_send.assert_not_called()
+    assert mock_park.call_args.kwargs["retries"] == 2
+    assert mock_park.call_args.kwargs["countdown"] >= 30
+
+
+def test_batch_buffer_coalesces_by_sku():
+    webhook_id = -2
+    drain_events(webhook_id)
+
+    size, opened, window = buffer_event(webhook_id, {"sku": "A1", "price": 1.0}, 30)
+    assert (size, opened) == (1, True)
+    buffer_event(webhook_id, {"sku": "B2", "price": 2.0}, 30)
+    size, opened, same_window = buffer_event(webhook_id, {"sku": "a1", "price": 3.0}, 30)
+    assert (size, opened, same_window) == (2, False, window)
+
+    items = drain_events(webhook_id)
+    assert items == [{"sku": "B2", "price": 2.0}, {"sku": "a1", "price": 3.0}]
+    assert drain_events(webhook_id) == []
+
+
+def test_batching_webhook_is_buffered_not_sent():
+    target = webhook_tasks.WebhookTarget(-3, "http://example.com/hook", 30, 2)
+    drain_events(target.id)
+
+    with patch.object(webhook_tasks, "_send_webhook") as mock_send, \
+            patch.object(webhook_tasks.flush_webhook_batch, "apply_async") as mock_timer, \
+            patch.object(webhook_tasks.flush_webhook_batch, "delay") as mock_flush:
+        webhook_tasks._fan_out([target], "product_updated", {"sku": "A1"})
+        mock_timer.assert_called_once()
+        mock_flush.assert_not_called()
+
+        webhook_tasks._fan_out([target], "product_updated", {"sku": "B2"})
+        window = mock_timer.call_args.kwargs["args"][3]
+        mock_flush.assert_called_once_with(target.id, target.url, "product_updated", window)
+
+        # Events past the limit wait for that flush instead of sending more
+        webhook_tasks._fan_out([target], "product_updated", {"sku": "C3"})
+        mock_flush.assert_called_once()
+
+    mock_send.assert_not_called()
+
+    with patch.object(webhook_tasks, "_send_webhook") as mock_send, \
+            patch.object(webhook_tasks, "circuit_open_for", return_value=0), \
+            patch.object(webhook_tasks, "record_success"):
+        result = webhook_tasks.flush_webhook_batch(target.id, target.url, "product_updated", window)
+
+    assert result == {"delivered": 3}
+    url, event_type, payload = mock_send.call_args.args
+    assert event_type == "product_updated.batch"
+    assert payload["count"] == 3
+
+
+def test_stale_window_flush_leaves_next_window_alone():
+    webhook_id = -6
+    drain_events(webhook_id)
+
+    _, _, first = buffer_event(webhook_id, {"sku": "A1"}, 30)
+    assert drain_events(webhook_id, first) == [{"sku": "A1"}]  # Size-triggered flush
+
+    _, opened, second = buffer_event(webhook_id, {"sku": "B2"}, 30)
+    assert opened and second != first
+    assert drain_events(webhook_id, first) == []  # The first window's timer fires late
+    assert drain_events(webhook_id, second) == [{"sku": "B2"}]
+
+
+def test_registry_caches_until_invalidated(db):
+    webhook = _add_webhook(db)
+
+    with patch.object(webhook_registry, "SessionLocal", return_value=db) as mock_session:
+        targets = webhook_registry.get_targets(["product_created"])
+        assert [t.id for t in targets["product_created"]] == [webhook.id]
+
+        webhook_registry.get_targets(["product_created"])
+        assert mock_session.call_count == 1
+
+        webhook_registry.invalidate()
+        webhook_registry.get_targets(["product_created"])
+        assert mock_session.call_count == 2
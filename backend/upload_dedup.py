@@ -0,0 +1,146 @@
+"""Coordination of identical uploads that are imported at the same time."""
+import hashlib
+import json
+import logging
+from typing import Iterable, List, Optional
+import redis
+from backend.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Holds the id of the task importing a given file content with given options
+INFLIGHT_KEY = "upload:inflight:{fingerprint}"
+# Upper bound on an import, so a crashed worker cannot block a file forever
+INFLIGHT_TTL_SECONDS = 6 * 3600
+
+# Delete the key only if this task still holds it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class ContentHasher:
+    """
+    Content hash of an upload: SHA-256 over the SHA-256 of each part.
+
+    A resumable upload already has a checksum per part, so its hash is
+    derived from those instead of re-reading the assembled file. A file
+    sent in one request is cut into parts of the default part size as it
+    is written, so both ways of uploading it give the same hash (unless a
+    resumable upload picks another part size).
+    """
+
+    def __init__(self, part_size: int):
+        self.part_size = part_size
+        self._part = hashlib.sha256()
+        self._part_filled = 0
+        self._digests: List[str] = []
+
+    def update(self, data: bytes):
+        """Add the next bytes of the file."""
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.part_size - self._part_filled)
+            self._part.update(view[:take])
+            self._part_filled += take
+            view = view[take:]
+            if self._part_filled == self.part_size:
+                self._finish_part()
+
+    def hexdigest(self) -> str:
+        """Get the content hash of everything added so far."""
+        digests = list(self._digests)
+        if self._part_filled:
+            digests.append(self._part.hexdigest())
+        return combine_part_checksums(digests)
+
+    def _finish_part(self):
+        self._digests.append(self._part.hexdigest())
+        self._part = hashlib.sha256()
+        self._part_filled = 0
+
+
+def combine_part_checksums(checksums: Iterable[str]) -> str:
+    """
+    Get the content hash from the SHA-256 hex digests of the parts, in order.
+
+    Returns:
+        str: Hex digest
+    """
+    combined = hashlib.sha256()
+    for checksum in checksums:
+        combined.update(bytes.fromhex(checksum))
+    return combined.hexdigest()
+
+
+# Take over a claim only from the given stale holder (or if it has expired)
+REPLACE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current == false or current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return false
+end
+return current
+"""
+
+
+def fingerprint(content_hash: str, options: Optional[dict]) -> str:
+    """
+    Identify an import by file content and the options it runs with.
+
+    The same file imported in another mode is a different import.
+
+    Args:
+        content_hash: Content hash of the file (see `ContentHasher`)
+        options: Import options
+
+    Returns:
+        str: Hex digest
+    """
+    encoded = json.dumps(options or {}, sort_keys=True)
+    return hashlib.sha256(f"{content_hash}:{encoded}".encode()).hexdigest()
+
+
+def claim_import(import_fingerprint: str, task_id: str, stale_holder: Optional[str] = None) -> Optional[str]:
+    """
+    Claim an import for a task.
+
+    Args:
+        import_fingerprint: Result of `fingerprint()`
+        task_id: Task that wants to import it
+        stale_holder: Take over the claim from this task, which finished
+            without releasing it; has no effect if another task holds it by now
+
+    Returns:
+        str: Id of the task already importing this content, or None if
+        the claim succeeded (or Redis is unavailable)
+    """
+    key = INFLIGHT_KEY.format(fingerprint=import_fingerprint)
+
+    try:
+        client = get_redis()
+        if stale_holder:
+            holder = client.eval(REPLACE_SCRIPT, 1, key, stale_holder, task_id, INFLIGHT_TTL_SECONDS)
+        elif client.set(key, task_id, nx=True, ex=INFLIGHT_TTL_SECONDS):
+            return None
+        else:
+            holder = client.get(key)
+    except redis.RedisError as e:
+        # Without Redis identical uploads are simply imported twice
+        logger.warning("Could not claim import %s: %s", import_fingerprint, e)
+        return None
+
+    return holder if holder != task_id else None
+
+
+def release_import(import_fingerprint: str, task_id: str):
+    """Release a task's claim once its import has finished."""
+    try:
+        get_redis().eval(
+            RELEASE_SCRIPT, 1, INFLIGHT_KEY.format(fingerprint=import_fingerprint), task_id
+        )
+    except redis.RedisError as e:
+        logger.warning("Could not release import %s: %s", import_fingerprint, e)
@@ -0,0 +1,109 @@
+"""Redis-backed event buffers for webhooks in batching mode."""
+import json
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+from backend.redis_client import get_redis
+
+# Redis key layout
+BUFFER_KEY = "webhook:{id}:batch"
+SEQ_KEY = "webhook:{id}:batch_seq"
+SCHEDULED_KEY = "webhook:{id}:batch_scheduled"
+
+# Extra lifetime of a window's token beyond the window, so a flush delayed
+# in the queue still finds it; a lost flush stops blocking new windows after this
+WINDOW_GRACE_SECONDS = 300
+
+# Store the event under its coalescing key (last one wins) and open a new
+# window, identified by a token, if none is open.
+_BUFFER_SCRIPT = """
+local seq = redis.call('INCR', KEYS[2])
+redis.call('HSET', KEYS[1], ARGV[1], seq .. '|' .. ARGV[2])
+local size = redis.call('HLEN', KEYS[1])
+if redis.call('SET', KEYS[3], ARGV[4], 'NX', 'EX', ARGV[3]) then
+    return {size, 1, ARGV[4]}
+end
+return {size, 0, redis.call('GET', KEYS[3])}
+"""
+
+# Take the whole buffer and close the window in one step, unless a newer
+# window has opened since the flush was scheduled (its own flush drains it)
+_DRAIN_SCRIPT = """
+local current = redis.call('GET', KEYS[2])
+if ARGV[1] ~= '' and current and current ~= ARGV[1] then
+    return {}
+end
+local items = redis.call('HVALS', KEYS[1])
+redis.call('DEL', KEYS[1], KEYS[2])
+return items
+"""
+
+
+def coalesce_key(payload: Dict[str, Any]) -> str:
+    """
+    Get the key under which repeated events collapse.
+
+    Product events collapse per SKU (case-insensitive); anything else is
+    kept as a separate entry.
+    """
+    sku = payload.get("sku")
+    if sku:
+        return f"sku:{sku.lower()}"
+    return f"event:{uuid.uuid4().hex}"
+
+
+def buffer_event(webhook_id: int, payload: Dict[str, Any], window_seconds: int) -> Tuple[int, bool, str]:
+    """
+    Add an event to a webhook's batch buffer.
+
+    Args:
+        webhook_id: Webhook identifier
+        payload: Event data
+        window_seconds: Batching window of the webhook
+
+    Returns:
+        tuple: (events buffered, whether this event opened a new window,
+        token of the window the event belongs to)
+    """
+    client = get_redis()
+    window_seconds = max(int(window_seconds), 1)
+    size, opened, window = client.eval(
+        _BUFFER_SCRIPT,
+        3,
+        BUFFER_KEY.format(id=webhook_id),
+        SEQ_KEY.format(id=webhook_id),
+        SCHEDULED_KEY.format(id=webhook_id),
+        coalesce_key(payload),
+        json.dumps(payload),
+        window_seconds + WINDOW_GRACE_SECONDS,
+        uuid.uuid4().hex,
+    )
+    return size, bool(opened), window
+
+
+def drain_events(webhook_id: int, window: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Remove and return all buffered events of a webhook, oldest first.
+
+    Args:
+        webhook_id: Webhook identifier
+        window: Token of the window to flush; nothing is drained if another
+            window is open by now (None drains regardless)
+
+    Returns:
+        list: Event payloads in the order they were last written
+    """
+    items = get_redis().eval(
+        _DRAIN_SCRIPT,
+        2,
+        BUFFER_KEY.format(id=webhook_id),
+        SCHEDULED_KEY.format(id=webhook_id),
+        window or "",
+    )
+
+    entries = []
+    for item in items:
+        seq, data = item.split("|", 1)
+        entries.append((int(seq), data))
+    entries.sort()
+
+    return [json.loads(data) for _, data in entries]
@@ -0,0 +1,117 @@
+"""Per-webhook circuit breaker backed by Redis."""
+import logging
+import math
+import redis
+from backend.config import settings
+from backend.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Redis key layout
+FAILURES_KEY = "webhook:{id}:failures"
+OPEN_KEY = "webhook:{id}:circuit_open"
+PROBE_KEY = "webhook:{id}:probe"
+
+# Open: wait out the cool-down. Half-open (cool-down over, failures still at
+# the threshold): the caller that sets the probe token delivers, the others
+# wait for the probe's outcome. Closed: deliver.
+_GATE_SCRIPT = """
+local open = redis.call('TTL', KEYS[1])
+if open > 0 then
+    return open
+end
+local failures = tonumber(redis.call('GET', KEYS[2]) or '0')
+if failures < tonumber(ARGV[1]) then
+    return 0
+end
+if redis.call('SET', KEYS[3], '1', 'NX', 'EX', ARGV[2]) then
+    return 0
+end
+return math.max(redis.call('TTL', KEYS[3]), 1)
+"""
+
+
+def _probe_seconds() -> int:
+    """How long the half-open probe holds its token; longer than one attempt."""
+    return max(math.ceil(settings.webhook_timeout_seconds * 2), 1)
+
+
+def circuit_open_for(webhook_id: int) -> int:
+    """
+    Get how long a delivery must wait before it may be attempted.
+
+    Once the cool-down of an open circuit ends, only one caller is let
+    through as the half-open probe; everyone else keeps waiting until the
+    probe succeeds (closing the circuit) or fails (re-opening it).
+
+    Args:
+        webhook_id: Webhook identifier
+
+    Returns:
+        int: Seconds to wait, 0 if this delivery may go ahead
+    """
+    try:
+        wait = get_redis().eval(
+            _GATE_SCRIPT,
+            3,
+            OPEN_KEY.format(id=webhook_id),
+            FAILURES_KEY.format(id=webhook_id),
+            PROBE_KEY.format(id=webhook_id),
+            settings.webhook_circuit_failure_threshold,
+            _probe_seconds(),
+        )
+    except redis.RedisError as e:
+        # Without health state we fail open and keep delivering
+        logger.warning("Circuit state unavailable for webhook %s: %s", webhook_id, e)
+        return 0
+
+    return max(int(wait), 0)
+
+
+def record_success(webhook_id: int):
+    """Close the circuit and reset the failure count after a delivery succeeds."""
+    try:
+        get_redis().delete(
+            FAILURES_KEY.format(id=webhook_id),
+            OPEN_KEY.format(id=webhook_id),
+            PROBE_KEY.format(id=webhook_id)
+        )
+    except redis.RedisError as e:
+        logger.warning("Could not reset circuit for webhook %s: %s", webhook_id, e)
+
+
+def record_failure(webhook_id: int) -> bool:
+    """
+    Count a failed delivery and open the circuit once the threshold is reached.
+
+    While the failure count stays above the threshold, one delivery after
+    each cool-down acts as the probe: one more failure re-opens the
+    circuit immediately and frees the probe token for the next cool-down.
+
+    Args:
+        webhook_id: Webhook identifier
+
+    Returns:
+        bool: True if this failure opened the circuit
+    """
+    cooldown = settings.webhook_circuit_cooldown_seconds
+    failures_key = FAILURES_KEY.format(id=webhook_id)
+
+    try:
+        client = get_redis()
+        pipe = client.pipeline()
+        pipe.incr(failures_key)
+        # Forget stale failures once the endpoint has been quiet for a while
+        pipe.expire(failures_key, cooldown * 10)
+        failures, _ = pipe.execute()
+
+        if failures >= settings.webhook_circuit_failure_threshold:
+            pipe = client.pipeline()
+            pipe.set(OPEN_KEY.format(id=webhook_id), failures, ex=cooldown)
+            pipe.delete(PROBE_KEY.format(id=webhook_id))
+            pipe.execute()
+            return True
+    except redis.RedisError as e:
+        logger.warning("Could not record failure for webhook %s: %s", webhook_id, e)
+
+    return False
@@ -0,0 +1,80 @@
+"""Async webhook test delivery with a per-phase latency breakdown."""
+import asyncio
+import socket
+import time
+from typing import Dict, Any
+
+TEST_PAYLOAD = {
+    "event": "test",
+    "data": {"message": "This is a test webhook from Product Importer"}
+}
+
+
+async def probe_webhook(url: str, timeout: float) -> Dict[str, Any]:
+    """
+    Send a test payload to a webhook and time each phase of the request.
+
+    DNS is resolved separately up front, so `connect_ms` normally hits the
+    resolver cache. Phases that did not happen (TLS on plain HTTP, or
+    anything after a failure) are reported as None.
+
+    Args:
+        url: Webhook URL
+        timeout: Overall time budget in seconds
+
+    Returns:
+        dict: Success flag, status code, total response time in seconds
+        and timings in milliseconds
+    """
+    # Imported here to keep httpx out of API startup; only the test endpoint needs it
+    import httpx
+
+    marks = {}
+    start = time.perf_counter()
+
+    async def trace(event_name: str, info: Dict[str, Any]):
+        marks[event_name] = time.perf_counter()
+
+    async def run():
+        request_url = httpx.URL(url)
+        port = request_url.port or (443 if request_url.scheme == "https" else 80)
+
+        marks["dns.started"] = time.perf_counter()
+        await asyncio.get_running_loop().getaddrinfo(
+            request_url.host, port, type=socket.SOCK_STREAM
+        )
+        marks["dns.complete"] = time.perf_counter()
+
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            return await client.post(url, json=TEST_PAYLOAD, extensions={"trace": trace})
+
+    result = {"success": False}
+
+    try:
+        response = await asyncio.wait_for(run(), timeout=timeout)
+        result["status_code"] = response.status_code
+        result["success"] = response.is_success
+        if not response.is_success:
+            result["error"] = f"HTTP {response.status_code}"
+    except asyncio.TimeoutError:
+        result["error"] = f"Timed out after {timeout:g}s"
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+
+    result["response_time"] = time.perf_counter() - start
+    result["timings"] = {
+        "dns_ms": _span(marks, "dns.started", "dns.complete"),
+        "connect_ms": _span(marks, "connection.connect_tcp.started", "connection.connect_tcp.complete"),
+        "tls_ms": _span(marks, "connection.start_tls.started", "connection.start_tls.complete"),
+        "first_byte_ms": _span(marks, "http11.send_request_body.complete", "http11.receive_response_headers.complete"),
+        "total_ms": round(result["response_time"] * 1000, 2),
+    }
+
+    return result
+
+
+def _span(marks: Dict[str, float], start: str, end: str):
+    """Get the milliseconds between two trace marks, if both were recorded."""
+    if start in marks and end in marks:
+        return round((marks[end] - marks[start]) * 1000, 2)
+    return None
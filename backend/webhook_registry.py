@@ -0,0 +1,121 @@
+"""Worker-local cache of webhook subscriptions."""
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import redis
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.models import Webhook
+from backend.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever a webhook is created, updated or deleted
+VERSION_KEY = "webhooks:registry_version"
+
+
+class WebhookTarget(NamedTuple):
+    """Delivery settings of one subscribed webhook."""
+    id: int
+    url: str
+    batch_window_seconds: Optional[int]
+    batch_max_events: Optional[int]
+
+
+class _Entry(NamedTuple):
+    version: Optional[str]
+    loaded_at: float
+    targets: List[WebhookTarget]
+
+
+_cache: Dict[str, _Entry] = {}
+_lock = threading.Lock()
+
+
+def get_targets(event_types: Iterable[str]) -> Dict[str, List[WebhookTarget]]:
+    """
+    Get enabled webhooks for the given event types.
+
+    Cached entries are reused while the registry version in Redis is
+    unchanged. If Redis is unavailable, entries expire after
+    `webhook_registry_ttl_seconds` instead.
+
+    Args:
+        event_types: Event types to look up
+
+    Returns:
+        dict: Webhook targets keyed by event type (missing types have none)
+    """
+    event_types = set(event_types)
+    version = _current_version()
+    now = time.monotonic()
+
+    with _lock:
+        stale = {
+            event_type for event_type in event_types
+            if not _is_fresh(_cache.get(event_type), version, now)
+        }
+
+    if stale:
+        loaded = _load(stale)
+        with _lock:
+            for event_type in stale:
+                _cache[event_type] = _Entry(version, now, loaded.get(event_type, []))
+
+    with _lock:
+        return {event_type: _cache[event_type].targets for event_type in event_types}
+
+
+def invalidate():
+    """Tell every worker to reload subscriptions on their next lookup."""
+    try:
+        get_redis().incr(VERSION_KEY)
+    except redis.RedisError as e:
+        logger.warning("Could not invalidate webhook registry: %s", e)
+
+    # Drop this process's copy right away in case Redis was unreachable
+    with _lock:
+        _cache.clear()
+
+
+def _current_version() -> Optional[str]:
+    """Read the registry version, or None if Redis is unavailable."""
+    try:
+        return get_redis().get(VERSION_KEY) or "0"
+    except redis.RedisError as e:
+        logger.warning("Webhook registry version unavailable: %s", e)
+        return None
+
+
+def _is_fresh(entry: Optional[_Entry], version: Optional[str], now: float) -> bool:
+    """Check whether a cache entry can be used."""
+    if entry is None:
+        return False
+    if now - entry.loaded_at > settings.webhook_registry_ttl_seconds:
+        return False
+    # Without Redis there is no version to compare, so rely on the TTL
+    return version is None or entry.version == version
+
+
+def _load(event_types) -> Dict[str, List[WebhookTarget]]:
+    """Query enabled webhooks for the given event types."""
+    db = SessionLocal()
+
+    try:
+        webhooks = db.query(Webhook).filter(
+            Webhook.event_type.in_(list(event_types)),
+            Webhook.enabled == True
+        ).order_by(Webhook.id).all()
+    finally:
+        db.close()
+
+    targets = {}
+    for webhook in webhooks:
+        targets.setdefault(webhook.event_type, []).append(WebhookTarget(
+            webhook.id,
+            webhook.url,
+            webhook.batch_window_seconds,
+            webhook.batch_max_events
+        ))
+    return targets
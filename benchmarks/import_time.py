@@ -0,0 +1,118 @@
+"""Startup import-time benchmark with a budget.
+
+Imports each process's entry point in fresh interpreters with
+`python -X importtime`, reports the median total and the slowest
+top-level imports, and fails if the budget is exceeded or a module that
+should load lazily (e.g. Celery in the web process) was imported.
+
+Usage:
+    # Check every profile against its default budget
+    python -m benchmarks.import_time
+
+    # Only the web process, with a tighter budget and more runs
+    python -m benchmarks.import_time --profile web --budget-ms 800 --repeat 9
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Profile(NamedTuple):
+    code: str
+    budget_ms: float
+    forbidden: Tuple[str, ...]
+
+
+PROFILES = {
+    # uvicorn backend.main:app; tasks, Celery and httpx load on first use
+    "web": Profile("import backend.main", 1500, ("celery", "kombu", "httpx")),
+    # celery -A backend.celery_app worker, after importing the task modules
+    "worker": Profile(
+        "import backend.celery_app; backend.celery_app.celery_app.loader.import_default_modules()",
+        2500,
+        (),
+    ),
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        list: (module, cumulative microseconds, depth) per import, depth 0
+        being imports made directly by the measured code
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((module, int(cumulative), depth))
+    return imports
+
+
+def measure(code: str) -> List[Tuple[str, int, int]]:
+    """Run code in a fresh interpreter and collect its import times."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Import failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def run_profile(name: str, profile: Profile, repeat: int, budget_ms: float, top: int) -> bool:
+    """Measure one profile; True if it is within budget and imports nothing forbidden."""
+    runs = [measure(profile.code) for _ in range(repeat)]
+    totals = [sum(us for _, us, depth in imports if depth == 0) / 1000 for imports in runs]
+    median = statistics.median(totals)
+    imports = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+    print(f"{name}: median {median:.0f} ms over {repeat} runs (budget {budget_ms:.0f} ms)")
+    slowest = sorted((entry for entry in imports if entry[2] == 0), key=lambda entry: -entry[1])
+    for module, us, _ in slowest[:top]:
+        print(f"  {us / 1000:>8.1f} ms  {module}")
+
+    packages = {module.split(".")[0] for module, _, _ in imports}
+    leaked = sorted(packages.intersection(profile.forbidden))
+
+    ok = median <= budget_ms
+    if not ok:
+        print(f"  OVER BUDGET by {median - budget_ms:.0f} ms")
+    if leaked:
+        ok = False
+        print(f"  imported at startup but should load lazily: {', '.join(leaked)}")
+    return ok
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append",
+                        help="profile to check (default: all)")
+    parser.add_argument("--budget-ms", type=float, help="override the profiles' budgets")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per profile")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, bool] = {}
+    for name in args.profile or sorted(PROFILES):
+        profile = PROFILES[name]
+        budget = args.budget_ms if args.budget_ms is not None else profile.budget_ms
+        results[name] = run_profile(name, profile, args.repeat, budget, args.top)
+
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""HTTP load-testing harness for the product API.
+
+Seed a large synthetic catalog, then drive a running server with a
+configurable request mix and report throughput and latency percentiles
+per endpoint. Results are written as JSON so runs on different commits
+can be compared.
+
+Usage:
+    # Load 2 million products (COPY, a few minutes)
+    python -m benchmarks.load_test seed --rows 2000000 --reset
+
+    # 60 s at 64 concurrent clients, default request mix
+    python -m benchmarks.load_test run --concurrency 64 --duration 60 \\
+        --output results/$(git rev-parse --short HEAD).json
+
+    # Compare against a previous run, failing on a p95 regression above 20%
+    python -m benchmarks.load_test compare results/base.json results/new.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List
+
+# Allow running as a script from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "alpha bravo cobalt delta ember falcon garnet harbor indigo juniper kestrel "
+    "lumen marble nectar onyx pepper quartz raven sierra tango umber velvet "
+    "willow xenon yarrow zephyr widget gadget bracket sprocket valve hinge"
+).split()
+
+DEFAULT_MIX = "list=35,search=15,get=35,create=5,update=10"
+
+
+# ===== SEEDING =====
+
+class _CopySource(io.RawIOBase):
+    """File-like object that generates CSV rows for COPY on demand."""
+
+    def __init__(self, rows: int, start: int, seed: int):
+        self.rows = rows
+        self.next_row = start
+        self.end = start + rows
+        self.rng = random.Random(seed)
+        self.buffer = b""
+
+    def readable(self):
+        return True
+
+    def _generate(self, count: int) -> bytes:
+        lines = []
+        for i in range(self.next_row, min(self.next_row + count, self.end)):
+            words = self.rng.sample(WORDS, 3)
+            lines.append(
+                f"LOAD-{i:09d},{words[0].title()} {words[1]} {i},"
+                f"{' '.join(self.rng.sample(WORDS, 8))},"
+                f"{self.rng.uniform(1, 1000):.2f},{'t' if self.rng.random() < 0.9 else 'f'}\n"
+            )
+        self.next_row = min(self.next_row + count, self.end)
+        return "".join(lines).encode()
+
+    def readinto(self, target) -> int:
+        while len(self.buffer) < len(target) and self.next_row < self.end:
+            self.buffer += self._generate(5000)
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def seed_catalog(database_url: str, rows: int, reset: bool, seed: int):
+    """Bulk-load synthetic products with COPY."""
+    import psycopg2
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cur:
+            if reset:
+                cur.execute("TRUNCATE products RESTART IDENTITY")
+            cur.execute("SELECT count(*) FROM products WHERE sku LIKE 'LOAD-%%'")
+            start = cur.fetchone()[0]
+
+            started = time.perf_counter()
+            cur.copy_expert(
+                "COPY products (sku, name, description, price, active) FROM STDIN WITH (FORMAT csv)",
+                io.BufferedReader(_CopySource(rows, start, seed), buffer_size=1 << 20),
+            )
+            conn.commit()
+            elapsed = time.perf_counter() - started
+
+            cur.execute("ANALYZE products")
+            conn.commit()
+    finally:
+        conn.close()
+
+    print(f"Seeded {rows:,} products in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+# ===== LOAD GENERATION =====
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "list=35,get=35,..." into endpoint weights."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+async def _op_list(client, rng, max_id):
+    skip = rng.randrange(0, 1000) * 50
+    return await client.get("/api/products", params={"skip": skip, "limit": 50})
+
+
+async def _op_search(client, rng, max_id):
+    return await client.get("/api/products", params={"search": rng.choice(WORDS), "limit": 50})
+
+
+async def _op_get(client, rng, max_id):
+    return await client.get(f"/api/products/{rng.randint(1, max_id)}")
+
+
+async def _op_create(client, rng, max_id):
+    return await client.post("/api/products", json={
+        "sku": f"LOADW-{uuid.uuid4().hex[:16]}",
+        "name": f"Load test {rng.choice(WORDS)}",
+        "price": round(rng.uniform(1, 1000), 2),
+    })
+
+
+async def _op_update(client, rng, max_id):
+    return await client.put(
+        f"/api/products/{rng.randint(1, max_id)}",
+        json={"price": round(rng.uniform(1, 1000), 2)},
+    )
+
+
+OPERATIONS = {
+    "list": _op_list,
+    "search": _op_search,
+    "get": _op_get,
+    "create": _op_create,
+    "update": _op_update,
+}
+
+
+async def run_load(base_url: str, concurrency: int, duration: float, mix: Dict[str, float],
+                   warmup: float, seed: int) -> Dict:
+    """Drive the API and collect per-endpoint latencies."""
+    import httpx
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        latest = (await client.get("/api/products", params={"limit": 1})).json()["products"]
+        max_id = latest[0]["id"] if latest else 1
+
+        started = time.perf_counter()
+        measure_from = started + warmup
+        stop_at = measure_from + duration
+
+        async def worker(worker_id: int):
+            rng = random.Random(seed + worker_id)
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    return
+                name = rng.choices(names, weights)[0]
+                try:
+                    response = await OPERATIONS[name](client, rng, max_id)
+                    ok = response.status_code < 500 and response.status_code != 429
+                except httpx.HTTPError:
+                    ok = False
+                elapsed = time.perf_counter() - now
+                if now >= measure_from:
+                    latencies[name].append(elapsed)
+                    if not ok:
+                        errors[name] += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    return {"latencies": latencies, "errors": errors, "duration": duration}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(raw: Dict) -> Dict:
+    """Reduce raw latencies to throughput and percentiles per endpoint."""
+    endpoints = {}
+    total = 0
+    for name, values in raw["latencies"].items():
+        values.sort()
+        total += len(values)
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": raw["errors"][name],
+            "rps": round(len(values) / raw["duration"], 2),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        }
+    return {"total_rps": round(total / raw["duration"], 2), "endpoints": endpoints}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_summary(summary: Dict):
+    print(f"{'endpoint':<10}{'reqs':>9}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, row in summary["endpoints"].items():
+        print(
+            f"{name:<10}{row['requests']:>9}{row['errors']:>6}{row['rps']:>9.1f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+        )
+    print(f"total: {summary['total_rps']:.1f} req/s (latencies in ms)")
+
+
+def compare(base_path: str, new_path: str, max_regression: float) -> int:
+    """Compare two result files; non-zero if any p95 regressed too much."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    failed = False
+    print(f"{'endpoint':<10}{'base p95':>10}{'new p95':>10}{'change':>9}")
+    for name, row in new["summary"]["endpoints"].items():
+        before = base["summary"]["endpoints"].get(name)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        flag = ""
+        if change > max_regression:
+            failed = True
+            flag = "  REGRESSION"
+        print(f"{name:<10}{before['p95_ms']:>10.1f}{row['p95_ms']:>10.1f}{change:>+9.1%}{flag}")
+
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = sub.add_parser("seed", help="bulk-load synthetic products")
+    seed_parser.add_argument("--rows", type=int, default=1_000_000)
+    seed_parser.add_argument("--database-url", default=None, help="defaults to DATABASE_URL")
+    seed_parser.add_argument("--reset", action="store_true", help="truncate products first")
+    seed_parser.add_argument("--seed", type=int, default=42)
+
+    run_parser = sub.add_parser("run", help="drive a running server")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    run_parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds first")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights (default {DEFAULT_MIX})")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="write results JSON here")
+
+    compare_parser = sub.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 increase")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        database_url = args.database_url
+        if database_url is None:
+            from backend.config import settings
+            database_url = settings.database_url
+        seed_catalog(database_url, args.rows, args.reset, args.seed)
+        return 0
+
+    if args.command == "compare":
+        return compare(args.base, args.new, args.max_regression)
+
+    mix = parse_mix(args.mix)
+    raw = asyncio.run(run_load(args.base_url, args.concurrency, args.duration, mix, args.warmup, args.seed))
+    summary = summarize(raw)
+    print_summary(summary)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": _git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "config": {
+                    "base_url": args.base_url,
+                    "concurrency": args.concurrency,
+                    "duration": args.duration,
+                    "warmup": args.warmup,
+                    "mix": mix,
+                    "seed": args.seed,
+                },
+                "summary": summary,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,14 @@ let currentEditWebhookId = null;
 let confirmCallback = null;
 let uploadEventSource = null;
 
+// Plain or compressed CSV
+const UPLOAD_EXTENSIONS = ['.csv', '.csv.gz', '.csv.zst', '.zip'];
+
+// Resumable uploads
+const PART_SIZE = 8 * 1024 * 1024;
+const PARALLEL_PARTS = 4;
+const PART_RETRIES = 3;
+
 // DOM Elements
 const fileInput = document.getElementById('fileInput');
 const uploadArea = document.getElementById('uploadArea');
@@ -17,6 +25,7 @@ const progressFill = document.getElementById('progressFill');
 const progressText = document.getElementById('progressText');
 const progressPercent = document.getElementById('progressPercent');
 const progressDetails = document.getElementById('progressDetails');
+const importMode = document.getElementById('importMode');
 
 const productsTableBody = document.getElementById('productsTableBody');
 const searchInput = document.getElementById('searchInput');
@@ -68,14 +77,11 @@ function initializeUpload() {
 }
 
 async function handleFileUpload(file) {
-    if (!file.name.endsWith('.csv')) {
-        showNotification('Please select a CSV file', 'error');
+    if (!UPLOAD_EXTENSIONS.some(ext => file.name.toLowerCase().endsWith(ext))) {
+        showNotification('Please select a CSV file (.csv, .csv.gz, .csv.zst or .zip)', 'error');
         return;
     }
 
-    const formData = new FormData();
-    formData.append('file', file);
-
     try {
         uploadArea.style.display = 'none';
         progressContainer.style.display = 'block';
@@ -86,10 +92,20 @@ async function handleFileUpload(file) {
         progressText.textContent = 'Uploading...';
         progressDetails.textContent = 'Please wait while we process your file';
 
-        const response = await fetch(`${API_BASE}/api/upload`, {
-            method: 'POST',
-            body: formData
-        });
+        let response;
+        if (file.size > PART_SIZE) {
+            response = await uploadInParts(file);
+        } else {
+            const formData = new FormData();
+            formData.append('file', file);
+            const options = selectedImportOptions();
+            formData.append('mode', options.mode);
+            formData.append('missing', options.missing);
+            response = await fetch(`${API_BASE}/api/upload`, {
+                method: 'POST',
+                body: formData
+            });
+        }
 
         const data = await response.json();
 
@@ -117,6 +133,118 @@ async function handleFileUpload(file) {
     }
 }
 
+// Upload a large file in parts, resuming a previous attempt if possible
+async function uploadInParts(file) {
+    const resumeKey = `upload:${importMode.value}:${file.name}:${file.size}:${file.lastModified}`;
+    let session = await resumeUploadSession(resumeKey);
+    let received = new Set(session ? session.parts.map(part => part.part_number) : []);
+
+    if (!session) {
+        const response = await fetch(`${API_BASE}/api/upload/initiate`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                filename: file.name,
+                total_size: file.size,
+                part_size: PART_SIZE,
+                ...selectedImportOptions()
+            })
+        });
+        if (!response.ok) return response;
+        session = await response.json();
+        localStorage.setItem(resumeKey, session.task_id);
+    }
+
+    const pending = [];
+    for (let number = 1; number <= session.total_parts; number++) {
+        if (!received.has(number)) pending.push(number);
+    }
+
+    let uploadedBytes = (session.total_parts - pending.length) * session.part_size;
+    const showProgress = () => {
+        const percent = Math.min(100, Math.round(uploadedBytes / file.size * 100));
+        progressFill.style.width = `${percent}%`;
+        progressPercent.textContent = `${percent}%`;
+        progressDetails.textContent = `Uploaded ${formatBytes(Math.min(uploadedBytes, file.size))} of ${formatBytes(file.size)}`;
+    };
+    showProgress();
+
+    // A few workers pull part numbers off the shared list
+    const uploadWorker = async () => {
+        while (pending.length) {
+            const number = pending.shift();
+            const start = (number - 1) * session.part_size;
+            const blob = file.slice(start, Math.min(start + session.part_size, file.size));
+            await uploadPart(session.task_id, number, blob);
+            uploadedBytes += blob.size;
+            showProgress();
+        }
+    };
+    await Promise.all(Array.from({ length: PARALLEL_PARTS }, uploadWorker));
+
+    const response = await fetch(`${API_BASE}/api/upload/${session.task_id}/complete`, {
+        method: 'POST'
+    });
+    if (response.ok) localStorage.removeItem(resumeKey);
+    return response;
+}
+
+// "full_sync:delete" -> { mode: "full_sync", missing: "delete" }
+function selectedImportOptions() {
+    const [mode, missing = 'deactivate'] = importMode.value.split(':');
+    return { mode, missing };
+}
+
+async function resumeUploadSession(resumeKey) {
+    const taskId = localStorage.getItem(resumeKey);
+    if (!taskId) return null;
+
+    const response = await fetch(`${API_BASE}/api/upload/${taskId}/parts`);
+    if (response.ok) {
+        const session = await response.json();
+        if (session.status === 'uploading') {
+            return { task_id: taskId, ...session };
+        }
+    }
+    localStorage.removeItem(resumeKey);
+    return null;
+}
+
+async function uploadPart(taskId, number, blob) {
+    const buffer = await blob.arrayBuffer();
+    const headers = { 'Content-Type': 'application/octet-stream' };
+
+    // crypto.subtle is only available on secure origins
+    if (window.crypto && crypto.subtle) {
+        const digest = await crypto.subtle.digest('SHA-256', buffer);
+        headers['X-Part-Checksum'] = Array.from(new Uint8Array(digest))
+            .map(b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    for (let attempt = 1; ; attempt++) {
+        try {
+            const response = await fetch(`${API_BASE}/api/upload/${taskId}/parts/${number}`, {
+                method: 'PUT',
+                headers,
+                body: buffer
+            });
+            if (response.ok) return;
+            if (response.status < 500 || attempt >= PART_RETRIES) {
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.detail || `Part ${number} failed`);
+            }
+        } catch (error) {
+            if (attempt >= PART_RETRIES || !(error instanceof TypeError)) throw error;
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+    }
+}
+
+function formatBytes(bytes) {
+    if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(0)} KB`;
+    return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+}
+
 function resetUploadUI() {
     uploadArea.style.display = 'block';
     progressContainer.style.display = 'none';
@@ -455,19 +583,37 @@ async function testWebhook(id) {
 
         const result = await response.json();
 
+        const timings = formatWebhookTimings(result.timings);
+
         if (result.success) {
             showNotification(
-                `Webhook test successful! (${result.status_code}, ${result.response_time.toFixed(2)}s)`,
+                `Webhook test successful! (${result.status_code}, ${result.response_time.toFixed(2)}s) ${timings}`,
                 'success'
             );
         } else {
-            showNotification(`Webhook test failed: ${result.error}`, 'error');
+            showNotification(`Webhook test failed: ${result.error} ${timings}`, 'error');
         }
     } catch (error) {
         showNotification('Webhook test failed', 'error');
     }
 }
 
+function formatWebhookTimings(timings) {
+    if (!timings) return '';
+
+    const phases = [
+        ['DNS', timings.dns_ms],
+        ['connect', timings.connect_ms],
+        ['TLS', timings.tls_ms],
+        ['first byte', timings.first_byte_ms],
+    ];
+
+    return '[' + phases
+        .filter(([, ms]) => ms !== null && ms !== undefined)
+        .map(([label, ms]) => `${label} ${ms.toFixed(1)}ms`)
+        .join(', ') + ']';
+}
+
 async function deleteWebhook(id) {
     showConfirmation(
         'Are you sure you want to delete this webhook?',
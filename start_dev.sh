@@ -23,9 +23,15 @@ fi
 echo "🔄 Running database migrations..."
 alembic upgrade head
 
-# Start Celery Worker
-echo "👷 Starting Celery Worker..."
-celery -A backend.celery_app worker --loglevel=info &
+# Shared metrics directory so /metrics aggregates all local processes
+export PROMETHEUS_MULTIPROC_DIR=/tmp/product-importer-metrics
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Start Celery Workers
+echo "👷 Starting Celery Workers (imports, webhooks + beat)..."
+bash start_worker.sh imports &
+WORKER_BEAT=1 bash start_worker.sh webhooks &
 
 # Start FastAPI Server
 echo "🌐 Starting FastAPI Server..."
@@ -7,10 +7,16 @@ echo "Starting Product Importer services..."
 echo "Running database migrations..."
 alembic upgrade head
 
-# Start Celery worker in background
-echo "Starting Celery worker..."
-export C_FORCE_ROOT=1
-celery -A backend.celery_app worker --loglevel=info &
+# Shared metrics directory so /metrics aggregates the web and import worker processes
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-metrics}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Start the import worker in background; it reads files from this
+# instance's uploads/ directory. The webhook worker runs as its own
+# Render service (see render.yaml).
+echo "Starting import worker..."
+bash start_worker.sh imports &
 
 # Start web server in foreground
 echo "Starting web server..."
@@ -0,0 +1,59 @@
+#!/bin/bash
+# Start a Celery worker tuned for one queue.
+#
+# Usage: start_worker.sh imports|webhooks
+#
+#   imports   CPU-heavy CSV imports: prefork pool, one task per process
+#   webhooks  I/O-bound webhook delivery: thread pool with high concurrency
+#             (set WEBHOOK_WORKER_POOL=gevent if gevent is installed)
+#
+# PROCESS_ROLE is set per profile so each worker sizes its database pool
+# with DB_POOL_SIZE_<ROLE> / DB_MAX_OVERFLOW_<ROLE>.
+#
+# Set WORKER_BEAT=1 on exactly one worker to embed the beat scheduler.
+set -e
+
+PROFILE=${1:-imports}
+EXTRA_ARGS=()
+
+if [ "$WORKER_BEAT" = "1" ]; then
+    EXTRA_ARGS+=(--beat)
+fi
+
+export C_FORCE_ROOT=1
+
+# Prefork children report metrics through a shared directory, which must
+# start empty; start_render.sh/start_dev.sh prepare it when co-located
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
+case "$PROFILE" in
+    imports)
+        export PROCESS_ROLE=import_worker
+        exec celery -A backend.celery_app worker \
+            -Q imports \
+            -n "imports@%h" \
+            --pool=prefork \
+            --concurrency="${IMPORT_WORKER_CONCURRENCY:-2}" \
+            --prefetch-multiplier=1 \
+            --max-tasks-per-child=50 \
+            --loglevel=info \
+            "${EXTRA_ARGS[@]}"
+        ;;
+    webhooks)
+        export PROCESS_ROLE=webhook_worker
+        exec celery -A backend.celery_app worker \
+            -Q webhooks \
+            -n "webhooks@%h" \
+            --pool="${WEBHOOK_WORKER_POOL:-threads}" \
+            --concurrency="${WEBHOOK_WORKER_CONCURRENCY:-32}" \
+            --prefetch-multiplier=4 \
+            --loglevel=info \
+            "${EXTRA_ARGS[@]}"
+        ;;
+    *)
+        echo "Unknown worker profile: $PROFILE (expected imports or webhooks)" >&2
+        exit 1
+        ;;
+esac